@@ -0,0 +1,162 @@
+"""Fixed synthetic inputs for the benchmark suite.
+
+Everything here is deterministic: the same size name always produces the same
+bytes, so timings from different commits are comparable.
+"""
+from __future__ import annotations
+
+import io
+from typing import Dict, List
+
+from models import Bullet, Experience, Heading, Project, ResumePayload
+
+# Number of roles per size; "pathological" is a very long senior resume.
+SIZES: Dict[str, int] = {"small": 2, "typical": 6, "pathological": 60}
+
+_SKILLS = ["Python", "Go", "Kafka", "Postgres", "Redis", "Kubernetes", "Docker", "Terraform", "React", "GraphQL"]
+_VERBS = ["Reduced", "Improved", "Migrated", "Automated", "Designed", "Scaled", "Hardened", "Rebuilt"]
+
+
+def _bullet(role: int, index: int) -> str:
+    verb = _VERBS[(role + index) % len(_VERBS)]
+    a = _SKILLS[(role + index) % len(_SKILLS)]
+    b = _SKILLS[(role * 3 + index) % len(_SKILLS)]
+    return f"{verb} checkout latency for service {role}-{index} using {a} and {b}, cutting p95 by {10 + index * 3}% for {role + 2} teams"
+
+
+def resume_lines(roles: int) -> List[str]:
+    lines = ["Jane Doe", "Senior Software Engineer", "jane@example.com | +1 555 010 0000 | https://linkedin.com/in/janedoe", ""]
+    lines.append("EXPERIENCE")
+    for role in range(roles):
+        lines.append(f"Software Engineer {role}")
+        lines.append(f"Company {role} Inc")
+        lines.append(f"Jan {2000 + role % 24} - Dec {2001 + role % 24}")
+        lines.extend(f"- {_bullet(role, i)}" for i in range(5))
+        lines.append("")
+    lines.append("SKILLS")
+    lines.append(", ".join(_SKILLS))
+    lines.append("")
+    lines.append("EDUCATION")
+    lines.append("Bachelor of Science in Computer Science, State University")
+    return lines
+
+
+def resume_text(size: str) -> str:
+    return "\n".join(resume_lines(SIZES[size]))
+
+
+def job_description(size: str) -> str:
+    paragraphs = SIZES[size] // 2 + 1
+    base = (
+        "We are hiring a backend engineer to build payment services with Python, Kafka and Postgres. "
+        "You will own Kubernetes deployments, improve observability, mentor engineers and reduce latency. "
+    )
+    return base * paragraphs
+
+
+def llm_html(size: str) -> str:
+    """Resume HTML shaped like the LLM output, including the <style> block."""
+    roles = SIZES[size]
+    jobs = []
+    for role in range(roles):
+        bullets = "".join(f"<li>{_bullet(role, i)}</li>" for i in range(5))
+        jobs.append(
+            '<div class="job"><div class="job-header"><span class="role">Software Engineer</span>'
+            f'<span class="dates">Jan {2000 + role % 24} - Dec {2001 + role % 24}</span></div>'
+            f'<div class="job-meta"><span class="company">Company {role}</span>'
+            '<span class="location">Remote</span></div>'
+            f'<ul class="bullets">{bullets}</ul></div>'
+        )
+    body = "".join(jobs)
+    if size == "pathological":
+        # Deeply nested wrappers are what make the div-balancing scan slow.
+        body = "<div>" * 500 + body + "</div>" * 500
+    return (
+        "<style>.resume { padding: 40px; } .job { margin-bottom: 12px; }</style>\n"
+        '<div class="resume"><div class="header"><h1>Jane Doe</h1></div>'
+        f'<section class="experience"><h2>EXPERIENCE</h2>{body}</section></div>'
+    )
+
+
+def payload(size: str) -> ResumePayload:
+    roles = SIZES[size]
+    return ResumePayload(
+        heading=Heading(
+            name="Jane Doe",
+            title="Senior Software Engineer",
+            phone="+1 555 010 0000",
+            email="jane@example.com",
+            linkedin="https://linkedin.com/in/janedoe",
+            github="https://github.com/janedoe",
+        ),
+        experiences=[
+            Experience(
+                role=f"Software Engineer {role}",
+                company=f"Company {role}",
+                location="Remote",
+                start=f"Jan {2000 + role % 24}",
+                end=f"Dec {2001 + role % 24}",
+                bullets=[Bullet(text=_bullet(role, i), has_metric=True) for i in range(5)],
+            )
+            for role in range(roles)
+        ],
+        skills=list(_SKILLS),
+        projects=[
+            Project(name="Gitlytics", stack="Python, Flask", timeline="Jan 2023 - Dec 2023", bullets=[Bullet(text=_bullet(0, 0))]),
+        ],
+        education="Bachelor of Science in Computer Science",
+        certifications=["AWS Solutions Architect"],
+    )
+
+
+def docx_bytes(size: str) -> bytes:
+    from docx import Document
+
+    document = Document()
+    section = document.sections[0]
+    section.header.paragraphs[0].text = "Jane Doe | jane@example.com | +1 555 010 0000"
+    for line in resume_lines(SIZES[size]):
+        if line:
+            document.add_paragraph(line)
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text, table.cell(0, 1).text = "Languages", "Python, Go, SQL"
+    table.cell(1, 0).text, table.cell(1, 1).text = "Cloud", "AWS, GCP"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def pdf_bytes(size: str) -> bytes:
+    """A plain text PDF written by hand, so no PDF library is needed to build it."""
+    lines = resume_lines(SIZES[size])
+    per_page = 60
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for index, page_lines in enumerate(pages):
+        escaped = [l.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for l in page_lines]
+        text = " T* ".join(f"({l}) Tj" for l in escaped)
+        stream = f"BT /F1 9 Tf 12 TL 40 760 Td {text} ET".encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[index] + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
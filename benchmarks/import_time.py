@@ -0,0 +1,97 @@
+"""Import-time report for service cold starts.
+
+Run from the repo root:
+
+    python -m benchmarks.import_time                          # gateway (main)
+    python -m benchmarks.import_time --module main --top 20 --json import_time.json
+    python -m benchmarks.import_time --budget-ms 600          # exit 1 when slower
+
+Each run imports the module in a fresh interpreter with ``python -X importtime``
+and reports the total plus the slowest imports, both per module (cumulative,
+as imported by the target) and per top-level package (self time summed).
+The median of --repeat runs is used so CI numbers are stable.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+Row = Tuple[int, float, float, str]  # depth, self ms, cumulative ms, module
+
+
+def _sample(module: str) -> List[Row]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows: List[Row] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((depth, int(self_us) / 1000, int(cumulative_us) / 1000, name.strip()))
+    return rows
+
+
+def report(module: str, repeat: int, top: int) -> Dict:
+    samples = [_sample(module) for _ in range(repeat)]
+    totals = [next(cum for depth, _, cum, name in rows if name == module and depth == 0) for rows in samples]
+    median_total = statistics.median(totals)
+    # Describe the run closest to the median total.
+    rows = samples[min(range(len(totals)), key=lambda i: abs(totals[i] - median_total))]
+
+    direct = sorted(((name, cum) for depth, _, cum, name in rows if depth == 1), key=lambda r: r[1], reverse=True)
+    packages: Dict[str, float] = defaultdict(float)
+    for _, self_ms, _, name in rows:
+        packages[name.split(".")[0]] += self_ms
+    by_package = sorted(packages.items(), key=lambda r: r[1], reverse=True)
+
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "total_ms": round(median_total, 1),
+        "runs_ms": [round(t, 1) for t in totals],
+        "direct_imports_ms": {name: round(ms, 1) for name, ms in direct[:top]},
+        "packages_self_ms": {name: round(ms, 1) for name, ms in by_package[:top]},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report per-module import time for a service entry point.")
+    parser.add_argument("--module", default="main", help="module to import, e.g. main")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--budget-ms", type=float, help="exit 1 when the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    result = report(args.module, args.repeat, args.top)
+    print(f"import {result['module']}: {result['total_ms']} ms (median of {result['runs_ms']})")
+    print(f"\n{'imported by ' + result['module']:45s} {'cumulative ms':>14s}")
+    for name, ms in result["direct_imports_ms"].items():
+        print(f"{name:45s} {ms:14.1f}")
+    print(f"\n{'package':45s} {'self ms':>14s}")
+    for name, ms in result["packages_self_ms"].items():
+        print(f"{name:45s} {ms:14.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+
+    if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+        print(f"\nimport {result['module']} took {result['total_ms']} ms, over the {args.budget_ms} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
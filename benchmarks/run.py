@@ -0,0 +1,162 @@
+"""Microbenchmarks for the CPU hot paths.
+
+Run from the repo root:
+
+    python -m benchmarks.run                              # print a table
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.25
+
+With --compare the exit status is 1 when any stage's median time (or peak
+memory) grows by more than the threshold relative to the baseline, or when a
+baseline stage within --filter/--sizes did not run.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks import corpus
+
+Stage = Tuple[str, Callable[[], object]]
+
+
+def _stages(sizes: List[str]) -> List[Stage]:
+    import main
+    from utils.docx_text import extract_docx_text
+    from utils.latex_generator import render_resume
+    from utils.parser import _docx_to_text_python_docx, _pdf_to_text
+    from utils.scorer import score_texts
+
+    stages: List[Stage] = []
+    for size in sizes:
+        pdf = corpus.pdf_bytes(size)
+        docx = corpus.docx_bytes(size)
+        resume = corpus.resume_text(size)
+        jd = corpus.job_description(size)
+        html = corpus.llm_html(size)
+        payload = corpus.payload(size)
+        variants = [html] * 8
+
+        stages += [
+            (f"parse.pdf_to_text[{size}]", lambda pdf=pdf: _pdf_to_text(io.BytesIO(pdf))),
+            (f"parse.docx_python_docx[{size}]", lambda docx=docx: _docx_to_text_python_docx(io.BytesIO(docx))),
+            (f"parse.docx_stream[{size}]", lambda docx=docx: extract_docx_text(io.BytesIO(docx))),
+            (f"pdf.wrap_html[{size}]", lambda html=html: main._wrap_html_for_pdf(html)),
+            (f"rewrite.analyze_keywords[{size}]", lambda r=resume, j=jd, h=html: main._analyze_rewrite(r, j, h)),
+            (f"score.batch_8_variants[{size}]", lambda v=variants, j=jd: score_texts(v, [j])),
+            (f"latex.render_resume[{size}]", lambda p=payload: render_resume(p)),
+        ]
+
+        rewriter = _spacy_rewriter()
+        if rewriter is not None:
+            stages.append((f"rewrite.spacy_rewriter[{size}]", lambda r=resume, j=jd: rewriter.rewrite(r, j)))
+    return stages
+
+
+_REWRITER = None
+
+
+def _spacy_rewriter():
+    """ResumeRewriter needs spaCy and a model; the stage is skipped without them."""
+    global _REWRITER
+    if _REWRITER is None:
+        try:
+            import spacy
+            from utils.rewriter import ResumeRewriter
+
+            _REWRITER = ResumeRewriter(spacy.load("en_core_web_sm"))
+        except Exception:
+            _REWRITER = False
+    return _REWRITER or None
+
+
+def measure(fn: Callable[[], object], min_time: float, min_repeat: int) -> Dict[str, float]:
+    fn()  # warm caches and lazy imports outside the timed runs
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < min_repeat or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "runs": len(samples),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(
+    current: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float, selected: Callable[[str], bool] = lambda name: True
+) -> List[str]:
+    """Regressions against ``baseline``. A baseline stage that was selected for
+    this run but has no result (renamed, removed or skipped) counts as one."""
+    regressions = []
+    for name, base in baseline.items():
+        now = current.get(name)
+        if now is None:
+            if selected(name):
+                regressions.append(f"{name}: missing from this run")
+            continue
+        for metric in ("median_ms", "peak_kb"):
+            if base[metric] > 0 and now[metric] > base[metric] * (1 + threshold):
+                change = (now[metric] / base[metric] - 1) * 100
+                regressions.append(f"{name}: {metric} {base[metric]} -> {now[metric]} (+{change:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the resume pipeline's CPU hot paths.")
+    parser.add_argument("--sizes", default=",".join(corpus.SIZES), help="comma-separated corpus sizes")
+    parser.add_argument("--filter", default="", help="only run stages whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.3, help="seconds to sample each stage")
+    parser.add_argument("--min-repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown, e.g. 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    results: Dict[str, Dict] = {}
+    print(f"{'stage':45s} {'median ms':>11s} {'min ms':>10s} {'runs':>6s} {'peak KB':>10s}")
+    for name, fn in _stages(sizes):
+        if args.filter not in name:
+            continue
+        stats = measure(fn, args.min_time, args.min_repeat)
+        results[name] = stats
+        print(f"{name:45s} {stats['median_ms']:11.3f} {stats['min_ms']:10.3f} {stats['runs']:6d} {stats['peak_kb']:10.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "stages": results}, handle, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)["stages"]
+        in_scope = lambda name: args.filter in name and name.rpartition("[")[2].rstrip("]") in sizes
+        regressions = compare(results, baseline, args.threshold, in_scope)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Concurrent upload/poll load driver for the gateway.
+
+    python -m loadtest.driver --url http://127.0.0.1:8000 --concurrency 16 --duration 60 --mode integrated
+
+Each virtual user loops: POST /upload with a corpus resume + JD, then polls
+GET /result/{session_id} until it succeeds. A 202 (``--respond-async``, or a
+result still processing) is progress, not an error. A flow whose result is not
+ready after --max-polls polls is recorded as a "timeout" flow. Reports
+throughput, p50/p95/p99 latency per step and error counts; --json writes the
+same numbers to a file so integrated and microservice runs can be compared
+side by side.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import corpus
+
+
+# 202: accepted or still processing; 304: unchanged since the last poll.
+OK_STATUSES = ("200", "202", "304")
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.completed = 0
+
+    def record(self, step: str, started: float, outcome: str) -> None:
+        self.latencies[step].append((time.perf_counter() - started) * 1000)
+        self.outcomes[step][outcome] += 1
+
+    def summary(self, elapsed: float) -> Dict:
+        steps = {}
+        for step, samples in self.latencies.items():
+            outcomes = self.outcomes[step]
+            total = sum(outcomes.values())
+            errors = total - sum(outcomes.get(code, 0) for code in OK_STATUSES)
+            steps[step] = {
+                "count": total,
+                "p50_ms": round(_percentile(samples, 50), 1),
+                "p95_ms": round(_percentile(samples, 95), 1),
+                "p99_ms": round(_percentile(samples, 99), 1),
+                "mean_ms": round(statistics.fmean(samples), 1) if samples else 0.0,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "outcomes": dict(outcomes),
+            }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "completed_flows": self.completed,
+            "throughput_rps": round(self.completed / elapsed, 3) if elapsed else 0.0,
+            "steps": steps,
+        }
+
+
+def _backoff(failures: int, resp: Optional[httpx.Response], args) -> float:
+    """Seconds to wait after a failed upload: Retry-After when the gateway sent
+    one, else exponential from --poll-interval, capped at --max-backoff."""
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(args.poll_interval * 2 ** (failures - 1), args.max_backoff)
+
+
+async def _user(client: httpx.AsyncClient, recorder: Recorder, deadline: float, args) -> None:
+    resume = corpus.resume_text(args.size).encode("utf-8")
+    jd = corpus.job_description(args.size)
+    headers = {"Prefer": "respond-async"} if args.respond_async else {}
+    failures = 0
+    while time.perf_counter() < deadline:
+        flow_started = time.perf_counter()
+        started = time.perf_counter()
+        resp = None
+        try:
+            resp = await client.post(
+                "/upload",
+                files={"original_resume": ("resume.txt", resume, "text/plain")},
+                data={"job_description": jd},
+                headers=headers,
+            )
+        except httpx.HTTPError as exc:
+            recorder.record("upload", started, type(exc).__name__)
+        else:
+            recorder.record("upload", started, str(resp.status_code))
+        if resp is None or resp.status_code not in (200, 202):
+            # Every failure waits, so a failing gateway is not hammered in a tight loop.
+            failures += 1
+            await asyncio.sleep(_backoff(failures, resp, args))
+            continue
+        failures = 0
+
+        session_id = resp.json()["session_id"]
+        for _ in range(args.max_polls):
+            started = time.perf_counter()
+            try:
+                result = await client.get(f"/result/{session_id}")
+                recorder.record("result", started, str(result.status_code))
+            except httpx.HTTPError as exc:
+                recorder.record("result", started, type(exc).__name__)
+                recorder.record("flow", flow_started, type(exc).__name__)
+                break
+            if result.status_code == 200:
+                recorder.record("flow", flow_started, "200")
+                recorder.completed += 1
+                break
+            await asyncio.sleep(args.poll_interval)
+        else:
+            recorder.record("flow", flow_started, "timeout")
+
+
+async def run(args) -> Dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(_user(client, recorder, deadline, args) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    summary = recorder.summary(elapsed)
+    summary.update({"mode": args.mode, "url": args.url, "concurrency": args.concurrency, "size": args.size})
+    return summary
+
+
+def _print(summary: Dict) -> None:
+    print(
+        f"mode={summary['mode']} concurrency={summary['concurrency']} size={summary['size']} "
+        f"elapsed={summary['elapsed_s']}s flows={summary['completed_flows']} throughput={summary['throughput_rps']} flows/s"
+    )
+    print(f"{'step':8s} {'count':>7s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s} {'errors':>8s}  outcomes")
+    for step, stats in summary["steps"].items():
+        print(
+            f"{step:8s} {stats['count']:7d} {stats['p50_ms']:10.1f} {stats['p95_ms']:10.1f} {stats['p99_ms']:10.1f} "
+            f"{stats['error_rate']:8.2%}  {stats['outcomes']}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test /upload + /result against a running gateway.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mode", default="integrated", help="label for the report (integrated|microservice)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to keep starting new flows")
+    parser.add_argument("--size", default="typical", choices=list(corpus.SIZES))
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--max-polls", type=int, default=60)
+    parser.add_argument("--max-backoff", type=float, default=10.0, help="longest wait after failed uploads")
+    parser.add_argument("--respond-async", action="store_true", help="send Prefer: respond-async (uploads answer 202)")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args))
+    _print(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Local OpenAI-compatible stub for load testing without spending credits.
+
+Start it, then point the gateway / rewriter-service at it through the OpenAI
+client's standard base-URL variable:
+
+    uvicorn loadtest.stub_openai:app --port 9000 --workers 2
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=stub uvicorn main:app --port 8000
+
+Behaviour is configured with environment variables:
+
+    STUB_LATENCY      fixed:MS | uniform:LO,HI | lognormal:MEDIAN_MS,SIGMA   (default lognormal:8000,0.35)
+    STUB_TOKENS_PER_S streaming speed in completion tokens per second         (default 80)
+    STUB_429_RATE     fraction of requests answered with 429 + Retry-After   (default 0)
+    STUB_TIMEOUT_RATE fraction of requests that hang for STUB_TIMEOUT_S      (default 0)
+    STUB_TIMEOUT_S    how long a "timeout" request hangs                      (default 600)
+    STUB_RESUME_SIZE  corpus size used for the HTML body (small|typical|pathological)
+    STUB_SEED         seed for the latency/error RNG                         (default 0)
+    STUB_DOWN_MODELS  comma-separated models answered with 503 (LLM_MODELS cascade tests)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks import corpus
+
+LATENCY = os.getenv("STUB_LATENCY", "lognormal:8000,0.35")
+TOKENS_PER_SECOND = float(os.getenv("STUB_TOKENS_PER_S", "80"))
+RATE_LIMIT_RATE = float(os.getenv("STUB_429_RATE", "0"))
+TIMEOUT_RATE = float(os.getenv("STUB_TIMEOUT_RATE", "0"))
+TIMEOUT_SECONDS = float(os.getenv("STUB_TIMEOUT_S", "600"))
+DOWN_MODELS = {model.strip() for model in os.getenv("STUB_DOWN_MODELS", "").split(",") if model.strip()}
+RESUME_SIZE = os.getenv("STUB_RESUME_SIZE", "typical")
+
+_rng = random.Random(int(os.getenv("STUB_SEED", "0")))
+_html = corpus.llm_html(RESUME_SIZE)
+_payload_json = corpus.payload(RESUME_SIZE).model_dump_json()
+
+app = FastAPI(title="OpenAI stub")
+
+
+def _latency_seconds() -> float:
+    kind, _, params = LATENCY.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        ms = values[0]
+    elif kind == "uniform":
+        ms = _rng.uniform(values[0], values[1])
+    elif kind == "lognormal":
+        ms = _rng.lognormvariate(math.log(values[0]), values[1])
+    else:
+        raise ValueError(f"Unknown STUB_LATENCY distribution: {LATENCY}")
+    return ms / 1000
+
+
+_SECTION_MARKER = re.compile(r"<!-- section (\d+) --> \((\w+);[^\n]*\n(.*?)(?=\n\n<!-- section|\n\nTARGET JOB|\Z)", re.S)
+
+
+def _section_fragment(index: str, kind: str, text: str = "") -> str:
+    if kind == "header":
+        return '<div class="header"><h1>Jane Doe</h1><p class="title">Backend Engineer</p></div>'
+    if kind == "experience":
+        # Keep the role's title and company (the first two lines) so the gateway's validator accepts it.
+        lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith("-")] + ["", ""]
+        bullets = "".join(f"<li>Solved slow checkout {index}-{i} by caching in Redis, resulting in 30% faster pages</li>" for i in range(5))
+        return (
+            f'<div class="job"><div class="job-header"><span class="role">{lines[0]}</span><span class="dates">Jan 2020 - Dec 2021</span></div>'
+            f'<div class="job-meta"><span class="company">{lines[1]}</span><span class="location">Remote</span></div>'
+            f'<ul class="bullets">{bullets}</ul></div>'
+        )
+    return f'<section class="{kind}"><h2>{kind.upper()}</h2><p>Rewritten {kind}</p></section>'
+
+
+def _content_for(body: Dict[str, Any]) -> str:
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") != "json_object":
+        # Section rewrites (REWRITE_STRATEGY=sections) expect one fragment per marker.
+        messages = body.get("messages") or []
+        markers = _SECTION_MARKER.findall((messages[-1].get("content") or "") if messages else "")
+        if markers:
+            return "\n".join(f"<!-- section {index} -->\n{_section_fragment(index, kind, text)}" for index, kind, text in markers)
+        return _html
+
+    # The bullet-only agent sends INPUT_JSON with a "bullets" list and expects the same count back.
+    messages = body.get("messages") or []
+    last = (messages[-1].get("content") or "") if messages else ""
+    _, marker, raw = last.partition("INPUT_JSON:\n")
+    if marker:
+        try:
+            bullets = json.loads(raw).get("bullets")
+        except ValueError:
+            bullets = None
+        if isinstance(bullets, list):
+            return json.dumps({"bullets": [f"Solved {b[:40]} by automating checks, resulting in 30% faster cycles" for b in bullets]})
+    return _payload_json
+
+
+def _usage(body: Dict[str, Any], content: str) -> Dict[str, int]:
+    prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages") or [])
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(content) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _chunks(content: str, size: int = 16) -> List[str]:
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if body.get("model") in DOWN_MODELS:
+        return JSONResponse(
+            {"error": {"message": "The model is overloaded (stub)", "type": "server_error", "code": None}},
+            status_code=503,
+        )
+    roll = _rng.random()
+    if roll < RATE_LIMIT_RATE:
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    if roll < RATE_LIMIT_RATE + TIMEOUT_RATE:
+        await asyncio.sleep(TIMEOUT_SECONDS)
+
+    content = _content_for(body)
+    completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    model = body.get("model", "gpt-4o-mini")
+    usage = _usage(body, content)
+
+    if body.get("stream"):
+        async def events():
+            # Time-to-first-token, then a steady token rate for the rest.
+            await asyncio.sleep(_latency_seconds() * 0.1)
+            pieces = _chunks(content)
+            for index, piece in enumerate(pieces):
+                delta = {"content": piece}
+                if index == 0:
+                    delta["role"] = "assistant"
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                # ~4 characters per token
+                await asyncio.sleep(len(piece) / 4 / TOKENS_PER_SECOND)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(_latency_seconds())
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        ],
+        "usage": usage,
+    }
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "stub"}]}
@@ -1,47 +1,44 @@
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import httpx
+from fastapi.responses import FileResponse, JSONResponse, Response
+import asyncio
+import contextvars
+import io
 import os
 import uuid
 import time
 import base64
+import hashlib
 import json
 import re
 import logging
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Set, Tuple
 from threading import Lock
 from collections import Counter
 
-from models import UploadResponse
+from models import JobMatch, JobMatchResponse, JobPostingResponse, ResultStatusResponse, UploadResponse
+from utils.jd_index import JobIndex
+from utils.notify import Notifier
+from utils import capabilities, metrics, profiling, tracing
+from utils.admission import Overloaded, StageLimiter
 from utils.parser import parse_resume, parse_job_description
+from utils.routing import LLM_FALLBACKS, ModelRouter, estimate_tokens
+from utils.singleflight import SingleFlight, content_key
+from utils.scorer import score_text, tokenize
+from utils.session_db import SQLiteSessions
+from utils import responses, sections, validation
+from utils.uploads import UploadSizeLimitMiddleware
+from utils.warmup import CANNED_JOB_DESCRIPTION, CANNED_RESUME_HTML, Warmup
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try to import OpenAI and WeasyPrint for integrated mode
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("OpenAI not available. Install with: pip install openai")
-
-try:
-    from weasyprint import HTML
-    WEASYPRINT_AVAILABLE = True
-except (ImportError, OSError) as e:
-    WEASYPRINT_AVAILABLE = False
-    logger.warning(f"WeasyPrint not available: {e}. PDF generation will be disabled.")
-
-try:
-    import redis
-except Exception:
-    redis = None
-
 SESSION_TTL_SECONDS = 60 * 30
 REWRITER_URL = os.getenv("REWRITER_URL", None)  # None means use integrated mode
 PDF_URL = os.getenv("PDF_URL", None)  # None means use integrated mode
+JD_INDEX_PATH = os.getenv("JD_INDEX_PATH", None)  # None keeps the posting index in memory only
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", None)  # SQLite file shared by all workers when Redis is not used
 USE_MICROSERVICES = os.getenv("USE_MICROSERVICES", "false").lower() == "true"
 
 # If URLs are not set and microservices not explicitly enabled, use integrated mode
@@ -49,15 +46,90 @@ if not USE_MICROSERVICES:
     REWRITER_URL = None
     PDF_URL = None
 
+SERVICE_NAME = "gateway"
+REWRITE_MODE = "microservice" if REWRITER_URL else "integrated"
+PDF_MODE = "microservice" if PDF_URL else "integrated"
+IDEMPOTENCY_PREFIX = "idempotency:"
+# Redis sorted set of session ids scored by expiry, for counting live sessions.
+SESSION_INDEX_KEY = "sessions:live"
+SECTION_PREFIX = "section:"
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(SESSION_TTL_SECONDS)))
+# How long an in-progress claim survives a worker that died mid-upload.
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "180"))
+# "document" rewrites the whole resume in one completion; "sections" rewrites it
+# section by section (in parallel) and reuses cached sections whose inputs did
+# not change; "auto" uses sections for resumes with many roles and projects.
+REWRITE_STRATEGY = os.getenv("REWRITE_STRATEGY", "document")
+REWRITE_AUTO_MIN_ENTRIES = int(os.getenv("REWRITE_AUTO_MIN_ENTRIES", "6"))
+REWRITE_PARALLELISM = int(os.getenv("REWRITE_PARALLELISM", "8"))
+SECTION_CACHE_TTL_SECONDS = int(os.getenv("SECTION_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+# Rewrite with the local spaCy ResumeRewriter when every model in LLM_MODELS fails.
+LLM_LOCAL_FALLBACK = os.getenv("LLM_LOCAL_FALLBACK", "true").lower() == "true"
+# Answer /upload with a ResumeRewriter draft and replace it with the LLM rewrite
+# in the background (needs spaCy; uploads are tailored as usual without it).
+DRAFT_ENABLED = os.getenv("DRAFT_ENABLED", "false").lower() == "true"
+# Check the LLM's HTML against the template and re-generate only broken sections.
+REWRITE_REPAIR_ENABLED = os.getenv("REWRITE_REPAIR_ENABLED", "true").lower() == "true"
+# Upper bound for ?wait= on /result and /result/{id}/status.
+LONG_POLL_MAX_SECONDS = float(os.getenv("LONG_POLL_MAX_SECONDS", "60"))
+
+REWRITE_VALIDATIONS = metrics.counter(
+    "resumate_rewrite_validations_total",
+    "LLM rewrites by validation result (valid, repaired, partial, unrepaired, skipped).",
+    ("result",),
+)
+REWRITE_PROBLEMS = metrics.counter(
+    "resumate_rewrite_problems_total",
+    "Broken sections found in LLM rewrites, by problem (missing, class, placeholder, identity).",
+    ("problem",),
+)
+REPAIR_TOKENS_SAVED = metrics.counter(
+    "resumate_rewrite_repair_tokens_saved_total",
+    "Estimated tokens saved by repairing sections instead of regenerating the whole resume.",
+)
+IDEMPOTENT_REQUESTS = metrics.counter(
+    "resumate_idempotent_requests_total",
+    "Uploads carrying an Idempotency-Key, by outcome (new, replayed, attached, conflict).",
+    ("outcome",),
+)
+
+
+def _is_record_key(key: str) -> bool:
+    # Session ids are UUIDs; records (idempotency keys, cached sections) are prefixed.
+    return ":" in key
+
 
 class SessionStore:
     def __init__(self):
         self._lock = Lock()
         self._in_memory: Dict[str, Dict[str, Any]] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
         redis_url = os.getenv("REDIS_URL")
-        self._redis = redis.from_url(redis_url, decode_responses=True) if redis_url and redis else None
+        redis = capabilities.load("redis") if redis_url else None
+        self._redis = redis.from_url(redis_url, decode_responses=True) if redis else None
+        # Precompressed /result bodies are binary, so they need a client that does not decode.
+        self._redis_bytes = redis.from_url(redis_url) if redis else None
+        self._db = SQLiteSessions(SESSION_DB_PATH) if SESSION_DB_PATH and not self._redis else None
 
-    def save(self, session_id: str, html: str, pdf_b64: str, ats_score: int, transformations: list, keywords_matched: list, keywords_missing: list) -> None:
+    @property
+    def backend(self) -> str:
+        if self._redis:
+            return "redis"
+        return "sqlite" if self._db else "memory"
+
+    def save(
+        self,
+        session_id: str,
+        html: str,
+        pdf_b64: str,
+        ats_score: int,
+        transformations: list,
+        keywords_matched: list,
+        keywords_missing: list,
+        status: str = "ready",
+        version: int = 1,
+    ) -> Dict[str, Any]:
+        """Store a finished result; returns its metadata record."""
         data = {
             "html": html,
             "pdf": pdf_b64,
@@ -67,16 +139,72 @@ class SessionStore:
             "keywords_missing": keywords_missing,
             "expires_at": time.time() + SESSION_TTL_SECONDS,
         }
+        # Encode and compress the /result body once here instead of on every poll.
+        body = responses.dumps(_result_payload(session_id, data))
+        bodies = responses.precompress(body)
+        # Small record for status polls and conditional GETs; never loads the blobs.
+        meta = {
+            "status": status,
+            "stage": status,
+            "ats_score": ats_score,
+            "version": version,
+            "etag": responses.content_hash(body),
+            "encodings": list(bodies),
+        }
         if self._redis:
-            self._redis.setex(session_id, SESSION_TTL_SECONDS, json.dumps(data))
+            pipe = self._redis_bytes.pipeline()
+            self._index(pipe, session_id)
+            pipe.setex(session_id, SESSION_TTL_SECONDS, json.dumps(data))
+            pipe.setex(f"{session_id}:meta", SESSION_TTL_SECONDS, json.dumps(meta))
+            for encoding, body in bodies.items():
+                pipe.setex(f"{session_id}:body:{encoding}", SESSION_TTL_SECONDS, body)
+            pipe.execute()
+        elif self._db:
+            # The PDF goes in its own table as raw bytes.
+            data.pop("pdf")
+            self._db.save(session_id, data, base64.b64decode(pdf_b64) if pdf_b64 else b"", SESSION_TTL_SECONDS, bodies, meta)
         else:
+            data["bodies"] = bodies
+            data["meta"] = meta
             with self._lock:
                 self._in_memory[session_id] = data
+        return meta
+
+    def put_meta(self, session_id: str, meta: Dict[str, Any]) -> None:
+        """Store only the metadata record; a stored result (a draft) and its bodies stay in place."""
+        if self._redis:
+            pipe = self._redis.pipeline()
+            self._index(pipe, session_id)
+            pipe.setex(f"{session_id}:meta", SESSION_TTL_SECONDS, json.dumps(meta))
+            pipe.execute()
+        elif self._db:
+            self._db.put_meta(session_id, meta, SESSION_TTL_SECONDS)
+        else:
+            with self._lock:
+                entry = self._in_memory.setdefault(session_id, {})
+                entry["meta"] = meta
+                entry["expires_at"] = time.time() + SESSION_TTL_SECONDS
+
+    @staticmethod
+    def _index(pipe, session_id: str) -> None:
+        """Add a Redis session to the live-session index, dropping expired ones."""
+        now = time.time()
+        pipe.zremrangebyscore(SESSION_INDEX_KEY, "-inf", now)
+        pipe.zadd(SESSION_INDEX_KEY, {session_id: now + SESSION_TTL_SECONDS})
+        pipe.expire(SESSION_INDEX_KEY, SESSION_TTL_SECONDS)
 
     def fetch(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if _is_record_key(session_id):
+            return None
         if self._redis:
             raw = self._redis.get(session_id)
             return json.loads(raw) if raw else None
+        if self._db:
+            data = self._db.fetch(session_id)
+            if data is not None:
+                pdf = self._db.fetch_pdf(session_id)
+                data["pdf"] = base64.b64encode(pdf).decode("utf-8") if pdf else ""
+            return data
 
         with self._lock:
             data = self._in_memory.get(session_id)
@@ -87,16 +215,112 @@ class SessionStore:
                 return None
             return data
 
+    def fetch_meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Status, score, version and ETag of a session, or None if it has none."""
+        if _is_record_key(session_id):
+            return None
+        if self._redis:
+            raw = self._redis.get(f"{session_id}:meta")
+            return json.loads(raw) if raw else None
+        if self._db:
+            return self._db.fetch_meta(session_id)
+        data = self.fetch(session_id)
+        return data.get("meta") if data else None
+
+    def fetch_body(self, session_id: str, encoding: str) -> Optional[bytes]:
+        """The stored /result body in ``encoding``, or None if the session has none."""
+        if _is_record_key(session_id):
+            return None
+        if self._redis:
+            return self._redis_bytes.get(f"{session_id}:body:{encoding}")
+        if self._db:
+            return self._db.fetch_body(session_id, encoding)
+        data = self.fetch(session_id)
+        return data.get("bodies", {}).get(encoding) if data else None
+
+    def claim(self, key: str, ttl: int) -> Optional[Dict[str, Any]]:
+        """Atomically mark ``key`` in progress; returns the existing record if already claimed."""
+        marker = {"status": "in_progress"}
+        if self._redis:
+            if self._redis.set(key, json.dumps(marker), nx=True, ex=ttl):
+                return None
+            raw = self._redis.get(key)
+            # Expired between the two calls: report in progress and let the caller retry.
+            return json.loads(raw) if raw else marker
+        if self._db:
+            return self._db.claim(key, marker, ttl)
+
+        with self._lock:
+            existing = self._records.get(key)
+            if existing and existing["expires_at"] >= time.time():
+                return existing
+            self._records[key] = {**marker, "expires_at": time.time() + ttl}
+            return None
+
+    def get_record(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._redis:
+            raw = self._redis.get(key)
+            return json.loads(raw) if raw else None
+        if self._db:
+            return self._db.fetch_record(key)
+        with self._lock:
+            record = self._records.get(key)
+            return record if record and record["expires_at"] >= time.time() else None
+
+    def put_record(self, key: str, record: Dict[str, Any], ttl: int) -> None:
+        if self._redis:
+            self._redis.setex(key, ttl, json.dumps(record))
+            return
+        if self._db:
+            self._db.put_record(key, record, ttl)
+            return
+        with self._lock:
+            self._records[key] = {**record, "expires_at": time.time() + ttl}
+
+    def delete_record(self, key: str) -> None:
+        if self._redis:
+            self._redis.delete(key)
+            return
+        if self._db:
+            self._db.delete_record(key)
+            return
+        with self._lock:
+            self._records.pop(key, None)
+
+    def size(self) -> int:
+        """Live sessions, finished or in progress; records and per-encoding bodies are not counted."""
+        if self._redis:
+            pipe = self._redis.pipeline()
+            pipe.zremrangebyscore(SESSION_INDEX_KEY, "-inf", time.time())
+            pipe.zcard(SESSION_INDEX_KEY)
+            return pipe.execute()[1]
+        if self._db:
+            return self._db.size()
+        now = time.time()
+        with self._lock:
+            return sum(1 for entry in self._in_memory.values() if entry["expires_at"] >= now)
+
     def purge_expired(self) -> None:
         if self._redis:
             return
+        if self._db:
+            self._db.purge_expired()
+            return
         with self._lock:
-            expired = [key for key, value in self._in_memory.items() if value["expires_at"] < time.time()]
-            for key in expired:
-                self._in_memory.pop(key, None)
+            now = time.time()
+            for entries in (self._in_memory, self._records):
+                expired = [key for key, value in entries.items() if value["expires_at"] < now]
+                for key in expired:
+                    entries.pop(key, None)
 
 
 app = FastAPI(title="Resumate AI Gateway", version="0.1.0")
+# The last middleware added is the outermost: CORS wraps everything, so early
+# rejections (413, 503) still carry Access-Control-Allow-Origin.
+app.add_middleware(UploadSizeLimitMiddleware)
+app.add_middleware(metrics.MetricsMiddleware, service=SERVICE_NAME)
+app.add_middleware(profiling.ProfilingMiddleware, service=SERVICE_NAME)
+app.add_middleware(tracing.TracingMiddleware, service=SERVICE_NAME)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -105,28 +329,139 @@ app.add_middleware(
 )
 
 session_store = SessionStore()
+metrics.SESSION_STORE_SIZE.set_function(session_store.size, backend=session_store.backend)
+job_index = JobIndex(JD_INDEX_PATH)
+single_flight = SingleFlight(session_store._redis)
+notifier = Notifier(session_store._redis)
+llm_router = ModelRouter(SERVICE_NAME, mode=REWRITE_MODE)
+# Uploads finishing after a 202 response; referenced so they are not garbage-collected.
+_background_uploads: Set[asyncio.Task] = set()
+
+# One pooled client for rewriter-service/pdf-service calls; the hook adds traceparent.
+_service_client = None
+
+
+def _get_service_client():
+    global _service_client
+    if _service_client is None:
+        httpx = capabilities.require("httpx")
+        _service_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            event_hooks={"request": [tracing.httpx_request_hook, profiling.httpx_request_hook]},
+        )
+    return _service_client
+
+
+# Admission control: per-stage concurrency with a bounded, deadline-limited queue.
+# Parse and rewrite refuse with 503 when full; the PDF stage waits longer and, if
+# it still gets no slot, the upload completes without a PDF.
+admission_limits = {
+    "parse": StageLimiter.from_env("parse", max_in_flight=8, max_queue=16, queue_timeout=5),
+    "rewrite": StageLimiter.from_env("rewrite", max_in_flight=16, max_queue=32, queue_timeout=10),
+    "pdf": StageLimiter.from_env("pdf", max_in_flight=4, max_queue=32, queue_timeout=20),
+}
+
+
+@app.exception_handler(Overloaded)
+async def _overloaded(request: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        {"detail": f"Server is busy ({exc.stage}). Please retry in {exc.retry_after}s."},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("startup")
+async def _size_thread_pool() -> None:
+    # Integrated parse/rewrite/PDF run in worker threads; give every admitted slot a thread.
+    workers = sum(max(limiter.max_in_flight, 0) for limiter in admission_limits.values()) + 4
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(workers, 8)))
+
+
+@app.on_event("shutdown")
+async def _close_service_client() -> None:
+    if _service_client is not None:
+        await _service_client.aclose()
+    tracing.flush()
 
 
 # Integrated rewriter function (used when REWRITER_URL is not set)
+_openai_client = None
+
+
 def _get_openai_client():
-    """Get OpenAI client, raising clear error if API key is missing."""
+    """Get the shared OpenAI client, raising clear error if API key is missing.
+
+    One client per process keeps its TLS connections alive between uploads
+    (and lets warmup open them before the first one).
+    """
+    global _openai_client
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY environment variable is not set. Please configure it.")
-    import httpx
-    http_client = httpx.Client(timeout=120.0)
-    return OpenAI(api_key=api_key, http_client=http_client)
+    if _openai_client is None:
+        OpenAI = capabilities.require("openai")
+        httpx = capabilities.require("httpx")
+        http_client = httpx.Client(timeout=120.0)
+        _openai_client = OpenAI(api_key=api_key, http_client=http_client)
+    return _openai_client
 
 
-def _rewrite_resume_integrated(resume_text: str, job_description: str) -> Dict[str, Any]:
-    """Rewrite resume using OpenAI directly (integrated mode)."""
-    if not OPENAI_AVAILABLE:
-        raise HTTPException(
-            status_code=503,
-            detail="OpenAI library not available. Install with: pip install openai"
-        )
-    
-    system_prompt = """You are a recruiter-proof resume editor. Output ONLY valid HTML with embedded CSS—no markdown, no explanations.
+def _analyze_rewrite(resume_text: str, job_description: str, html_resume: str) -> Dict[str, Any]:
+    """Score an LLM rewrite and summarise its keyword coverage and transformations."""
+    # Analyze transformations and keywords
+    resume_lower = resume_text.lower()
+    jd_lower = job_description.lower()
+    html_lower = html_resume.lower()
+
+    # Extract keywords from job description (meaningful words only)
+    jd_words = set(tokenize(jd_lower))
+    html_words = set(tokenize(html_lower))
+    original_words = set(tokenize(resume_lower))
+
+    # Keywords matched in rewritten resume
+    keywords_matched = sorted(list(jd_words & html_words), key=lambda x: (-html_lower.count(x), x))[:30]
+
+    # Keywords missing from rewritten resume
+    keywords_missing = sorted(list(jd_words - html_words), key=lambda x: (-jd_lower.count(x), x))[:30]
+
+    # Generate real transformations based on analysis
+    transformations = []
+
+    html_bullets = len(re.findall(r'<li>', html_resume))
+    if html_bullets > 0:
+        transformations.append(f"Rewrote {html_bullets} bullet points into ATS-friendly 'Solved X by Y, resulting in Z' structure")
+
+    new_keywords = html_words - original_words
+    if len(new_keywords & jd_words) > 0:
+        transformations.append(f"Added {len(new_keywords & jd_words)} job-relevant keywords to align with job description")
+
+    metrics_found = len(re.findall(r'\d+%|\$\d+|\d+\s*(?:hours?|days?|months?|years?|people|users|team)', html_resume, re.IGNORECASE))
+    if metrics_found > 0:
+        transformations.append(f"Included {metrics_found} quantifiable metrics to demonstrate impact")
+
+    if '<section class="experience">' in html_resume:
+        transformations.append("Structured resume with proper HTML formatting for ATS parsing")
+
+    if not transformations:
+        transformations = [
+            "Rewrote bullets into ATS-friendly 'Solved X by Y, resulting in Z' structure",
+            "Aligned skills and experience with job description keywords",
+            "Generated HTML resume matching the target format"
+        ]
+
+    # Same deterministic engine as the agents and the other deployment mode
+    ats_score = score_text(html_resume, job_description)
+
+    return {
+        "ats_score": ats_score,
+        "transformations": transformations,
+        "keywords_matched": keywords_matched,
+        "keywords_missing": keywords_missing,
+    }
+
+
+REWRITE_SYSTEM_PROMPT = """You are a recruiter-proof resume editor. Output ONLY valid HTML with embedded CSS—no markdown, no explanations.
 
 CRITICAL: The HTML structure MUST match EXACTLY. Use the exact class names and structure shown below.
 
@@ -390,15 +725,16 @@ Original: "Developed web applications using React and Node.js"
 Bad: "Solved web application development by using React and Node.js, resulting in successful deployment"
 (Too similar to original, lacks specificity, no real metric)"""
 
-    try:
-        client = _get_openai_client()
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": f"""You are rewriting a resume to match a job description. 
+
+def _rewrite_document(client, resume_text: str, job_description: str) -> str:
+    """One completion that rewrites the whole resume into HTML."""
+    completion, _ = llm_router.complete(
+        client,
+        [
+            {"role": "system", "content": REWRITE_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""You are rewriting a resume to match a job description. 
 
 CRITICAL: You must COMPLETELY TRANSFORM every bullet point. Do not copy the original text. Use different words, phrases, and structures. Ensure ZERO repetition across bullets.
 
@@ -418,70 +754,277 @@ INSTRUCTIONS:
 7. Output the complete HTML resume following the exact structure provided in the system prompt
 
 Rewrite the resume now:""",
-                },
-            ],
-            temperature=0.7,
-        )
+            },
+        ],
+        work_text=resume_text,
+        temperature=0.7,
+    )
 
-        html_resume = completion.choices[0].message.content.strip()
-        
-        # Clean up any markdown code blocks if OpenAI wrapped it
-        if html_resume.startswith("```"):
-            lines = html_resume.split("\n")
-            html_resume = "\n".join(lines[1:-1]) if lines[-1].strip() == "```" else "\n".join(lines[1:])
-        
-        # Analyze transformations and keywords
-        resume_lower = resume_text.lower()
-        jd_lower = job_description.lower()
-        html_lower = html_resume.lower()
-        
-        # Extract keywords from job description (meaningful words only)
-        jd_words = set(re.findall(r'\b\w{4,}\b', jd_lower))
-        html_words = set(re.findall(r'\b\w{4,}\b', html_lower))
-        original_words = set(re.findall(r'\b\w{4,}\b', resume_lower))
-        
-        # Keywords matched in rewritten resume
-        keywords_matched = sorted(list(jd_words & html_words), key=lambda x: (-html_lower.count(x), x))[:30]
-        
-        # Keywords missing from rewritten resume
-        keywords_missing = sorted(list(jd_words - html_words), key=lambda x: (-jd_lower.count(x), x))[:30]
-        
-        # Generate real transformations based on analysis
-        transformations = []
-        
-        html_bullets = len(re.findall(r'<li>', html_resume))
-        if html_bullets > 0:
-            transformations.append(f"Rewrote {html_bullets} bullet points into ATS-friendly 'Solved X by Y, resulting in Z' structure")
-        
-        new_keywords = html_words - original_words
-        if len(new_keywords & jd_words) > 0:
-            transformations.append(f"Added {len(new_keywords & jd_words)} job-relevant keywords to align with job description")
-        
-        metrics_found = len(re.findall(r'\d+%|\$\d+|\d+\s*(?:hours?|days?|months?|years?|people|users|team)', html_resume, re.IGNORECASE))
-        if metrics_found > 0:
-            transformations.append(f"Included {metrics_found} quantifiable metrics to demonstrate impact")
-        
-        if '<section class="experience">' in html_resume:
-            transformations.append("Structured resume with proper HTML formatting for ATS parsing")
-        
-        if not transformations:
-            transformations = [
-                "Rewrote bullets into ATS-friendly 'Solved X by Y, resulting in Z' structure",
-                "Aligned skills and experience with job description keywords",
-                "Generated HTML resume matching the target format"
-            ]
-        
-        # Calculate ATS score based on keyword overlap
-        overlap = len(jd_words & html_words)
-        ats_score = min(95, max(80, int(80 + (overlap / max(len(jd_words), 1)) * 15)))
+    html_resume = completion.choices[0].message.content.strip()
+    
+    # Clean up any markdown code blocks if OpenAI wrapped it
+    if html_resume.startswith("```"):
+        lines = html_resume.split("\n")
+        html_resume = "\n".join(lines[1:-1]) if lines[-1].strip() == "```" else "\n".join(lines[1:])
+    return html_resume
 
-        return {
-            "html_resume": html_resume,
-            "ats_score": ats_score,
-            "transformations": transformations,
-            "keywords_matched": keywords_matched,
-            "keywords_missing": keywords_missing
-        }
+
+# Same rules and template, so providers that cache prompt prefixes reuse it across both strategies.
+SECTION_SYSTEM_PROMPT = REWRITE_SYSTEM_PROMPT + """
+
+SECTION MODE:
+You receive only some sections of the resume. Each one starts with a marker such as <!-- section 3 -->, followed by its kind and the HTML fragment to return.
+- Rewrite every section you receive following all the rules above.
+- For each section, output its marker on its own line, then ONLY that section's HTML fragment with the exact class names from the template.
+- Do not output the <style> tag, the <div class="resume"> wrapper, or any section you were not given."""
+_section_pool = ThreadPoolExecutor(max_workers=max(REWRITE_PARALLELISM, 1) * 4, thread_name_prefix="section-rewrite")
+REWRITE_CSS = re.search(r"<style>.*?</style>", REWRITE_SYSTEM_PROMPT, re.S).group(0)
+# Editing the prompt or the model invalidates every cached section.
+_SECTION_CACHE_VERSION = content_key(llm_router.version, SECTION_SYSTEM_PROMPT)[:16]
+# Every class the template defines; anything else is a mangled class name.
+TEMPLATE_CLASSES = frozenset(
+    cls for value in re.findall(r'class="([^"]+)"', REWRITE_SYSTEM_PROMPT) for cls in value.split()
+) | frozenset(re.findall(r"\.([a-zA-Z][\w-]*)", REWRITE_CSS))
+
+
+def _complete_sections(client, batch: List[sections.Section], job_description: str) -> Dict[int, str]:
+    """One completion rewriting ``batch``; returns the fragments it produced by section index."""
+    tracing.set_attribute("sections", len(batch))
+    completion, _ = llm_router.complete(
+        client,
+        [
+            {"role": "system", "content": SECTION_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""Rewrite these resume sections to match the job description.
+
+RESUME SECTIONS:
+{sections.prompt_block(batch)}
+
+TARGET JOB DESCRIPTION:
+{job_description}
+
+Return every section's marker followed by its HTML fragment:""",
+            },
+        ],
+        work_text="\n".join(part.text for part in batch),
+        temperature=0.7,
+    )
+
+    return sections.parse_fragments(completion.choices[0].message.content)
+
+
+def _complete_batches(client, parts: List[sections.Section], job_description: str) -> Dict[int, str]:
+    """Rewrite ``parts`` in up to REWRITE_PARALLELISM concurrent completions of similar length.
+
+    A batch that fails (timeout, or an error after the whole cascade) is left
+    out of the result rather than failing the others. When every batch fails,
+    the last error is raised.
+    """
+    batches = sections.balance(parts, REWRITE_PARALLELISM)
+    if len(batches) == 1:
+        calls = [lambda: _complete_sections(client, batches[0], job_description)]
+    else:
+        # Each batch is its own completion; wall time is about that of the longest batch.
+        futures = [
+            _section_pool.submit(contextvars.copy_context().run, _complete_sections, client, batch, job_description)
+            for batch in batches
+        ]
+        calls = [future.result for future in futures]
+    generated: Dict[int, str] = {}
+    failure: Optional[Exception] = None
+    for batch, call in zip(batches, calls):
+        try:
+            generated.update(call())
+        except Exception as e:
+            logger.warning(f"Rewriting sections {[part.index for part in batch]} failed: {e}")
+            failure = e
+    if failure is not None and not generated:
+        raise failure
+    return generated
+
+
+def _rephrase_repeated(client, parts: List[sections.Section], fragments: Dict[int, str], job_description: str) -> Dict[int, str]:
+    """Cheap final pass: reword bullets that repeat phrasing from another section.
+
+    Sections rewritten by separate completions (or taken from the cache) never
+    saw each other, so the prompt's no-repetition rule only held within each.
+    """
+    repeated = sections.repeated_bullets(parts, fragments)
+    tracing.set_attribute("repeated_bullets", len(repeated))
+    if not repeated:
+        return fragments
+    others = [bullet for part in parts for bullet in re.findall(r"<li>(.*?)</li>", fragments[part.index], re.S)]
+    user_payload = {
+        "job_description": job_description[:2000],
+        "bullets": [bullet for _, bullet in repeated],
+        "avoid_phrases_from": [bullet for bullet in others if bullet not in {b for _, b in repeated}],
+    }
+    try:
+        with metrics.stage(SERVICE_NAME, "dedupe", REWRITE_MODE):
+            completion, _ = llm_router.complete(
+                client,
+                [
+                    {
+                        "role": "system",
+                        "content": (
+                            "You reword resume bullets that repeat phrasing used elsewhere in the resume.\n"
+                            "Keep every fact, tool and metric; change the wording so no four-word phrase is shared with\n"
+                            "the bullets in avoid_phrases_from. Return one bullet per input bullet, in the same order, as\n"
+                            'STRICT JSON: {"bullets": ["..."]}'
+                        ),
+                    },
+                    {"role": "user", "content": f"INPUT_JSON:\n{json.dumps(user_payload, ensure_ascii=False)}"},
+                ],
+                work_text="\n".join(user_payload["bullets"]),
+                response_format={"type": "json_object"},
+            )
+        rewritten = json.loads(completion.choices[0].message.content or "{}").get("bullets") or []
+    except Exception as e:
+        logger.warning(f"Repetition pass failed, keeping the merged sections: {e}")
+        return fragments
+    if len(rewritten) != len(repeated):
+        return fragments
+    return sections.replace_bullets(
+        fragments, [(index, old, str(new)) for (index, old), new in zip(repeated, rewritten)]
+    )
+
+
+def _rewrite_by_section(client, resume_text: str, job_description: str, min_entries: int = 0) -> Optional[str]:
+    """Rewrite only the sections whose text or relevant JD terms changed since
+    they were last tailored; the rest come from the section cache.
+
+    Changed sections are spread over up to REWRITE_PARALLELISM concurrent
+    completions, then a cheap pass rewords bullets repeated across sections.
+    Returns None when the resume cannot be split into sections (or has fewer
+    than ``min_entries`` roles and projects), or when a section is missing
+    because the model dropped it or its batch failed, so the caller rewrites
+    the whole document instead. Sections that did succeed are still cached.
+    When no batch succeeded at all, the error is raised instead: the document
+    rewrite would run the same failing cascade again.
+    """
+    parts = sections.split_sections(resume_text)
+    if not parts or sum(part.kind in ("experience", "projects") for part in parts) < min_entries:
+        return None
+    features = sections.jd_features(job_description)
+    keys = {
+        part.index: SECTION_PREFIX
+        + content_key(_SECTION_CACHE_VERSION, part.fragment, part.text, *sections.relevant_features(part, features))
+        for part in parts
+    }
+
+    fragments: Dict[int, str] = {}
+    for part in parts:
+        record = session_store.get_record(keys[part.index])
+        metrics.record_cache("resume_section", record is not None)
+        if record:
+            fragments[part.index] = record["html"]
+    missing = [part for part in parts if part.index not in fragments]
+    tracing.set_attribute("sections_reused", len(parts) - len(missing))
+
+    generated = _complete_batches(client, missing, job_description) if missing else {}
+    for part in missing:
+        if part.index in generated:
+            fragments[part.index] = generated[part.index]
+            # Broken fragments are repaired after assembly; only cache good ones.
+            if not validation.check(part, generated[part.index], TEMPLATE_CLASSES):
+                session_store.put_record(keys[part.index], {"html": generated[part.index]}, SECTION_CACHE_TTL_SECONDS)
+    lost = [part.index for part in missing if part.index not in fragments]
+    if lost:
+        logger.warning(f"Section rewrite returned nothing for sections {lost}; rewriting the whole resume")
+        return None
+    fragments = _rephrase_repeated(client, parts, fragments, job_description)
+    return sections.assemble(REWRITE_CSS, parts, fragments)
+
+
+def _validate_and_repair(client, resume_text: str, job_description: str, html_resume: str) -> str:
+    """Check the rewrite against the template and the original resume; re-generate
+    only the broken sections and splice them in.
+
+    Returns ``html_resume`` untouched when it is valid, cannot be lined up with
+    the original's sections, or cannot be repaired.
+    """
+    parts = sections.split_sections(resume_text)
+    if not parts:
+        REWRITE_VALIDATIONS.inc(result="skipped")
+        return html_resume
+    with metrics.stage(SERVICE_NAME, "validate", REWRITE_MODE):
+        fragments, problems = validation.validate(parts, html_resume, TEMPLATE_CLASSES)
+    if not problems:
+        REWRITE_VALIDATIONS.inc(result="valid")
+        return html_resume
+
+    for problem in problems:
+        REWRITE_PROBLEMS.inc(problem=problem.kind)
+    broken = [part for part in parts if part.index in {problem.index for problem in problems}]
+    logger.warning(f"Rewrite failed validation in {len(broken)} of {len(parts)} sections: {problems[:5]}")
+    tracing.set_attribute("repaired_sections", len(broken))
+    try:
+        # One completion: each batch would resend the long system prompt.
+        with metrics.stage(SERVICE_NAME, "repair", REWRITE_MODE):
+            generated = _complete_sections(client, broken, job_description)
+    except Exception as e:
+        logger.warning(f"Section repair failed: {e}")
+        REWRITE_VALIDATIONS.inc(result="unrepaired")
+        return html_resume
+
+    fixed = 0
+    for part in broken:
+        fragment = generated.get(part.index)
+        if fragment and not validation.check(part, fragment, TEMPLATE_CLASSES):
+            fragments[part.index] = fragment
+            fixed += 1
+    if any(part.index not in fragments for part in parts):
+        REWRITE_VALIDATIONS.inc(result="unrepaired")
+        return html_resume
+    REWRITE_VALIDATIONS.inc(result="repaired" if fixed == len(broken) else "partial")
+    # A full retry resends the whole prompt and regenerates the whole resume.
+    full_retry = estimate_tokens(REWRITE_SYSTEM_PROMPT + resume_text + job_description + html_resume)
+    repair = estimate_tokens(SECTION_SYSTEM_PROMPT + job_description + sections.prompt_block(broken)) + sum(
+        estimate_tokens(fragment) for fragment in generated.values()
+    )
+    REPAIR_TOKENS_SAVED.inc(max(full_retry - repair, 0))
+    return sections.assemble(REWRITE_CSS, parts, fragments)
+
+
+def _rewrite_locally(resume_text: str, job_description: str) -> Optional[str]:
+    """The deterministic spaCy rewriter, rendered into the template's HTML.
+
+    Used for drafts and as the last tier of the LLM cascade. None when spaCy
+    or its model is not installed.
+    """
+    rewriter = capabilities.load("resume_rewriter")
+    if rewriter is None:
+        return None
+    with metrics.stage(SERVICE_NAME, "local_rewrite", REWRITE_MODE):
+        payload = rewriter.rewrite(resume_text, job_description)
+    return sections.render_payload(REWRITE_CSS, payload)
+
+
+def _rewrite_resume_integrated(
+    resume_text: str, job_description: str, local_fallback: bool = LLM_LOCAL_FALLBACK
+) -> Dict[str, Any]:
+    """Rewrite resume using OpenAI directly (integrated mode)."""
+    if not capabilities.available("openai"):
+        raise HTTPException(
+            status_code=503,
+            detail="OpenAI library not available. Install with: pip install openai"
+        )
+
+    try:
+        client = _get_openai_client()
+        html_resume = None
+        if REWRITE_STRATEGY == "sections":
+            html_resume = _rewrite_by_section(client, resume_text, job_description)
+        elif REWRITE_STRATEGY == "auto":
+            html_resume = _rewrite_by_section(client, resume_text, job_description, min_entries=REWRITE_AUTO_MIN_ENTRIES)
+        if html_resume is None:
+            html_resume = _rewrite_document(client, resume_text, job_description)
+        if REWRITE_REPAIR_ENABLED:
+            html_resume = _validate_and_repair(client, resume_text, job_description, html_resume)
+        with metrics.stage(SERVICE_NAME, "keyword_analysis", REWRITE_MODE):
+            analysis = _analyze_rewrite(resume_text, job_description, html_resume)
+        return {"html_resume": html_resume, **analysis}
     except RuntimeError as e:
         if "OPENAI_API_KEY" in str(e):
             raise HTTPException(
@@ -496,14 +1039,19 @@ Rewrite the resume now:""",
                 status_code=401,
                 detail=f"OpenAI API authentication failed: {error_msg}. Please check your OPENAI_API_KEY."
             )
-        raise HTTPException(status_code=500, detail=f"OpenAI error: {error_msg}")
+        html_resume = _rewrite_locally(resume_text, job_description) if local_fallback else None
+        if html_resume is None:
+            raise HTTPException(status_code=500, detail=f"OpenAI error: {error_msg}")
+        logger.warning(f"Every LLM model failed ({error_msg}); used the local rewriter")
+        LLM_FALLBACKS.inc(service=SERVICE_NAME, from_model=llm_router.version, to="local")
+        tracing.set_attribute("llm_route", "local")
+        with metrics.stage(SERVICE_NAME, "keyword_analysis", REWRITE_MODE):
+            analysis = _analyze_rewrite(resume_text, job_description, html_resume)
+        return {"html_resume": html_resume, **analysis}
 
 
-def _generate_pdf_integrated(html_content: str) -> bytes:
-    """Generate PDF from HTML using WeasyPrint directly (integrated mode)."""
-    if not WEASYPRINT_AVAILABLE:
-        raise ValueError("WeasyPrint not available")
-    
+def _wrap_html_for_pdf(html_content: str) -> str:
+    """Wrap an LLM resume fragment in a full HTML document with print CSS."""
     # Ensure HTML has proper structure for WeasyPrint
     html_content = html_content.strip()
     
@@ -573,8 +1121,20 @@ def _generate_pdf_integrated(html_content: str) -> bytes:
 </body>
 </html>"""
     
-    html_doc = HTML(string=html_content)
-    pdf_bytes = html_doc.write_pdf()
+    return html_content
+
+
+def _generate_pdf_integrated(html_content: str) -> bytes:
+    """Generate PDF from HTML using WeasyPrint directly (integrated mode)."""
+    HTML = capabilities.load("weasyprint")
+    if HTML is None:
+        raise ValueError("WeasyPrint not available")
+
+    with metrics.stage(SERVICE_NAME, "html_wrap", PDF_MODE):
+        html_content = _wrap_html_for_pdf(html_content)
+    with metrics.stage(SERVICE_NAME, "pdf_render", PDF_MODE):
+        html_doc = HTML(string=html_content)
+        pdf_bytes = html_doc.write_pdf()
     
     if len(pdf_bytes) == 0:
         raise ValueError("Generated PDF is empty")
@@ -582,91 +1142,346 @@ def _generate_pdf_integrated(html_content: str) -> bytes:
     return pdf_bytes
 
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload_resume(
-    original_resume: UploadFile = File(...),
-    job_description: Optional[str] = Form(None),
-    job_description_file: Optional[UploadFile] = File(None),
-) -> JSONResponse:
-    resume_text = parse_resume(original_resume)
-    jd_text, _ = parse_job_description(job_description, job_description_file)
+def _status_payload(session_id: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    return ResultStatusResponse(
+        session_id=session_id,
+        status=meta["status"],
+        stage=meta.get("stage"),
+        ats_score=meta.get("ats_score", 0),
+        version=meta.get("version", 0),
+    ).model_dump()
+
+
+def _status_digest(meta: Dict[str, Any]) -> str:
+    # A draft keeps its body ETag while later stages run, so the status has its own.
+    return responses.content_hash(f"{meta['etag']}:{meta['status']}:{meta.get('stage')}".encode("utf-8"))
+
+
+def _advance(session_id: str, stage: str, status: str = "processing", **extra: Any) -> None:
+    """Record a pipeline stage of an unfinished session and notify its watchers.
+
+    Blocks on the session store and Redis; call it with ``asyncio.to_thread``.
+    """
+    current = session_store.fetch_meta(session_id)
+    if current and current["status"] == "draft":
+        # The stored draft (and its ETag) stays the result until the final rewrite replaces it.
+        meta = {**current, "stage": stage, **extra}
+        if status != "processing":
+            meta["status"] = status
+    else:
+        etag = responses.content_hash(f"{session_id}:{stage}".encode("utf-8"))
+        meta = {"status": status, "stage": stage, "ats_score": 0, "version": 0, "etag": etag, **extra}
+    session_store.put_meta(session_id, meta)
+    notifier.publish(session_id, _status_payload(session_id, meta))
+
+
+async def _render_pdf(html_resume: str) -> str:
+    """The resume's PDF as base64; empty when rendering fails."""
+    pdf_b64 = ""
+    if PDF_URL:
+        # Microservice mode: call external PDF service
+        client = _get_service_client()
+        try:
+            async with admission_limits["pdf"].slot():
+                with metrics.stage(SERVICE_NAME, "pdf", PDF_MODE):
+                    pdf_resp = await client.post(
+                        PDF_URL,
+                        json={"html_content": html_resume},
+                        timeout=30.0,
+                    )
+            if pdf_resp.status_code == 200:
+                pdf_b64 = base64.b64encode(pdf_resp.content).decode("utf-8")
+        except Exception as e:
+            logger.warning(f"PDF service failed: {e}")
+    else:
+        # Integrated mode: use internal PDF function
+        try:
+            async with admission_limits["pdf"].slot():
+                with metrics.stage(SERVICE_NAME, "pdf", PDF_MODE):
+                    pdf_bytes = await profiling.to_thread(_generate_pdf_integrated, html_resume)
+            pdf_b64 = base64.b64encode(pdf_bytes).decode("utf-8")
+        except Exception as e:
+            logger.warning(f"PDF generation failed: {e}")
+    return pdf_b64
+
+
+def _draft(resume_text: str, jd_text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """The local rewrite and its keyword analysis; both are CPU-bound, so they
+    run together in one worker thread."""
+    html_resume = _rewrite_locally(resume_text, jd_text)
+    if html_resume is None:
+        return None
+    with metrics.stage(SERVICE_NAME, "keyword_analysis", REWRITE_MODE):
+        return html_resume, _analyze_rewrite(resume_text, jd_text, html_resume)
 
+
+async def _store_draft(session_id: str, resume_text: str, jd_text: str) -> Optional[Dict[str, Any]]:
+    """Store a ResumeRewriter draft as version 1 of the session; returns the
+    /upload response body, or None when no local rewriter is available."""
+    try:
+        draft = await profiling.to_thread(_draft, resume_text, jd_text)
+    except Exception as e:
+        logger.warning(f"Draft rewrite failed: {e}")
+        return None
+    if draft is None:
+        return None
+    html_resume, analysis = draft
+    pdf_b64 = await _render_pdf(html_resume)
+    tracing.set_attribute("session_id", session_id)
+    with metrics.stage(SERVICE_NAME, "session_save", REWRITE_MODE):
+        meta = await asyncio.to_thread(
+            session_store.save,
+            session_id,
+            html_resume,
+            pdf_b64,
+            analysis["ats_score"],
+            analysis["transformations"],
+            analysis["keywords_matched"],
+            analysis["keywords_missing"],
+            status="draft",
+        )
+    await asyncio.to_thread(notifier.publish, session_id, _status_payload(session_id, meta))
+    return UploadResponse(session_id=session_id, ats_score=analysis["ats_score"], status="draft").model_dump()
+
+
+async def _tailor_and_store(
+    resume_text: str, jd_text: str, session_id: Optional[str] = None, version: int = 1
+) -> Dict[str, Any]:
+    """Rewrite, render and store one resume; returns the /upload response body.
+
+    ``session_id`` is given for uploads answered with 202 or with a draft,
+    whose watchers get each stage as it completes; the stored result replaces
+    a draft as ``version``.
+    """
     # Use integrated mode if microservice URLs are not set
     if REWRITER_URL:
         # Microservice mode: call external rewriter service
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            try:
-                rewriter_resp = await client.post(
-                    REWRITER_URL,
-                    json={"resume_text": resume_text, "job_description": jd_text},
-                )
-                if rewriter_resp.status_code != 200:
-                    error_detail = rewriter_resp.text
-                    try:
-                        error_json = rewriter_resp.json()
-                        error_detail = error_json.get("detail", error_detail)
-                    except:
-                        pass
-                    raise HTTPException(
-                        status_code=502, 
-                        detail=f"Rewriter service failed: {error_detail}"
+        httpx = capabilities.require("httpx")
+        client = _get_service_client()
+        try:
+            async with admission_limits["rewrite"].slot():
+                with metrics.stage(SERVICE_NAME, "rewrite", REWRITE_MODE):
+                    rewriter_resp = await client.post(
+                        REWRITER_URL,
+                        json={"resume_text": resume_text, "job_description": jd_text},
+                        timeout=120.0,
                     )
-                rewriter_data = rewriter_resp.json()
-            except httpx.RequestError as e:
+            if rewriter_resp.status_code != 200:
+                error_detail = rewriter_resp.text
+                try:
+                    error_json = rewriter_resp.json()
+                    error_detail = error_json.get("detail", error_detail)
+                except:
+                    pass
                 raise HTTPException(
-                    status_code=503,
-                    detail=f"Cannot connect to rewriter service at {REWRITER_URL}. Please ensure the service is running and OPENAI_API_KEY is configured."
+                    status_code=502, 
+                    detail=f"Rewriter service failed: {error_detail}"
                 )
-            html_resume = rewriter_data["html_resume"]
-            ats_score = rewriter_data["ats_score"]
-            transformations = rewriter_data.get("transformations", [])
-            keywords_matched = rewriter_data.get("keywords_matched", [])
-            keywords_missing = rewriter_data.get("keywords_missing", [])
+            rewriter_data = rewriter_resp.json()
+        except httpx.RequestError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Cannot connect to rewriter service at {REWRITER_URL}. Please ensure the service is running and OPENAI_API_KEY is configured."
+            )
+        html_resume = rewriter_data["html_resume"]
+        ats_score = rewriter_data["ats_score"]
+        transformations = rewriter_data.get("transformations", [])
+        keywords_matched = rewriter_data.get("keywords_matched", [])
+        keywords_missing = rewriter_data.get("keywords_missing", [])
     else:
         # Integrated mode: use internal rewriter function
-        rewriter_data = _rewrite_resume_integrated(resume_text, jd_text)
+        async with admission_limits["rewrite"].slot():
+            with metrics.stage(SERVICE_NAME, "rewrite", REWRITE_MODE):
+                # After a draft, the local fallback would only reproduce the draft.
+                rewriter_data = await profiling.to_thread(
+                    _rewrite_resume_integrated, resume_text, jd_text, LLM_LOCAL_FALLBACK and version == 1
+                )
         html_resume = rewriter_data["html_resume"]
         ats_score = rewriter_data["ats_score"]
         transformations = rewriter_data.get("transformations", [])
         keywords_matched = rewriter_data.get("keywords_matched", [])
         keywords_missing = rewriter_data.get("keywords_missing", [])
+    if session_id:
+        await asyncio.to_thread(_advance, session_id, "rewritten")
 
     # Generate PDF (optional - gracefully handle failures)
-    pdf_b64 = ""
-    if PDF_URL:
-        # Microservice mode: call external PDF service
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                pdf_resp = await client.post(
-                    PDF_URL,
-                    json={"html_content": html_resume},
-                )
-                if pdf_resp.status_code == 200:
-                    pdf_b64 = base64.b64encode(pdf_resp.content).decode("utf-8")
-            except Exception as e:
-                logger.warning(f"PDF service failed: {e}")
+    pdf_b64 = await _render_pdf(html_resume)
+    if session_id:
+        await asyncio.to_thread(_advance, session_id, "pdf_ready")
+
+    session_id = session_id or str(uuid.uuid4())
+    tracing.set_attribute("session_id", session_id)
+    profiling.set_label(session_id)
+    with metrics.stage(SERVICE_NAME, "session_save", REWRITE_MODE):
+        meta = await asyncio.to_thread(
+            session_store.save,
+            session_id,
+            html_resume,
+            pdf_b64,
+            ats_score,
+            transformations,
+            keywords_matched,
+            keywords_missing,
+            version=version,
+        )
+    await asyncio.to_thread(notifier.publish, session_id, _status_payload(session_id, meta))
+
+    return UploadResponse(session_id=session_id, ats_score=ats_score, status="ready").model_dump()
+
+
+async def _idempotent(idempotency_key: str, run) -> Tuple[Dict[str, Any], bool]:
+    """Run ``run()`` at most once per Idempotency-Key; returns (response, replayed).
+
+    The outcome is kept in the session store: a replay of a finished upload gets
+    the stored response, a replay of one still running waits for it (on this or
+    any other worker), and a failed upload releases the key so it can be retried.
+    """
+    record_key = IDEMPOTENCY_PREFIX + hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+    deadline = time.monotonic() + IDEMPOTENCY_LOCK_SECONDS
+    attached = False
+    while True:
+        record = await asyncio.to_thread(session_store.claim, record_key, IDEMPOTENCY_LOCK_SECONDS)
+        if record is None:
+            break
+        if record.get("status") == "done":
+            IDEMPOTENT_REQUESTS.inc(outcome="attached" if attached else "replayed")
+            return record["response"], True
+        if time.monotonic() > deadline:
+            IDEMPOTENT_REQUESTS.inc(outcome="conflict")
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        attached = True
+        await asyncio.sleep(0.25)
+
+    IDEMPOTENT_REQUESTS.inc(outcome="new")
+    try:
+        response = await run()
+    except BaseException:
+        await asyncio.to_thread(session_store.delete_record, record_key)
+        raise
+    await asyncio.to_thread(
+        session_store.put_record, record_key, {"status": "done", "response": response}, IDEMPOTENCY_TTL_SECONDS
+    )
+    return response, False
+
+
+@app.post("/upload", response_model=UploadResponse)
+async def upload_resume(
+    original_resume: UploadFile = File(...),
+    job_description: Optional[str] = Form(None),
+    job_description_file: Optional[UploadFile] = File(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    prefer: Optional[str] = Header(None),
+) -> JSONResponse:
+    # Prefer: respond-async answers 202 with the session id right after parsing;
+    # follow progress on /result?wait=, /result/{id}/status or /ws/result/{id}.
+    respond_async = "respond-async" in (prefer or "").lower()
+    upload = lambda: _upload(original_resume, job_description, job_description_file, respond_async)
+    headers: Dict[str, str] = {}
+    if idempotency_key:
+        response, replayed = await _idempotent(idempotency_key, upload)
+        if replayed:
+            headers["Idempotent-Replayed"] = "true"
     else:
-        # Integrated mode: use internal PDF function
-        try:
-            pdf_bytes = _generate_pdf_integrated(html_resume)
-            pdf_b64 = base64.b64encode(pdf_bytes).decode("utf-8")
-        except Exception as e:
-            logger.warning(f"PDF generation failed: {e}")
+        response = await upload()
+    if response["status"] != "processing":
+        return JSONResponse(response, headers=headers)
+    headers["Preference-Applied"] = "respond-async"
+    headers["Location"] = f"/result/{response['session_id']}"
+    return JSONResponse(response, status_code=202, headers=headers)
+
+
+async def _upload(
+    original_resume: UploadFile,
+    job_description: Optional[str],
+    job_description_file: Optional[UploadFile],
+    respond_async: bool = False,
+) -> Dict[str, Any]:
+    # Refuse up front rather than after parsing when the LLM stage is already full.
+    for stage in ("parse", "rewrite"):
+        if admission_limits[stage].saturated():
+            raise admission_limits[stage].reject("queue_full")
+
+    async with admission_limits["parse"].slot():
+        with metrics.stage(SERVICE_NAME, "parse", REWRITE_MODE):
+            resume_text = await profiling.to_thread(parse_resume, original_resume)
+            jd_text, _ = await profiling.to_thread(parse_job_description, job_description, job_description_file)
+
+    # Identical resume + JD pairs already running (double clicks, client retries)
+    # share one rewrite, PDF render and session instead of repeating them.
+    key = content_key(REWRITE_MODE, llm_router.version, resume_text, jd_text)
+    if DRAFT_ENABLED:
+        session_id = str(uuid.uuid4())
+        draft = await _store_draft(session_id, resume_text, jd_text)
+        if draft is not None:
+            _in_background(_finish_upload(session_id, key, resume_text, jd_text, version=2))
+            return draft
+
+    if not respond_async:
+        return await single_flight.do(key, lambda: _tailor_and_store(resume_text, jd_text))
 
     session_id = str(uuid.uuid4())
-    session_store.save(session_id, html_resume, pdf_b64, ats_score, transformations, keywords_matched, keywords_missing)
+    await asyncio.to_thread(_advance, session_id, "parsed")
+    _in_background(_finish_upload(session_id, key, resume_text, jd_text))
+    return UploadResponse(session_id=session_id, ats_score=0, status="processing").model_dump()
 
-    return JSONResponse(UploadResponse(session_id=session_id, ats_score=ats_score, status="ready").model_dump())
 
+def _in_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_uploads.add(task)
+    task.add_done_callback(_background_uploads.discard)
+
+
+async def _finish_upload(session_id: str, key: str, resume_text: str, jd_text: str, version: int = 1) -> None:
+    """Complete an upload that was answered with 202 or with a draft."""
+    try:
+        response = await single_flight.do(key, lambda: _tailor_and_store(resume_text, jd_text, session_id, version))
+        if response["session_id"] != session_id:
+            # Coalesced onto an identical upload: store its result under this id too.
+            record = await asyncio.to_thread(session_store.fetch, response["session_id"])
+            meta = await asyncio.to_thread(
+                session_store.save,
+                session_id,
+                record["html"],
+                record["pdf"],
+                record["ats_score"],
+                record.get("transformations", []),
+                record.get("keywords_matched", []),
+                record.get("keywords_missing", []),
+                version=version,
+            )
+            await asyncio.to_thread(notifier.publish, session_id, _status_payload(session_id, meta))
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Background upload {session_id} failed: {detail}")
+        # After a draft, the draft is the final result.
+        await asyncio.to_thread(
+            _advance, session_id, "failed", status="ready" if version > 1 else "failed", error=detail
+        )
+
+
+async def _await_change(session_id: str, wait: float, if_none_match: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Long-poll: the session's metadata once it is finished and differs from
+    ``if_none_match``, or whatever it is when ``wait`` seconds run out."""
+    deadline = time.monotonic() + min(wait, LONG_POLL_MAX_SECONDS)
+    # Subscribe before reading so a change between the two is not missed.
+    async with notifier.subscribe(session_id) as events:
+        while True:
+            meta = await asyncio.to_thread(session_store.fetch_meta, session_id)
+            if meta is None or meta["status"] == "failed" or meta.get("error"):
+                return meta
+            if meta["status"] != "processing" and not responses.etag_matches(if_none_match, meta["etag"]):
+                return meta
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return meta
+            try:
+                await asyncio.wait_for(events.get(), remaining)
+            except asyncio.TimeoutError:
+                pass
 
-@app.get("/result/{session_id}")
-async def get_result(session_id: str) -> JSONResponse:
-    session_store.purge_expired()
-    record = session_store.fetch(session_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Session expired or not found")
 
-    return JSONResponse({
+def _result_payload(session_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         "session_id": session_id,
         "ats_score": record["ats_score"],
         "html_resume": record["html"],
@@ -674,9 +1489,225 @@ async def get_result(session_id: str) -> JSONResponse:
         "transformations": record.get("transformations", []),
         "keywords_matched": record.get("keywords_matched", []),
         "keywords_missing": record.get("keywords_missing", []),
-    })
+    }
+
+
+@app.get("/result/{session_id}")
+async def get_result(session_id: str, request: Request, wait: float = Query(0, ge=0)) -> Response:
+    """The finished result; ``?wait=N`` holds the request up to N seconds for it
+    to finish (or, with If-None-Match, to change)."""
+    await asyncio.to_thread(session_store.purge_expired)
+    if_none_match = request.headers.get("if-none-match")
+    meta = await asyncio.to_thread(session_store.fetch_meta, session_id)
+    if meta and wait:
+        meta = await _await_change(session_id, wait, if_none_match)
+    # Only offer encodings stored for this session (brotli is optional, and workers may differ).
+    stored = meta.get("encodings") if meta else None
+    encoding = responses.negotiate(request.headers.get("accept-encoding"), stored or responses.encodings())
+    if meta and meta["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Tailoring failed: {meta.get('error', 'unknown error')}")
+    if meta and meta["status"] == "processing":
+        return JSONResponse(_status_payload(session_id, meta), status_code=202, headers={"Cache-Control": "no-cache"})
+    if meta and responses.etag_matches(if_none_match, meta["etag"]):
+        metrics.record_cache("session", True)
+        return responses.not_modified(responses.etag(meta["etag"], encoding))
+
+    body = await asyncio.to_thread(session_store.fetch_body, session_id, encoding) if meta else None
+    metrics.record_cache("result_body", body is not None)
+    if body is not None:
+        metrics.record_cache("session", True)
+        return responses.encoded_response(body, encoding, responses.etag(meta["etag"], encoding))
+
+    # Sessions saved without precomputed bodies: encode this one on the spot.
+    record = await asyncio.to_thread(session_store.fetch, session_id)
+    metrics.record_cache("session", record is not None)
+    if not record or "html" not in record:
+        raise HTTPException(status_code=404, detail="Session expired or not found")
+    body = responses.dumps(_result_payload(session_id, record))
+    digest = responses.content_hash(body)
+    if responses.etag_matches(if_none_match, digest):
+        return responses.not_modified(responses.etag(digest))
+    return responses.encoded_response(body, tag=responses.etag(digest))
+
+
+@app.get("/result/{session_id}/status", response_model=ResultStatusResponse)
+async def get_result_status(session_id: str, request: Request, wait: float = Query(0, ge=0)) -> Response:
+    """State, score and version only; poll this and fetch /result once it changes.
+
+    With ``?wait=N`` and the last ETag in If-None-Match, the request is held
+    until the state changes (or N seconds pass, answering 304).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    meta = await asyncio.to_thread(session_store.fetch_meta, session_id)
+    if meta and wait and responses.etag_matches(if_none_match, _status_digest(meta)):
+        deadline = time.monotonic() + min(wait, LONG_POLL_MAX_SECONDS)
+        async with notifier.subscribe(session_id) as events:
+            while meta and responses.etag_matches(if_none_match, _status_digest(meta)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(events.get(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                meta = await asyncio.to_thread(session_store.fetch_meta, session_id)
+    if not meta:
+        raise HTTPException(status_code=404, detail="Session expired or not found")
+    tag = responses.etag(_status_digest(meta), "status")
+    if responses.etag_matches(if_none_match, _status_digest(meta)):
+        return responses.not_modified(tag)
+    return responses.encoded_response(responses.dumps(_status_payload(session_id, meta)), tag=tag)
+
+
+@app.websocket("/ws/result/{session_id}")
+async def result_events(websocket: WebSocket, session_id: str) -> None:
+    """Push the session's status, then every stage transition until it is ready or failed."""
+    await websocket.accept()
+    async with notifier.subscribe(session_id) as events:
+        meta = await asyncio.to_thread(session_store.fetch_meta, session_id)
+        if not meta:
+            await websocket.send_json({"session_id": session_id, "status": "not_found"})
+            await websocket.close(code=4404)
+            return
+        event = _status_payload(session_id, meta)
+        # Reading from the socket notices a client that goes away between events.
+        receive = asyncio.ensure_future(websocket.receive())
+        try:
+            await websocket.send_json(event)
+            while event["status"] not in ("ready", "failed"):
+                next_event = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({next_event, receive}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event in done:
+                    event = next_event.result()
+                    await websocket.send_json(event)
+                else:
+                    next_event.cancel()
+                if receive in done:
+                    if receive.result()["type"] == "websocket.disconnect":
+                        return
+                    # Client messages are ignored.
+                    receive = asyncio.ensure_future(websocket.receive())
+        except WebSocketDisconnect:
+            return
+        finally:
+            receive.cancel()
+        await websocket.close()
+
+
+@app.post("/jobs", response_model=JobPostingResponse)
+async def add_job(
+    job_description: Optional[str] = Form(None),
+    job_description_file: Optional[UploadFile] = File(None),
+    job_id: Optional[str] = Form(None),
+    title: str = Form(""),
+) -> JSONResponse:
+    jd_text, source = await asyncio.to_thread(parse_job_description, job_description, job_description_file)
+    if source == "missing" or not jd_text.strip():
+        raise HTTPException(status_code=400, detail="job_description or job_description_file is required")
+
+    job_id = job_id or str(uuid.uuid4())
+    await asyncio.to_thread(job_index.add, job_id, jd_text, title=title)
+    return JSONResponse(JobPostingResponse(job_id=job_id, title=title, indexed_jobs=len(job_index)).model_dump())
+
+
+@app.delete("/jobs/{job_id}")
+async def remove_job(job_id: str) -> Dict[str, Any]:
+    if not await asyncio.to_thread(job_index.remove, job_id):
+        raise HTTPException(status_code=404, detail="Job posting not found")
+    return {"job_id": job_id, "indexed_jobs": len(job_index)}
+
+
+@app.post("/jobs/match", response_model=JobMatchResponse)
+async def match_jobs(
+    original_resume: UploadFile = File(...),
+    top_k: int = Form(10),
+) -> JSONResponse:
+    resume_text = await asyncio.to_thread(parse_resume, original_resume)
+    top_k = max(1, min(top_k, 100))
+    matches = [
+        JobMatch(job_id=job_id, title=title, score=score)
+        for job_id, title, score in await asyncio.to_thread(job_index.top_k, resume_text, top_k)
+    ]
+    return JSONResponse(JobMatchResponse(matches=matches).model_dump())
+
+
+# ------------------ warmup / readiness ------------------ #
+warmup = Warmup(SERVICE_NAME)
+
+
+@warmup.step("scorer", required=True)
+def _warm_scorer() -> int:
+    return score_text(CANNED_RESUME_HTML, CANNED_JOB_DESCRIPTION)
+
+
+@warmup.step("pdf_render")
+async def _warm_pdf_render() -> bytes:
+    """Render the canned resume through the same PDF path uploads use."""
+    if PDF_URL:
+        resp = await _get_service_client().post(PDF_URL, json={"html_content": CANNED_RESUME_HTML}, timeout=60.0)
+        resp.raise_for_status()
+        return resp.content
+    return await asyncio.to_thread(_generate_pdf_integrated, CANNED_RESUME_HTML)
+
+
+@warmup.step("parser")
+def _warm_parser() -> None:
+    pdf_bytes = warmup.result("pdf_render")
+    if not pdf_bytes:
+        capabilities.require("pdfplumber")
+        return
+    parse_resume(UploadFile(file=io.BytesIO(pdf_bytes), size=len(pdf_bytes), filename="warmup.pdf"))
+
+
+@warmup.step("resume_rewriter")
+def _warm_resume_rewriter() -> None:
+    """Load the spaCy pipeline before the first draft needs it."""
+    if DRAFT_ENABLED:
+        capabilities.load("resume_rewriter")
+
+
+@warmup.step("connections")
+async def _warm_connections() -> None:
+    """Open pooled connections so the first upload skips DNS and TLS setup."""
+    service_urls = [url for url in (REWRITER_URL, PDF_URL) if url]
+    if service_urls:
+        httpx = capabilities.require("httpx")
+        client = _get_service_client()
+        for url in service_urls:
+            await client.get(str(httpx.URL(url).copy_with(path="/health")), timeout=10.0)
+    if not REWRITER_URL and os.getenv("OPENAI_API_KEY"):
+        await asyncio.to_thread(lambda: _get_openai_client().models.list())
+
+
+@app.on_event("startup")
+async def _start_warmup() -> None:
+    warmup.start()
 
 
 @app.get("/healthz")
 async def healthz() -> Dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz() -> JSONResponse:
+    return JSONResponse(warmup.report(), status_code=200 if warmup.ready else 503)
+
+
+@app.get("/debug/llm-routes")
+async def llm_routes() -> Dict[str, Any]:
+    """What model routing currently believes about each model in LLM_MODELS."""
+    return llm_router.snapshot()
+
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str) -> FileResponse:
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=profile_id)
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    return Response(metrics.metrics_text(), media_type=metrics.CONTENT_TYPE)
@@ -45,7 +45,31 @@ class ResumePayload(BaseModel):
 class UploadResponse(BaseModel):
     session_id: str
     ats_score: int
-    status: str = Field("processing", description="Status of the rewrite flow")
+    status: str = Field("processing", description="Status of the rewrite flow (processing, draft or ready)")
+
+
+class JobPostingResponse(BaseModel):
+    job_id: str
+    title: str
+    indexed_jobs: int
+
+
+class JobMatch(BaseModel):
+    job_id: str
+    title: str
+    score: float = Field(..., description="BM25 relevance of the posting to the resume")
+
+
+class JobMatchResponse(BaseModel):
+    matches: List[JobMatch]
+
+
+class ResultStatusResponse(BaseModel):
+    session_id: str
+    status: str = Field(..., description="processing, draft, ready or failed")
+    stage: Optional[str] = Field(None, description="Last completed pipeline stage (parsed, rewritten, pdf_ready, ready)")
+    ats_score: int
+    version: int = Field(..., description="Increases every time the stored result changes")
 
 
 class ResultResponse(BaseModel):
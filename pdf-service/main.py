@@ -1,11 +1,22 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
+from pathlib import Path
 import base64
 import io
 import os
 import sys
 
+# Share utils/ with the gateway when started from this directory
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from utils import metrics, profiling, tracing
+from utils.warmup import CANNED_RESUME_HTML, Warmup
+
+SERVICE_NAME = "pdf"
+
 # Set library paths for WeasyPrint on macOS
 if sys.platform == "darwin":
     homebrew_lib = "/opt/homebrew/lib"
@@ -19,6 +30,9 @@ if sys.platform == "darwin":
             pass
 
 app = FastAPI(title="PDF Generation Service")
+app.add_middleware(metrics.MetricsMiddleware, service=SERVICE_NAME)
+app.add_middleware(profiling.ProfilingMiddleware, service=SERVICE_NAME)
+app.add_middleware(tracing.TracingMiddleware, service=SERVICE_NAME)
 
 try:
     from weasyprint import HTML
@@ -44,60 +58,61 @@ async def generate_pdf(req: PdfRequest):
         import logging
         logger = logging.getLogger(__name__)
         
-        # Ensure HTML has proper structure for WeasyPrint
-        html_content = req.html_content.strip()
-        logger.info(f"Received HTML content, length: {len(html_content)}")
+        with metrics.stage(SERVICE_NAME, "html_wrap", "microservice"):
+            # Ensure HTML has proper structure for WeasyPrint
+            html_content = req.html_content.strip()
+            logger.info(f"Received HTML content, length: {len(html_content)}")
         
-        # If HTML doesn't start with <!DOCTYPE or <html, wrap it properly
-        if not html_content.startswith("<!DOCTYPE") and not html_content.startswith("<html"):
-            # Extract style if present
-            style_match = re.search(r'<style>(.*?)</style>', html_content, re.DOTALL)
-            style_content = style_match.group(1) if style_match else ""
+            # If HTML doesn't start with <!DOCTYPE or <html, wrap it properly
+            if not html_content.startswith("<!DOCTYPE") and not html_content.startswith("<html"):
+                # Extract style if present
+                style_match = re.search(r'<style>(.*?)</style>', html_content, re.DOTALL)
+                style_content = style_match.group(1) if style_match else ""
             
-            # Extract body content - find the opening <div class="resume"> and match to its closing tag
-            # We need to handle nested divs properly
-            resume_start = html_content.find('<div class="resume">')
-            if resume_start == -1:
-                # Try alternative pattern
-                resume_start = html_content.find("<div class='resume'>")
-            if resume_start == -1:
-                # Try with any attributes
-                resume_match = re.search(r'<div[^>]*class=["\']resume["\'][^>]*>', html_content)
-                if resume_match:
-                    resume_start = resume_match.start()
+                # Extract body content - find the opening <div class="resume"> and match to its closing tag
+                # We need to handle nested divs properly
+                resume_start = html_content.find('<div class="resume">')
+                if resume_start == -1:
+                    # Try alternative pattern
+                    resume_start = html_content.find("<div class='resume'>")
+                if resume_start == -1:
+                    # Try with any attributes
+                    resume_match = re.search(r'<div[^>]*class=["\']resume["\'][^>]*>', html_content)
+                    if resume_match:
+                        resume_start = resume_match.start()
             
-            if resume_start != -1:
-                # Find the matching closing tag by counting divs
-                depth = 0
-                i = resume_start
-                resume_end = -1
-                while i < len(html_content):
-                    if html_content[i:i+5] == '<div ' or html_content[i:i+6] == '<div>':
-                        depth += 1
-                        i = html_content.find('>', i) + 1
-                    elif html_content[i:i+6] == '</div>':
-                        depth -= 1
-                        if depth == 0:
-                            resume_end = i + 6
-                            break
-                        i += 6
-                    else:
-                        i += 1
+                if resume_start != -1:
+                    # Find the matching closing tag by counting divs
+                    depth = 0
+                    i = resume_start
+                    resume_end = -1
+                    while i < len(html_content):
+                        if html_content[i:i+5] == '<div ' or html_content[i:i+6] == '<div>':
+                            depth += 1
+                            i = html_content.find('>', i) + 1
+                        elif html_content[i:i+6] == '</div>':
+                            depth -= 1
+                            if depth == 0:
+                                resume_end = i + 6
+                                break
+                            i += 6
+                        else:
+                            i += 1
                 
-                if resume_end > 0:
-                    body_content = html_content[resume_start:resume_end]
+                    if resume_end > 0:
+                        body_content = html_content[resume_start:resume_end]
+                    else:
+                        # Fallback: use from start to end
+                        body_content = html_content[resume_start:]
+                        logger.warning("Could not find matching closing div, using partial content")
                 else:
-                    # Fallback: use from start to end
-                    body_content = html_content[resume_start:]
-                    logger.warning("Could not find matching closing div, using partial content")
-            else:
-                # Fallback: use the entire content
-                body_content = html_content
-                logger.warning("Could not find resume div, using entire HTML content")
+                    # Fallback: use the entire content
+                    body_content = html_content
+                    logger.warning("Could not find resume div, using entire HTML content")
             
-            # Wrap in proper HTML structure with better CSS for PDF
-            # Override padding for PDF to reduce side margins
-            pdf_style_override = """
+                # Wrap in proper HTML structure with better CSS for PDF
+                # Override padding for PDF to reduce side margins
+                pdf_style_override = """
         .resume {
             padding: 30px 15px !important;
             max-width: 100% !important;
@@ -105,7 +120,7 @@ async def generate_pdf(req: PdfRequest):
         }
         """
             
-            html_content = f"""<!DOCTYPE html>
+                html_content = f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -127,13 +142,14 @@ async def generate_pdf(req: PdfRequest):
     {body_content}
 </body>
 </html>"""
-            logger.info(f"Wrapped HTML, final length: {len(html_content)}")
-        else:
-            logger.info("HTML already has proper structure")
-        
+                logger.info(f"Wrapped HTML, final length: {len(html_content)}")
+            else:
+                logger.info("HTML already has proper structure")
+
         # Generate PDF
-        html_doc = HTML(string=html_content)
-        pdf_bytes = html_doc.write_pdf()
+        with metrics.stage(SERVICE_NAME, "pdf_render", "microservice"):
+            html_doc = HTML(string=html_content)
+            pdf_bytes = html_doc.write_pdf()
         logger.info(f"Generated PDF, size: {len(pdf_bytes)} bytes")
         
         if len(pdf_bytes) == 0:
@@ -154,3 +170,29 @@ async def generate_pdf(req: PdfRequest):
 async def health():
     return {"status": "ok"}
 
+
+warmup = Warmup(SERVICE_NAME)
+
+
+@warmup.step("pdf_render", required=True)
+def _warm_pdf_render() -> bytes:
+    """Build WeasyPrint's font cache before the first real render."""
+    if not WEASYPRINT_AVAILABLE:
+        raise RuntimeError("WeasyPrint not available")
+    return HTML(string=CANNED_RESUME_HTML).write_pdf()
+
+
+@app.on_event("startup")
+async def _start_warmup() -> None:
+    warmup.start()
+
+
+@app.get("/readyz")
+async def readyz():
+    return JSONResponse(warmup.report(), status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    return Response(metrics.metrics_text(), media_type=metrics.CONTENT_TYPE)
+
@@ -1,9 +1,26 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 from openai import OpenAI
+from pathlib import Path
 import os
+import sys
+
+# Share utils/ with the gateway when started from this directory
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.append(str(REPO_ROOT))
+
+from utils import metrics, tracing
+from utils.routing import ModelRouter
+from utils.scorer import score_text, tokenize
+
+SERVICE_NAME = "rewriter"
+llm_router = ModelRouter(SERVICE_NAME, mode="microservice")
 
 app = FastAPI(title="Resume Rewriter Service")
+app.add_middleware(metrics.MetricsMiddleware, service=SERVICE_NAME)
+app.add_middleware(tracing.TracingMiddleware, service=SERVICE_NAME)
 
 def get_client():
     api_key = os.getenv("OPENAI_API_KEY")
@@ -300,9 +317,9 @@ Bad: "Solved web application development by using React and Node.js, resulting i
         logger.info(f"Resume length: {len(req.resume_text)} chars, JD length: {len(req.job_description)} chars")
         
         client = get_client()
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        completion, model = llm_router.complete(
+            client,
+            [
                 {"role": "system", "content": system_prompt},
                 {
                     "role": "user",
@@ -328,27 +345,29 @@ INSTRUCTIONS:
 Rewrite the resume now:""",
                 },
             ],
+            work_text=req.resume_text,
             temperature=0.7,  # Increased for more creative rewriting
         )
+        import re
+        from collections import Counter
 
-        html_resume = completion.choices[0].message.content.strip()
-        logger.info(f"OpenAI response received. HTML length: {len(html_resume)} chars")
+        with metrics.stage(SERVICE_NAME, "post_process", "microservice"):
+            html_resume = completion.choices[0].message.content.strip()
+            logger.info(f"OpenAI response received from {model}. HTML length: {len(html_resume)} chars")
         
-        # Clean up any markdown code blocks if OpenAI wrapped it
-        if html_resume.startswith("```"):
-            lines = html_resume.split("\n")
-            html_resume = "\n".join(lines[1:-1]) if lines[-1].strip() == "```" else "\n".join(lines[1:])
+            # Clean up any markdown code blocks if OpenAI wrapped it
+            if html_resume.startswith("```"):
+                lines = html_resume.split("\n")
+                html_resume = "\n".join(lines[1:-1]) if lines[-1].strip() == "```" else "\n".join(lines[1:])
         
-        # Post-processing: Check for excessive repetition (basic check)
-        import re
-        from collections import Counter
-        # Extract text content from HTML (simple extraction)
-        text_content = re.sub(r'<[^>]+>', ' ', html_resume).lower()
-        words = re.findall(r'\b\w{4,}\b', text_content)  # Words 4+ chars
-        word_counts = Counter(words)
-        repeated_words = [word for word, count in word_counts.items() if count > 5]
-        if repeated_words:
-            logger.warning(f"Potential repetition detected: {repeated_words[:10]}")
+            # Post-processing: Check for excessive repetition (basic check)
+            # Extract text content from HTML (simple extraction)
+            text_content = re.sub(r'<[^>]+>', ' ', html_resume).lower()
+            words = re.findall(r'\b\w{4,}\b', text_content)  # Words 4+ chars
+            word_counts = Counter(words)
+            repeated_words = [word for word, count in word_counts.items() if count > 5]
+            if repeated_words:
+                logger.warning(f"Potential repetition detected: {repeated_words[:10]}")
         
         # Analyze transformations and keywords
         resume_lower = req.resume_text.lower()
@@ -356,9 +375,9 @@ Rewrite the resume now:""",
         html_lower = html_resume.lower()
         
         # Extract keywords from job description (meaningful words only)
-        jd_words = set(re.findall(r'\b\w{4,}\b', jd_lower))  # Words 4+ chars
-        html_words = set(re.findall(r'\b\w{4,}\b', html_lower))
-        original_words = set(re.findall(r'\b\w{4,}\b', resume_lower))
+        jd_words = set(tokenize(jd_lower))  # Words 4+ chars
+        html_words = set(tokenize(html_lower))
+        original_words = set(tokenize(resume_lower))
         
         # Keywords matched in rewritten resume
         keywords_matched = sorted(list(jd_words & html_words), key=lambda x: (-html_lower.count(x), x))[:30]
@@ -397,9 +416,9 @@ Rewrite the resume now:""",
                 "Generated HTML resume matching the target format"
             ]
         
-        # Calculate ATS score based on keyword overlap
-        overlap = len(jd_words & html_words)
-        ats_score = min(95, max(80, int(80 + (overlap / max(len(jd_words), 1)) * 15)))
+        # Same deterministic engine as the agents and the other deployment mode
+        with metrics.stage(SERVICE_NAME, "ats_score", "microservice"):
+            ats_score = score_text(html_resume, req.job_description)
 
         return RewriteResponse(
             html_resume=html_resume, 
@@ -430,3 +449,8 @@ Rewrite the resume now:""",
 async def health():
     return {"status": "ok"}
 
+
+@app.get("/metrics")
+async def metrics_endpoint() -> Response:
+    return Response(metrics.metrics_text(), media_type=metrics.CONTENT_TYPE)
+
@@ -0,0 +1,39 @@
+"""Shared fixtures: the gateway app with fresh in-memory state for each test."""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """main.py with an in-memory session store, single-flight and notifier of its own."""
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    import main
+
+    monkeypatch.setattr(main, "SESSION_DB_PATH", None)
+    monkeypatch.setattr(main, "session_store", main.SessionStore())
+    monkeypatch.setattr(main, "single_flight", main.SingleFlight())
+    monkeypatch.setattr(main, "notifier", main.Notifier())
+    monkeypatch.setattr(main, "_background_uploads", set())
+    return main
+
+
+def asgi_client(app):
+    httpx = pytest.importorskip("httpx")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def until(predicate, timeout: float = 5.0) -> None:
+    """Wait for ``predicate()`` to hold, failing the test after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        await asyncio.sleep(0.01)
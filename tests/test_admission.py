@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from conftest import asgi_client
+from utils.admission import Overloaded, StageLimiter
+
+
+def test_slots_are_granted_in_fifo_order():
+    limiter = StageLimiter("test_fifo", max_in_flight=1, max_queue=5, queue_timeout=5)
+    order = []
+
+    async def worker(name, gate):
+        async with limiter.slot():
+            order.append(name)
+            await gate.wait()
+
+    async def scenario():
+        gates = {name: asyncio.Event() for name in "abcd"}
+        tasks = []
+        for name in "abcd":
+            tasks.append(asyncio.create_task(worker(name, gates[name])))
+            await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.waiting) == (1, 3)
+        for name in "abcd":
+            gates[name].set()
+        await asyncio.gather(*tasks)
+        assert (limiter.in_flight, limiter.waiting) == (0, 0)
+
+    asyncio.run(scenario())
+    assert order == list("abcd")
+
+
+def test_full_queue_is_refused_immediately():
+    limiter = StageLimiter("test_queue_full", max_in_flight=1, max_queue=1, queue_timeout=5)
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await gate.wait()
+
+        tasks = [asyncio.create_task(hold()), asyncio.create_task(hold())]
+        await asyncio.sleep(0)
+        assert limiter.saturated()
+        with pytest.raises(Overloaded) as raised:
+            async with limiter.slot():
+                pass
+        gate.set()
+        await asyncio.gather(*tasks)
+        return raised.value
+
+    error = asyncio.run(scenario())
+    assert (error.stage, error.reason) == ("test_queue_full", "queue_full")
+    assert error.retry_after >= 1
+    assert not limiter.saturated()
+
+
+def test_waiter_times_out_and_leaves_the_queue():
+    limiter = StageLimiter("test_timeout", max_in_flight=1, max_queue=5, queue_timeout=0.05)
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await gate.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as raised:
+            async with limiter.slot():
+                pass
+        assert (limiter.in_flight, limiter.waiting) == (1, 0)
+        gate.set()
+        await holder
+        return raised.value
+
+    assert asyncio.run(scenario()).reason == "timeout"
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    limiter = StageLimiter("test_cancel", max_in_flight=1, max_queue=5, queue_timeout=5)
+
+    async def scenario():
+        gate = asyncio.Event()
+        entered = []
+        tasks = {}
+
+        async def hold():
+            async with limiter.slot():
+                await gate.wait()
+            # The slot was just handed to the first waiter; it goes away before it runs.
+            tasks["cancelled"].cancel()
+
+        async def wait_for_slot(name):
+            async with limiter.slot():
+                entered.append(name)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        for name in ("cancelled", "after"):
+            tasks[name] = asyncio.create_task(wait_for_slot(name))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(holder, *tasks.values(), return_exceptions=True)
+        return entered
+
+    # Before 3.12 wait_for may swallow a cancel that races the hand-off, so the
+    # first waiter can still run; either way the slot must come back.
+    assert asyncio.run(scenario())[-1] == "after"
+    assert (limiter.in_flight, limiter.waiting) == (0, 0)
+
+
+def test_zero_max_in_flight_disables_the_limit(monkeypatch):
+    monkeypatch.setenv("ADMISSION_TEST_ENV_MAX_IN_FLIGHT", "0")
+    limiter = StageLimiter.from_env("test_env", max_in_flight=2, max_queue=2, queue_timeout=1)
+
+    async def scenario():
+        async with limiter.slot(), limiter.slot(), limiter.slot():
+            return limiter.saturated()
+
+    assert limiter.unlimited
+    assert asyncio.run(scenario()) is False
+
+
+def test_upload_gets_503_with_retry_after_when_saturated(gateway, monkeypatch):
+    limiter = StageLimiter("parse", max_in_flight=1, max_queue=0, queue_timeout=1)
+    limiter.in_flight = 1
+    monkeypatch.setitem(gateway.admission_limits, "parse", limiter)
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.post(
+                "/upload",
+                files={"original_resume": ("resume.txt", b"Jane Doe", "text/plain")},
+                data={"job_description": "Backend engineer"},
+            )
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "parse" in response.json()["detail"]
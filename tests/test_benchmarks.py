@@ -0,0 +1,17 @@
+from benchmarks.run import compare
+
+BASELINE = {
+    "parse.docx_stream[small]": {"median_ms": 1.0, "peak_kb": 100.0},
+    "score.batch_8_variants[small]": {"median_ms": 2.0, "peak_kb": 100.0},
+}
+
+
+def test_slower_stage_is_a_regression():
+    current = {**BASELINE, "parse.docx_stream[small]": {"median_ms": 1.5, "peak_kb": 100.0}}
+    assert compare(current, BASELINE, 0.25) == ["parse.docx_stream[small]: median_ms 1.0 -> 1.5 (+50%)"]
+
+
+def test_missing_stage_fails_unless_filtered_out():
+    current = {"parse.docx_stream[small]": BASELINE["parse.docx_stream[small]"]}
+    assert compare(current, BASELINE, 0.25) == ["score.batch_8_variants[small]: missing from this run"]
+    assert compare(current, BASELINE, 0.25, lambda name: "docx" in name) == []
@@ -0,0 +1,66 @@
+import threading
+
+from utils import capabilities
+
+
+def test_slow_loader_does_not_block_other_capabilities(monkeypatch):
+    monkeypatch.setattr(capabilities, "_registry", {})
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append("slow")
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    def fast():
+        calls.append("fast")
+        return "fast"
+
+    capabilities.register("slow", slow)
+    capabilities.register("fast", fast)
+    loading = threading.Thread(target=capabilities.load, args=("slow",))
+    loading.start()
+    try:
+        assert started.wait(5)
+        assert capabilities.load("fast") == "fast"
+        assert not capabilities.status()["slow"]["loaded"]
+    finally:
+        release.set()
+        loading.join()
+    assert capabilities.load("slow") == "slow"
+    assert calls == ["slow", "fast"]
+
+
+def test_concurrent_callers_load_a_capability_once(monkeypatch):
+    monkeypatch.setattr(capabilities, "_registry", {})
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return object()
+
+    capabilities.register("shared", loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(capabilities.load("shared"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert len({id(result) for result in results}) == 1
+
+
+def test_failed_import_is_reported_not_raised(monkeypatch):
+    monkeypatch.setattr(capabilities, "_registry", {})
+
+    def missing():
+        raise ImportError("No module named 'nothing'")
+
+    capabilities.register("nothing", missing)
+
+    assert capabilities.load("nothing") is None
+    assert not capabilities.available("nothing")
+    assert capabilities.status()["nothing"]["error"] == "No module named 'nothing'"
@@ -0,0 +1,67 @@
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+
+from utils import docx_text, parser
+
+docx = pytest.importorskip("docx")
+
+
+def _resume_docx() -> bytes:
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Jane Doe | jane@example.com"
+    document.add_paragraph("EXPERIENCE")
+    document.add_paragraph("Backend Engineer\tAcme Corp")
+    document.add_paragraph("• Built payment APIs in Python")
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text, table.cell(0, 1).text = "Languages", "Python, Go"
+    table.cell(1, 0).text, table.cell(1, 1).text = "Cloud", "AWS"
+    document.add_paragraph("EDUCATION")
+    document.add_paragraph("")
+    document.add_paragraph("BSc Computer Science")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _python_docx_lines(data: bytes):
+    """The same text as python-docx sees it: header, then body paragraphs and table rows in order."""
+    document = docx.Document(io.BytesIO(data))
+    lines = [p.text for p in document.sections[0].header.paragraphs if p.text.strip()]
+    for block in document.iter_inner_content():
+        if isinstance(block, docx.table.Table):
+            lines += [" | ".join(cell.text for cell in row.cells) for row in block.rows]
+        elif block.text.strip():
+            lines.append(block.text.strip())
+    return lines
+
+
+def test_text_matches_python_docx():
+    data = _resume_docx()
+
+    assert docx_text.extract_docx_text(io.BytesIO(data)).split("\n") == _python_docx_lines(data)
+
+
+def _bomb() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", b"<w:document>" + b" " * (docx_text.MAX_DOCX_XML_BYTES + 1))
+    return buffer.getvalue()
+
+
+def test_document_inflating_past_the_cap_is_refused():
+    data = _bomb()
+    assert len(data) < docx_text.MAX_DOCX_XML_BYTES // 100
+
+    with pytest.raises(docx_text.DocxTooLarge):
+        docx_text.extract_docx_text(io.BytesIO(data))
+
+
+def test_parser_reports_the_cap_as_too_large():
+    upload = UploadFile(io.BytesIO(_bomb()), filename="resume.docx")
+
+    with pytest.raises(parser.HTTPException) as raised:
+        parser.parse_resume(upload)
+    assert raised.value.status_code == 413
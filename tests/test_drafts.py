@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+from fastapi import HTTPException
+
+from conftest import asgi_client, until
+
+RESUME = "Jane Doe\nEXPERIENCE\nBackend Engineer\nAcme Corp\n2020 - Present\n• Built payment APIs in Python\n"
+JOB = "Backend engineer: Python, APIs, payments"
+DRAFT = '<div class="resume"><p>draft</p></div>'
+FINAL = '<div class="resume"><p>final</p></div>'
+
+
+def _rewritten(resume_text, job_description, local_fallback=True):
+    return {"html_resume": FINAL, "ats_score": 90, "transformations": [], "keywords_matched": [], "keywords_missing": []}
+
+
+def _setup(gateway, monkeypatch, rewrite):
+    monkeypatch.setattr(gateway, "DRAFT_ENABLED", True)
+    monkeypatch.setattr(gateway, "_rewrite_locally", lambda resume_text, job_description: DRAFT)
+    monkeypatch.setattr(gateway, "_rewrite_resume_integrated", rewrite)
+    release = asyncio.Event()
+
+    async def render(html_resume):
+        # Holds the final rewrite between its "rewritten" stage and its save.
+        if html_resume == FINAL:
+            await release.wait()
+        return ""
+
+    monkeypatch.setattr(gateway, "_render_pdf", render)
+    return release
+
+
+async def _upload(client):
+    response = await client.post(
+        "/upload",
+        files={"original_resume": ("resume.txt", RESUME.encode("utf-8"), "text/plain")},
+        data={"job_description": JOB},
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "draft"
+    return response.json()["session_id"]
+
+
+def test_draft_is_served_until_final_rewrite_is_saved(gateway, monkeypatch):
+    release = _setup(gateway, monkeypatch, _rewritten)
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            session_id = await _upload(client)
+            await until(lambda: gateway.session_store.fetch_meta(session_id)["stage"] == "rewritten")
+
+            status = (await client.get(f"/result/{session_id}/status")).json()
+            assert (status["status"], status["stage"], status["version"]) == ("draft", "rewritten", 1)
+            result = await client.get(f"/result/{session_id}")
+            assert result.status_code == 200
+            assert result.json()["html_resume"] == DRAFT
+
+            release.set()
+            await asyncio.gather(*gateway._background_uploads)
+            status = (await client.get(f"/result/{session_id}/status")).json()
+            assert (status["status"], status["version"]) == ("ready", 2)
+            result = await client.get(f"/result/{session_id}")
+            assert result.json()["html_resume"] == FINAL
+
+    asyncio.run(scenario())
+
+
+def test_draft_stays_the_result_when_rewrite_fails(gateway, monkeypatch):
+    def failing(resume_text, job_description, local_fallback=True):
+        raise HTTPException(status_code=500, detail="OpenAI error: every model failed")
+
+    _setup(gateway, monkeypatch, failing)
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            session_id = await _upload(client)
+            await asyncio.gather(*gateway._background_uploads)
+
+            status = (await client.get(f"/result/{session_id}/status")).json()
+            assert (status["status"], status["stage"]) == ("ready", "failed")
+            result = await client.get(f"/result/{session_id}")
+            assert result.status_code == 200
+            assert result.json()["html_resume"] == DRAFT
+
+    asyncio.run(scenario())
+
+
+def test_draft_rewrite_and_analysis_run_off_the_event_loop(gateway, monkeypatch):
+    release = _setup(gateway, monkeypatch, _rewritten)
+    threads = []
+    analyze = gateway._analyze_rewrite
+
+    def recording(resume_text, job_description, html_resume):
+        threads.append(threading.get_ident())
+        return analyze(resume_text, job_description, html_resume)
+
+    monkeypatch.setattr(gateway, "_analyze_rewrite", recording)
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            await _upload(client)
+            release.set()
+            await asyncio.gather(*gateway._background_uploads)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads and loop_thread not in threads
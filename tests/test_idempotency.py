@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import asgi_client
+
+RESUME = "Jane Doe\nEXPERIENCE\nBackend Engineer\nAcme Corp\n2020 - Present\n• Built payment APIs in Python\n"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, gateway, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        monkeypatch.setattr(gateway, "SESSION_DB_PATH", str(tmp_path / "sessions.db"))
+    store = gateway.SessionStore()
+    monkeypatch.setattr(gateway, "session_store", store)
+    return store
+
+
+def test_concurrent_requests_with_one_key_run_once(gateway, store):
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return {"session_id": "s1", "status": "ready"}
+
+    async def scenario():
+        return await asyncio.gather(*(gateway._idempotent("key-1", run) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [response for response, _ in results] == [{"session_id": "s1", "status": "ready"}] * 3
+    assert sorted(replayed for _, replayed in results) == [False, True, True]
+
+
+def test_finished_request_is_replayed(gateway, store):
+    calls = []
+
+    async def run():
+        calls.append(1)
+        return {"session_id": f"s{len(calls)}", "status": "ready"}
+
+    first = asyncio.run(gateway._idempotent("key-1", run))
+    again = asyncio.run(gateway._idempotent("key-1", run))
+    other = asyncio.run(gateway._idempotent("key-2", run))
+
+    assert first == ({"session_id": "s1", "status": "ready"}, False)
+    assert again == ({"session_id": "s1", "status": "ready"}, True)
+    assert other == ({"session_id": "s2", "status": "ready"}, False)
+
+
+def test_failed_request_releases_the_key(gateway, store):
+    async def failing():
+        raise HTTPException(status_code=500, detail="every model failed")
+
+    async def succeeding():
+        return {"session_id": "s1", "status": "ready"}
+
+    with pytest.raises(HTTPException):
+        asyncio.run(gateway._idempotent("key-1", failing))
+    assert asyncio.run(gateway._idempotent("key-1", succeeding)) == ({"session_id": "s1", "status": "ready"}, False)
+
+
+def test_request_still_in_progress_past_the_deadline_conflicts(gateway, store, monkeypatch):
+    async def run():
+        raise AssertionError("must not run while another request holds the key")
+
+    record_key = gateway.IDEMPOTENCY_PREFIX + hashlib.sha256(b"key-1").hexdigest()
+    store.put_record(record_key, {"status": "in_progress"}, 60)
+    monkeypatch.setattr(gateway, "IDEMPOTENCY_LOCK_SECONDS", -1)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(gateway._idempotent("key-1", run))
+    assert raised.value.status_code == 409
+
+
+def test_upload_replays_with_header(gateway, monkeypatch):
+    calls = []
+
+    def rewrite(resume_text, job_description, local_fallback=True):
+        calls.append(1)
+        html = '<div class="resume"><p>final</p></div>'
+        return {"html_resume": html, "ats_score": 90, "transformations": [], "keywords_matched": [], "keywords_missing": []}
+
+    async def render(html_resume):
+        return ""
+
+    monkeypatch.setattr(gateway, "DRAFT_ENABLED", False)
+    monkeypatch.setattr(gateway, "_rewrite_resume_integrated", rewrite)
+    monkeypatch.setattr(gateway, "_render_pdf", render)
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            responses = []
+            for _ in range(2):
+                responses.append(await client.post(
+                    "/upload",
+                    files={"original_resume": ("resume.txt", RESUME.encode("utf-8"), "text/plain")},
+                    data={"job_description": "Backend engineer"},
+                    headers={"Idempotency-Key": "upload-1"},
+                ))
+            return responses
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+def test_store_calls_stay_off_the_event_loop(gateway, monkeypatch):
+    calls = []
+
+    class RecordingStore(gateway.SessionStore):
+        def __getattribute__(self, name):
+            attr = super().__getattribute__(name)
+            if name not in ("claim", "put_record", "delete_record", "save", "put_meta", "fetch", "fetch_meta",
+                            "fetch_body", "purge_expired"):
+                return attr
+
+            def recorded(*args, **kwargs):
+                calls.append((name, threading.get_ident()))
+                return attr(*args, **kwargs)
+
+            return recorded
+
+    def rewrite(resume_text, job_description, local_fallback=True):
+        html = '<div class="resume"><p>final</p></div>'
+        return {"html_resume": html, "ats_score": 90, "transformations": [], "keywords_matched": [], "keywords_missing": []}
+
+    async def render(html_resume):
+        return ""
+
+    monkeypatch.setattr(gateway, "session_store", RecordingStore())
+    monkeypatch.setattr(gateway, "DRAFT_ENABLED", False)
+    monkeypatch.setattr(gateway, "_rewrite_resume_integrated", rewrite)
+    monkeypatch.setattr(gateway, "_render_pdf", render)
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            response = await client.post(
+                "/upload",
+                files={"original_resume": ("resume.txt", RESUME.encode("utf-8"), "text/plain")},
+                data={"job_description": "Backend engineer"},
+                headers={"Idempotency-Key": "upload-1", "Prefer": "respond-async"},
+            )
+            session_id = response.json()["session_id"]
+            assert (await client.get(f"/result/{session_id}?wait=5")).status_code == 200
+            assert (await client.get(f"/result/{session_id}/status")).status_code == 200
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert {name for name, _ in calls} >= {"claim", "put_record", "put_meta", "save", "fetch_meta", "fetch_body"}
+    assert [name for name, thread in calls if thread == loop_thread] == []
@@ -0,0 +1,120 @@
+import multiprocessing
+
+import pytest
+
+from utils import jd_index
+from utils.jd_index import JobIndex
+
+BACKEND = "Backend engineer: Python, PostgreSQL, Kubernetes, payment APIs"
+DATA = "Data analyst: SQL, dashboards, Tableau, revenue reporting"
+
+
+def test_top_k_ranks_the_closest_posting_first():
+    index = JobIndex()
+    index.add("backend", BACKEND, title="Backend")
+    index.add("data", DATA, title="Data")
+    assert [job_id for job_id, _, _ in index.top_k("Python APIs on Kubernetes", 2)] == ["backend"]
+
+
+def test_changes_survive_a_restart_through_the_log(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    index = JobIndex(path)
+    index.add("backend", BACKEND, title="Backend")
+    index.add("data", DATA, title="Data")
+    index.add("backend", BACKEND + ", Go", title="Backend (Go)")
+    index.remove("data")
+
+    assert not (tmp_path / "jobs.json").exists()
+    # The generation header plus one line per change.
+    assert len((tmp_path / "jobs.json.log").read_text().splitlines()) == 5
+    reloaded = JobIndex(path)
+    assert len(reloaded) == 1
+    assert reloaded.top_k("Python", 1)[0][:2] == ("backend", "Backend (Go)")
+
+
+def test_log_is_compacted_into_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(jd_index, "JD_INDEX_COMPACT_OPS", 3)
+    path = str(tmp_path / "jobs.json")
+    index = JobIndex(path)
+    for revision in ("first", "second", "third", "fourth", "fifth"):
+        index.add("backend", f"{BACKEND}, {revision}")
+        index.add("data", DATA)
+
+    assert (tmp_path / "jobs.json").exists()
+    assert len((tmp_path / "jobs.json.log").read_text().splitlines()) <= 4
+    reloaded = JobIndex(path)
+    assert len(reloaded) == 2
+    assert reloaded.top_k("fifth", 1)[0][0] == "backend"
+    assert reloaded.top_k("fourth", 1) == []
+
+
+def test_torn_last_log_line_is_ignored(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    JobIndex(path).add("backend", BACKEND)
+    with open(tmp_path / "jobs.json.log", "a", encoding="utf-8") as handle:
+        handle.write('{"op": "add", "job_id": "da')
+    assert "backend" in JobIndex(path)
+
+
+def test_workers_sharing_a_path_see_each_others_changes(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    first, second = JobIndex(path), JobIndex(path)
+    first.add("backend", BACKEND, title="Backend")
+    second.add("data", DATA, title="Data")
+
+    assert first.top_k("Tableau dashboards", 1)[0][0] == "data"
+    assert second.top_k("Kubernetes", 1)[0][0] == "backend"
+    second.remove("backend")
+    assert first.top_k("Kubernetes", 1) == []
+
+
+def test_compaction_keeps_changes_logged_by_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(jd_index, "JD_INDEX_COMPACT_OPS", 3)
+    path = str(tmp_path / "jobs.json")
+    first, second = JobIndex(path), JobIndex(path)
+    second.add("data", DATA, title="Data")
+    # Enough changes on the first worker to compact the log it shares with the second.
+    for revision in ("first", "second", "third", "fourth", "fifth"):
+        first.add("backend", f"{BACKEND}, {revision}")
+    second.add("design", "Product designer: Figma, prototyping, user research")
+
+    assert (tmp_path / "jobs.json").exists()
+    for index in (first, second, JobIndex(path)):
+        assert index.top_k("Tableau", 1)[0][0] == "data"
+        assert index.top_k("Figma", 1)[0][0] == "design"
+        assert index.top_k("fifth", 1)[0][0] == "backend"
+        assert len(index) == 3
+
+
+def test_log_from_before_the_snapshot_is_not_replayed(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    index = JobIndex(path)
+    index.add("backend", BACKEND)
+    stale = (tmp_path / "jobs.json.log").read_text()
+    index.remove("backend")
+    index.save()
+    # A crash between writing the snapshot and restarting the log.
+    (tmp_path / "jobs.json.log").write_text(stale)
+
+    assert "backend" not in JobIndex(path)
+
+
+def _add_postings(path, worker):
+    jd_index.JD_INDEX_COMPACT_OPS = 5
+    index = JobIndex(path)
+    for n in range(40):
+        index.add(f"{worker}-{n}", f"{worker} posting number {n}")
+
+
+@pytest.mark.skipif(jd_index.fcntl is None, reason="needs flock")
+def test_concurrent_worker_processes_lose_no_postings(tmp_path):
+    path = str(tmp_path / "jobs.json")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_add_postings, args=(path, worker)) for worker in ("alpha", "beta", "gamma")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    assert len(JobIndex(path)) == 120
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+latex = pytest.importorskip("utils.latex_generator")
+
+TEX = "\\documentclass{article}\n\\begin{document}\nHi\n\\end{document}\n"
+
+
+def test_concurrent_compiles_are_bounded_by_the_pool(monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def compile_stub(tex_source):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return b"%PDF"
+
+    monkeypatch.setattr(latex, "_compile", compile_stub)
+
+    async def scenario():
+        return await asyncio.gather(*(asyncio.to_thread(latex.build_pdf, TEX) for _ in range(6)))
+
+    results = asyncio.run(scenario())
+    assert [pdf_b64 for _, pdf_b64 in results] == ["JVBERg=="] * 6
+    assert len(peak) == 6
+    assert max(peak) <= latex.LATEX_MAX_WORKERS
+
+
+def test_limits_are_set_without_preexec_fn(monkeypatch):
+    monkeypatch.setattr(latex, "_PRLIMIT", "/usr/bin/prlimit")
+    command = latex._limited(["pdflatex", "resume.tex"])
+    assert command[0] == "/usr/bin/prlimit"
+    assert f"--cpu={latex.LATEX_MAX_CPU_SECONDS}" in command
+    assert command[-3:] == ["--", "pdflatex", "resume.tex"]
+
+
+@pytest.fixture
+def format_dir(tmp_path, monkeypatch):
+    path = tmp_path / "formats"
+    monkeypatch.setattr(latex, "LATEX_FORMAT_DIR", path)
+    monkeypatch.setattr(latex, "_formats", {})
+    return path
+
+
+def test_format_is_built_privately_and_renamed_into_place(format_dir, monkeypatch):
+    seen = []
+
+    def build(command, cwd, env=None):
+        # The build runs in its own scratch dir, never in the shared format dir itself.
+        seen.append(cwd)
+        assert cwd.parent == format_dir
+        (cwd / "resume_abc.fmt").write_bytes(b"format")
+
+    monkeypatch.setattr(latex, "_run_pdflatex", build)
+
+    assert latex._preamble_format("abc", "\\documentclass{article}\n") == "resume_abc"
+    assert (format_dir / "resume_abc.fmt").read_bytes() == b"format"
+    assert sorted(path.name for path in format_dir.iterdir()) == ["resume_abc.fmt"]
+    assert format_dir.stat().st_mode & 0o777 == 0o700
+    assert not seen[0].exists()
+
+
+@pytest.mark.skipif(not hasattr(latex.os, "getuid"), reason="POSIX permissions")
+def test_format_dir_writable_by_others_is_not_used(format_dir, monkeypatch):
+    format_dir.mkdir(mode=0o777)
+    format_dir.chmod(0o777)
+    (format_dir / "resume_abc.fmt").write_bytes(b"planted")
+    monkeypatch.setattr(latex, "_run_pdflatex", lambda *args, **kwargs: pytest.fail("must not build here"))
+
+    assert latex._preamble_format("abc", "\\documentclass{article}\n") is None
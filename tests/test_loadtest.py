@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+uvicorn = pytest.importorskip("uvicorn")
+
+from loadtest import driver, stub_openai  # noqa: E402
+
+
+def _serve(app):
+    """Run ``app`` on a free local port in a background thread; returns (url, server)."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise AssertionError("server did not start")
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+@pytest.fixture
+def stack(gateway, monkeypatch):
+    """The gateway and the OpenAI stub on real sockets, the gateway pointed at the stub."""
+    monkeypatch.setattr(stub_openai, "LATENCY", "fixed:20")
+    stub_url, stub = _serve(stub_openai.app)
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"{stub_url}/v1")
+    monkeypatch.setattr(gateway, "_openai_client", None)
+    gateway_url, server = _serve(gateway.app)
+    yield gateway_url
+    # Let uploads answered with 202 finish before their LLM stub goes away.
+    deadline = time.monotonic() + 10
+    while gateway._background_uploads and time.monotonic() < deadline:
+        time.sleep(0.05)
+    server.should_exit = stub.should_exit = True
+
+
+def _args(url, **overrides):
+    args = dict(
+        url=url, mode="integrated", concurrency=2, duration=1.0, size="small", timeout=30.0,
+        poll_interval=0.05, max_polls=200, max_backoff=1.0, respond_async=False,
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_driver_completes_flows_against_the_stub(stack):
+    summary = asyncio.run(driver.run(_args(stack)))
+
+    assert summary["completed_flows"] > 0
+    assert summary["steps"]["upload"]["error_rate"] == 0
+    assert summary["steps"]["flow"]["outcomes"] == {"200": summary["completed_flows"]}
+
+
+def test_accepted_uploads_are_polled_not_retried(stack):
+    summary = asyncio.run(driver.run(_args(stack, respond_async=True)))
+
+    upload = summary["steps"]["upload"]
+    assert set(upload["outcomes"]) == {"202"}
+    assert upload["error_rate"] == 0
+    assert summary["completed_flows"] == upload["count"]
+
+
+def test_flows_out_of_polls_count_as_timeouts(stack, monkeypatch):
+    monkeypatch.setattr(stub_openai, "LATENCY", "fixed:500")
+    summary = asyncio.run(driver.run(_args(stack, respond_async=True, duration=0.2, max_polls=2)))
+
+    flow = summary["steps"]["flow"]
+    assert summary["completed_flows"] == 0
+    assert flow["outcomes"] == {"timeout": summary["steps"]["upload"]["count"]}
+    assert flow["error_rate"] == 1
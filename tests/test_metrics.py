@@ -0,0 +1,64 @@
+import asyncio
+
+from conftest import asgi_client
+from utils import metrics
+
+
+def test_histogram_buckets_are_cumulative_and_upper_inclusive():
+    histogram = metrics.Histogram("test_seconds", "Test latency.", ("stage",), buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 1, 30):
+        histogram.observe(value, stage="parse")
+
+    assert histogram.samples() == [
+        'test_seconds_bucket{stage="parse",le="0.1"} 2',
+        'test_seconds_bucket{stage="parse",le="1"} 4',
+        'test_seconds_bucket{stage="parse",le="10"} 4',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 5',
+        'test_seconds_sum{stage="parse"} 31.65',
+        'test_seconds_count{stage="parse"} 5',
+    ]
+    assert histogram.count(stage="parse") == 5
+    assert histogram.count(stage="other") == 0
+
+
+def test_registry_renders_the_text_exposition_format():
+    registry = metrics.Registry()
+    requests = registry.register(metrics.Counter("test_requests_total", "Requests.", ("path",)))
+    registry.register(metrics.Counter("test_requests_total", "Registered twice.")).inc(path="/a")
+    requests.inc(2, path='say "hi"\n\\')
+    in_flight = registry.register(metrics.Gauge("test_in_flight", "In flight."))
+    in_flight.set(1.5)
+
+    assert registry.render() == (
+        "# HELP test_requests_total Requests.\n"
+        "# TYPE test_requests_total counter\n"
+        'test_requests_total{path="/a"} 1\n'
+        'test_requests_total{path="say \\"hi\\"\\n\\\\"} 2\n'
+        "# HELP test_in_flight In flight.\n"
+        "# TYPE test_in_flight gauge\n"
+        "test_in_flight 1.5\n"
+    )
+
+
+def test_gauge_callback_is_read_at_scrape_time_and_errors_are_skipped():
+    gauge = metrics.Gauge("test_entries", "Entries.", ("backend",))
+    entries = [3]
+    gauge.set_function(lambda: entries[0], backend="memory")
+    gauge.set_function(lambda: 1 / 0, backend="broken")
+    entries[0] = 7
+
+    assert gauge.samples() == ['test_entries{backend="memory"} 7']
+
+
+def test_metrics_endpoint_serves_stage_latencies(gateway):
+    with metrics.stage("test", "parse", "integrated"):
+        pass
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.get("/metrics")
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    assert "# TYPE resumate_stage_duration_seconds histogram" in response.text
+    assert 'resumate_stage_duration_seconds_count{service="test",stage="parse",mode="integrated"} 1' in response.text
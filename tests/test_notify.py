@@ -0,0 +1,137 @@
+import asyncio
+import queue
+import threading
+import time
+
+from utils.notify import Notifier
+
+
+class FakeBroker:
+    """An in-process stand-in for Redis pub/sub shared by several Notifiers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def publish(self, channel, data):
+        with self._lock:
+            listeners = list(self._listeners)
+        for subscribed, messages in listeners:
+            if channel in subscribed:
+                messages.put({"type": "message", "channel": channel, "data": data})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self._broker = broker
+        self._subscribed = set()
+        self._messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self._subscribed.add(channel)
+        with self._broker._lock:
+            self._broker._listeners.append((self._subscribed, self._messages))
+
+    def listen(self):
+        while True:
+            yield self._messages.get()
+
+
+class FailingRedis(FakeBroker):
+    def publish(self, channel, data):
+        raise ConnectionError("redis is down")
+
+
+async def _next(events, timeout=2.0):
+    return await asyncio.wait_for(events.get(), timeout)
+
+
+def test_event_reaches_every_subscriber_of_its_key():
+    notifier = Notifier()
+
+    async def scenario():
+        async with notifier.subscribe("s1") as first, notifier.subscribe("s1") as second, notifier.subscribe("s2") as other:
+            notifier.publish("s1", {"stage": "parsed"})
+            assert await _next(first) == {"stage": "parsed"}
+            assert await _next(second) == {"stage": "parsed"}
+            await asyncio.sleep(0.01)
+            assert other.empty()
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_a_worker_thread():
+    notifier = Notifier()
+
+    async def scenario():
+        async with notifier.subscribe("s1") as events:
+            await asyncio.to_thread(notifier.publish, "s1", {"stage": "rewritten"})
+            return await _next(events)
+
+    assert asyncio.run(scenario()) == {"stage": "rewritten"}
+
+
+def test_subscription_is_removed_when_the_block_exits():
+    notifier = Notifier()
+
+    async def scenario():
+        async with notifier.subscribe("s1"):
+            assert "s1" in notifier._subscribers
+        assert "s1" not in notifier._subscribers
+        notifier.publish("s1", {"stage": "ready"})
+
+    asyncio.run(scenario())
+
+
+def test_event_reaches_subscribers_on_another_worker():
+    broker = FakeBroker()
+    publisher, subscriber = Notifier(broker), Notifier(broker)
+
+    async def scenario():
+        async with subscriber.subscribe("s1") as remote, publisher.subscribe("s1") as local:
+            # The listener thread subscribes to the channel asynchronously.
+            deadline = time.monotonic() + 2
+            while len(broker._listeners) < 2 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            publisher.publish("s1", {"stage": "pdf_ready"})
+            assert await _next(remote) == {"stage": "pdf_ready"}
+            assert await _next(local) == {"stage": "pdf_ready"}
+            # The publisher's own listener drops its echo instead of delivering twice.
+            await asyncio.sleep(0.05)
+            assert local.empty()
+
+    asyncio.run(scenario())
+
+
+def test_redis_failure_still_delivers_locally():
+    notifier = Notifier(FailingRedis())
+
+    async def scenario():
+        async with notifier.subscribe("s1") as events:
+            notifier.publish("s1", {"stage": "failed"})
+            return await _next(events)
+
+    assert asyncio.run(scenario()) == {"stage": "failed"}
+
+
+def test_long_poll_returns_when_the_session_finishes(gateway):
+    store = gateway.session_store
+    store.put_meta("s1", {"status": "processing", "stage": "parsed", "etag": None})
+
+    async def finish():
+        await asyncio.sleep(0.05)
+        meta = {"status": "ready", "stage": "ready", "etag": "abc"}
+        store.put_meta("s1", meta)
+        gateway.notifier.publish("s1", meta)
+
+    async def scenario():
+        started = time.monotonic()
+        meta, _ = await asyncio.gather(gateway._await_change("s1", 10, None), finish())
+        return meta, time.monotonic() - started
+
+    meta, elapsed = asyncio.run(scenario())
+    assert meta["status"] == "ready"
+    assert elapsed < 2
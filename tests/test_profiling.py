@@ -0,0 +1,81 @@
+import asyncio
+import pstats
+import time
+
+import pytest
+
+from conftest import asgi_client
+from utils import profiling
+
+RESUME = "Jane Doe\nEXPERIENCE\nBackend Engineer\nAcme Corp\n2020 - Present\n• Built payment APIs in Python\n"
+
+
+def _slow_rewrite(resume_text, job_description, local_fallback=True):
+    time.sleep(0.2)
+    html = '<div class="resume"><p>final</p></div>'
+    return {"html_resume": html, "ats_score": 90, "transformations": [], "keywords_matched": [], "keywords_missing": []}
+
+
+@pytest.fixture
+def profiled(gateway, monkeypatch, tmp_path):
+    async def render(html_resume):
+        return ""
+
+    monkeypatch.setattr(profiling, "PROFILE_REQUESTS", True)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "")
+    monkeypatch.setattr(gateway, "DRAFT_ENABLED", False)
+    monkeypatch.setattr(gateway, "_rewrite_resume_integrated", _slow_rewrite)
+    monkeypatch.setattr(gateway, "_render_pdf", render)
+    return gateway
+
+
+def _upload(gateway, headers):
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.post(
+                "/upload",
+                files={"original_resume": ("resume.txt", RESUME.encode("utf-8"), "text/plain")},
+                data={"job_description": "Backend engineer"},
+                headers=headers,
+            )
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    return response
+
+
+def test_cprofile_covers_work_run_in_worker_threads(profiled, tmp_path):
+    response = _upload(profiled, {"X-Profile": "cprofile"})
+
+    stats = pstats.Stats(str(tmp_path / response.headers["X-Profile-Id"]))
+    functions = {name for _, _, name in stats.stats}
+    assert "parse_resume" in functions
+    assert "_slow_rewrite" in functions
+
+
+def test_sampler_covers_work_run_in_worker_threads(profiled, tmp_path):
+    response = _upload(profiled, {"X-Profile": "sample"})
+
+    folded = (tmp_path / response.headers["X-Profile-Id"]).read_text()
+    assert "_slow_rewrite (test_profiling.py" in folded
+
+
+def test_gated_profile_is_written_under_the_session_id(profiled, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+
+    for headers in ({"X-Profile": "sample"}, {"X-Profile": "sample", "X-Profile-Token": "wrong"}):
+        assert "X-Profile-Id" not in _upload(profiled, headers).headers
+    assert list(tmp_path.iterdir()) == []
+
+    response = _upload(profiled, {"X-Profile": "sample", "X-Profile-Token": "secret"})
+    session_id = response.json()["session_id"]
+    profile_id = response.headers["X-Profile-Id"]
+    assert profile_id == f"{session_id}-gateway.folded"
+    assert [path.name for path in tmp_path.iterdir()] == [profile_id]
+
+    async def download():
+        async with asgi_client(profiled.app) as client:
+            return await client.get(f"/debug/profiles/{profile_id}")
+
+    assert asyncio.run(download()).content == (tmp_path / profile_id).read_bytes()
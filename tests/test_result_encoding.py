@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from utils import responses
+
+from conftest import asgi_client
+
+BROWSER = "gzip, deflate, br, zstd"
+
+
+def _save(gateway):
+    return gateway.session_store.save("s1", "<div>resume</div>", "", 75, [], [], [])
+
+
+def _get(gateway, headers):
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.get("/result/s1", headers=headers)
+
+    return asyncio.run(scenario())
+
+
+def test_without_brotli_browsers_get_stored_gzip(gateway, monkeypatch):
+    precompress = responses.precompress
+    monkeypatch.setattr(responses, "precompress", lambda body: {k: v for k, v in precompress(body).items() if k != "br"})
+    meta = _save(gateway)
+    assert "br" not in meta["encodings"]
+
+    response = _get(gateway, {"Accept-Encoding": BROWSER})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == responses.etag(meta["etag"], "gzip")
+    assert response.json()["html_resume"] == "<div>resume</div>"
+
+
+def test_brotli_body_is_served_when_stored(gateway):
+    meta = _save(gateway)
+    if "br" not in meta["encodings"]:
+        pytest.skip("brotli is not installed")
+    response = _get(gateway, {"Accept-Encoding": BROWSER})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["etag"] == responses.etag(meta["etag"], "br")
+
+
+def test_revalidation_returns_304(gateway):
+    meta = _save(gateway)
+    response = _get(gateway, {"Accept-Encoding": "gzip", "If-None-Match": responses.etag(meta["etag"], "gzip")})
+    assert response.status_code == 304
+
+
+def test_negotiate_only_offers_available_codings():
+    assert responses.negotiate(BROWSER, ("gzip", "identity")) == "gzip"
+    assert responses.negotiate(BROWSER, responses.PREFERENCE) == "br"
+    assert responses.negotiate("br", ("gzip", "identity")) == "identity"
+
+
+def _get_status(gateway, headers, query=""):
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.get(f"/result/s1/status{query}", headers=headers)
+
+    return asyncio.run(scenario())
+
+
+def test_status_tag_revalidates_with_304(gateway):
+    _save(gateway)
+    first = _get_status(gateway, {})
+    assert first.status_code == 200
+    assert first.headers["etag"].endswith('-status"')
+    assert first.json()["status"] == "ready"
+
+    again = _get_status(gateway, {"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.content == b""
+
+    # The body tag names the same resume but not the same status.
+    body_tag = _get(gateway, {"Accept-Encoding": "identity"}).headers["etag"]
+    assert _get_status(gateway, {"If-None-Match": body_tag}).status_code == 200
+
+
+def test_status_tag_changes_with_the_stage(gateway):
+    meta = _save(gateway)
+    tag = _get_status(gateway, {}).headers["etag"]
+    gateway.session_store.put_meta("s1", {**meta, "status": "draft", "stage": "rewritten"})
+
+    response = _get_status(gateway, {"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.json()["stage"] == "rewritten"
+    assert response.headers["etag"] != tag
+
+
+def test_status_long_poll_answers_304_when_nothing_changed(gateway):
+    _save(gateway)
+    tag = _get_status(gateway, {}).headers["etag"]
+
+    response = _get_status(gateway, {"If-None-Match": tag}, "?wait=0.1")
+    assert response.status_code == 304
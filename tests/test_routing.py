@@ -0,0 +1,130 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import routing
+from utils.routing import ModelRouter
+
+
+class APIError(Exception):
+    pass
+
+
+class AuthenticationError(Exception):
+    pass
+
+
+class FakeClient:
+    """The slice of the OpenAI client the router uses; ``failures`` maps a model to the error it raises."""
+
+    def __init__(self, failures=None, usage=True):
+        self.failures = dict(failures or {})
+        self.usage = usage
+        self.calls = []
+
+    def with_options(self, **options):
+        completions = SimpleNamespace(create=lambda model, messages, **kwargs: self._create(model, options))
+        return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    def _create(self, model, options):
+        self.calls.append((model, options))
+        if model in self.failures:
+            raise self.failures[model]
+        usage = {"prompt_tokens": 100, "completion_tokens": 200} if self.usage else None
+        return SimpleNamespace(model=model, usage=usage)
+
+
+MESSAGES = [{"role": "user", "content": "Rewrite this resume. " * 20}]
+
+
+def _models(client):
+    return [model for model, _ in client.calls]
+
+
+def test_falls_back_to_the_next_model_on_error():
+    router = ModelRouter("test", ["fast", "backup"])
+    client = FakeClient({"fast": APIError("502 bad gateway")})
+    before = routing.LLM_FALLBACKS.value(service="test", from_model="fast", to="backup")
+
+    completion, model = router.complete(client, MESSAGES)
+
+    assert (model, completion.model) == ("backup", "backup")
+    assert _models(client) == ["fast", "backup"]
+    # Only the last tier retries, and a bounded number of times.
+    assert client.calls[0][1]["max_retries"] == 0
+    assert client.calls[1][1]["max_retries"] == routing.LLM_LAST_TIER_RETRIES
+    assert routing.LLM_FALLBACKS.value(service="test", from_model="fast", to="backup") == before + 1
+
+
+def test_failed_model_is_tried_last_while_cooling_down(monkeypatch):
+    router = ModelRouter("test", ["fast", "backup"])
+    router.complete(FakeClient({"fast": APIError("down")}), MESSAGES)
+
+    client = FakeClient()
+    assert router.complete(client, MESSAGES)[1] == "backup"
+    assert _models(client) == ["backup"]
+    assert router.snapshot()["fast"]["cooling_down"]
+
+    monkeypatch.setattr(routing, "LLM_FAILURE_COOLDOWN_SECONDS", 0)
+    client = FakeClient()
+    assert router.complete(client, MESSAGES)[1] == "fast"
+
+
+def test_success_clears_the_cooldown():
+    router = ModelRouter("test", ["fast", "backup"])
+    router.complete(FakeClient({"fast": APIError("down")}), MESSAGES)
+    # "backup" also fails, so the cascade falls through to "fast" and it recovers.
+    router.complete(FakeClient({"backup": APIError("down")}), MESSAGES)
+
+    assert not router.snapshot()["fast"]["cooling_down"]
+    assert router.plan(100, 100)[0].model == "fast"
+
+
+def test_success_without_usage_clears_the_cooldown():
+    router = ModelRouter("test", ["fast", "backup"])
+    router.complete(FakeClient({"fast": APIError("down")}), MESSAGES)
+    router.complete(FakeClient({"backup": APIError("down")}, usage=False), MESSAGES)
+
+    assert not router.snapshot()["fast"]["cooling_down"]
+
+
+def test_authentication_error_is_raised_without_falling_back():
+    router = ModelRouter("test", ["fast", "backup"])
+    client = FakeClient({"fast": AuthenticationError("invalid api key")})
+
+    with pytest.raises(AuthenticationError):
+        router.complete(client, MESSAGES)
+    assert _models(client) == ["fast"]
+    assert not router.snapshot()["fast"]["cooling_down"]
+
+
+def test_last_error_is_raised_when_every_model_fails():
+    router = ModelRouter("test", ["fast", "backup"])
+    client = FakeClient({"fast": APIError("fast down"), "backup": APIError("backup down")})
+
+    with pytest.raises(APIError, match="backup down"):
+        router.complete(client, MESSAGES)
+    assert _models(client) == ["fast", "backup"]
+
+
+def test_slow_model_is_skipped_when_another_meets_the_slo(monkeypatch):
+    monkeypatch.setattr(routing, "LLM_LATENCY_SLO_SECONDS", 10)
+    router = ModelRouter("test", ["big", "small"])
+    # Observed: "big" takes 0.5 s per completion token, "small" 0.01 s.
+    router._record("big", 100.0, 100, {"completion_tokens": 200})
+    router._record("small", 2.0, 100, {"completion_tokens": 200})
+
+    routes = router.plan(prompt_tokens=500, work_tokens=100)
+    assert [route.model for route in routes] == ["small", "big"]
+    assert routes[0].seconds == pytest.approx(2.0)
+
+    # Nothing fits a tighter SLO: take the fastest.
+    monkeypatch.setattr(routing, "LLM_LATENCY_SLO_SECONDS", 0.1)
+    assert router.plan(prompt_tokens=500, work_tokens=100)[0].model == "small"
+
+
+def test_cost_cap_skips_expensive_models(monkeypatch):
+    monkeypatch.setattr(routing, "LLM_MAX_COST_USD", 0.005)
+    router = ModelRouter("test", ["gpt-4o", "gpt-4o-mini"])
+
+    assert router.plan(prompt_tokens=1000, work_tokens=1000)[0].model == "gpt-4o-mini"
@@ -0,0 +1,122 @@
+import asyncio
+import importlib.util
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import ROOT, asgi_client
+from models import Bullet, Experience, Heading, Project, ResumePayload
+from utils import scorer
+
+RESUMES = [
+    "Backend engineer building Python payment APIs on Kubernetes with PostgreSQL",
+    "Data analyst writing SQL dashboards in Tableau for revenue reporting",
+    "Frontend developer shipping React interfaces",
+]
+JOBS = [
+    "Backend engineer: Python, PostgreSQL, Kubernetes, payment APIs",
+    "Data analyst: SQL, dashboards, Tableau, revenue reporting",
+]
+
+
+def test_scores_are_deterministic():
+    first = scorer.score_texts(RESUMES, JOBS)
+    assert (scorer.score_texts(RESUMES, JOBS) == first).all()
+    assert scorer.score_text(RESUMES[0], JOBS[0]) == scorer.score_text(RESUMES[0], JOBS[0])
+
+
+def test_batch_shapes_and_pairwise_agreement():
+    one_resume = scorer.score_texts(RESUMES[:1], JOBS)
+    one_job = scorer.score_texts(RESUMES, JOBS[:1])
+
+    assert one_resume.shape == (1, len(JOBS))
+    assert one_job.shape == (len(RESUMES), 1)
+    # A pair scores the same alone as in any batch.
+    for i, resume in enumerate(RESUMES):
+        for j, job in enumerate(JOBS):
+            assert scorer.score_texts(RESUMES, JOBS)[i, j] == scorer.score_text(resume, job)
+    assert one_resume[0, 0] == one_job[0, 0]
+
+
+def test_scores_are_bounded_and_rank_matches():
+    scores = scorer.score_texts(RESUMES + ["", "<p>Python</p>"], JOBS)
+
+    assert scores.min() >= scorer.ATS_MIN and scores.max() <= scorer.ATS_MAX
+    assert scores[0, 0] == scorer.ATS_MAX  # every term of the backend JD is present
+    assert scores[0, 0] > scores[0, 1] and scores[1, 1] > scores[1, 0]
+    assert scores[3, 0] == scorer.ATS_MIN
+    assert scorer.score_text(RESUMES[0], "   ") == (scorer.ATS_MIN + scorer.ATS_MAX) // 2
+
+
+def _payload():
+    return ResumePayload(
+        heading=Heading(name="Jane Doe", title="Backend Engineer", phone="", email="jane@example.com", linkedin="", github=""),
+        experiences=[
+            Experience(
+                role="Backend Engineer",
+                company="Acme",
+                location="Berlin",
+                start="2020",
+                end="Present",
+                bullets=[Bullet(text="Built Python payment APIs on Kubernetes")],
+            )
+        ],
+        skills=["Python", "PostgreSQL"],
+        projects=[Project(name="Ledger", stack="Python", timeline="2021", bullets=[Bullet(text="Reconciled revenue")])],
+        education="BSc Computer Science",
+        certifications=["CKA"],
+    )
+
+
+def _load_rewriter_service():
+    spec = importlib.util.spec_from_file_location("rewriter_service_main", os.path.join(ROOT, "rewriter-service", "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_gateway_rewriter_service_and_agents_agree(gateway, monkeypatch):
+    payload = _payload()
+    job = JOBS[0] + ", Terraform, observability"
+    html = "<div class=\"resume\"><p>" + scorer.payload_text(payload).replace("\n", "</p><p>") + "</p></div>"
+
+    agent_score = scorer.score_ats(payload, job)
+    gateway_score = gateway._analyze_rewrite(RESUMES[0], job, html)["ats_score"]
+
+    service = _load_rewriter_service()
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=html))])
+    monkeypatch.setattr(service, "get_client", lambda: object())
+    monkeypatch.setattr(service.llm_router, "complete", lambda client, messages, **kwargs: (completion, "stub"))
+
+    async def scenario():
+        async with asgi_client(service.app) as client:
+            return await client.post("/generate", json={"resume_text": RESUMES[0], "job_description": job})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert agent_score == gateway_score == response.json()["ats_score"]
+    assert scorer.ATS_MIN < agent_score < scorer.ATS_MAX
+
+
+def test_rewriter_service_times_scoring_as_its_own_stage(monkeypatch):
+    service = _load_rewriter_service()
+    html = "<div class=\"resume\"><p>Python payment APIs</p></div>"
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=html))])
+    monkeypatch.setattr(service, "get_client", lambda: object())
+    monkeypatch.setattr(service.llm_router, "complete", lambda client, messages, **kwargs: (completion, "stub"))
+    stages = []
+    stage = service.metrics.stage
+
+    def recording(service_name, name, mode=""):
+        stages.append(name)
+        return stage(service_name, name, mode)
+
+    monkeypatch.setattr(service.metrics, "stage", recording)
+
+    async def scenario():
+        async with asgi_client(service.app) as client:
+            return await client.post("/generate", json={"resume_text": RESUMES[0], "job_description": JOBS[0]})
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert stages[-2:] == ["post_process", "ats_score"]
@@ -0,0 +1,133 @@
+import pytest
+
+from utils import sections, validation
+
+# pdfplumber output: long bullets wrap onto lines without a marker.
+WRAPPED = """Jane Doe
+EXPERIENCE
+Platform Engineer | Acme Corp | Jan 2021 - Present
+• Led migration of 12 services to Kubernetes, cutting deploy time by
+40% across 12 services.
+• Replaced the nightly batch jobs with streaming pipelines that feed the
+fraud models.
+• Modernized the CI pipeline with cached builds and parallel test
+shards, halving build time.
+Data Analyst | Globex | 2018 - 2021
+• Built revenue dashboards for
+Finance and Sales leadership
+SKILLS
+Python, Go, SQL
+"""
+
+
+def _entries(text):
+    return [part.text for part in sections.split_sections(text) if part.kind == "experience"]
+
+
+def test_wrapped_bullets_stay_in_their_role():
+    roles = _entries(WRAPPED)
+    assert len(roles) == 2
+    assert "cutting deploy time by 40% across 12 services." in roles[0]
+    assert "feed the fraud models." in roles[0]
+    assert "test shards, halving build time." in roles[0]
+    assert roles[1].startswith("Data Analyst | Globex")
+    assert "for Finance and Sales leadership" in roles[1]
+
+
+def test_unpunctuated_bullets_still_end_a_role():
+    text = "EXPERIENCE\nPlatform Engineer\nAcme\n• Built APIs\n• Ran on-call\nData Analyst\nGlobex\n• Built dashboards\n"
+    roles = _entries(text)
+    assert [validation.identity_lines(part) for part in sections.split_sections(text)] == [
+        ["Platform Engineer", "Acme"],
+        ["Data Analyst", "Globex"],
+    ]
+    assert len(roles) == 2
+
+
+def test_date_line_after_bullets_starts_a_role():
+    text = "EXPERIENCE\nAcme | Engineer\n• Built APIs.\n2018 - 2021 Globex | Analyst\n• Built dashboards.\n"
+    assert len(_entries(text)) == 2
+
+
+def _fragment(part):
+    if part.kind == "header":
+        return '<div class="header"><h1>Jane Doe</h1><p class="title">Engineer</p><p class="contact">jane@example.com</p></div>'
+    if part.kind == "skills":
+        return f'<section class="skills"><h2>TECHNICAL SKILLS</h2><p><strong>Skills:</strong> {part.text}</p></section>'
+    role, company = validation.identity_lines(part)
+    bullets = "".join(f"<li>Rewrote {line[2:]}</li>" for line in part.text.splitlines()[1:])
+    return (
+        f'<div class="job"><div class="job-header"><span class="role">{role}</span><span class="dates">2018 - 2021</span></div>'
+        f'<div class="job-meta"><span class="company">{company}</span><span class="location">Remote</span></div>'
+        f'<ul class="bullets">{bullets}</ul></div>'
+    )
+
+
+def test_unchanged_sections_come_from_the_cache(gateway, monkeypatch):
+    rewritten = []
+
+    def complete(client, batch, job_description):
+        rewritten.extend(part.index for part in batch)
+        return {part.index: _fragment(part) for part in batch}
+
+    monkeypatch.setattr(gateway, "_complete_sections", complete)
+    first = gateway._rewrite_by_section(None, WRAPPED, "Platform engineer: Kubernetes, Go")
+    assert sorted(rewritten) == [0, 1, 2, 3]
+
+    rewritten.clear()
+    assert gateway._rewrite_by_section(None, WRAPPED, "Platform engineer: Kubernetes, Go") == first
+    assert rewritten == []
+
+    changed = WRAPPED.replace("• Built revenue dashboards for", "• Built churn dashboards for")
+    gateway._rewrite_by_section(None, changed, "Platform engineer: Kubernetes, Go")
+    assert rewritten == [2]
+
+
+def test_broken_fragments_are_not_cached(gateway, monkeypatch):
+    rewritten = []
+
+    def complete(client, batch, job_description):
+        rewritten.extend(part.index for part in batch)
+        return {part.index: _fragment(part).replace("Globex", "Company Name") for part in batch}
+
+    monkeypatch.setattr(gateway, "_complete_sections", complete)
+    gateway._rewrite_by_section(None, WRAPPED, "Analyst")
+    rewritten.clear()
+    gateway._rewrite_by_section(None, WRAPPED, "Analyst")
+    assert rewritten == [2]
+
+
+def test_failed_batch_falls_back_to_the_whole_document(gateway, monkeypatch):
+    def complete(client, batch, job_description):
+        if any(part.index == 2 for part in batch):
+            raise TimeoutError("Request timed out")
+        return {part.index: _fragment(part) for part in batch}
+
+    monkeypatch.setattr(gateway, "_complete_sections", complete)
+    monkeypatch.setattr(gateway, "_get_openai_client", lambda: None)
+    monkeypatch.setattr(gateway, "_rewrite_document", lambda client, resume_text, job_description: "<div>document</div>")
+    monkeypatch.setattr(gateway, "REWRITE_STRATEGY", "sections")
+    monkeypatch.setattr(gateway, "REWRITE_REPAIR_ENABLED", False)
+
+    assert gateway._rewrite_resume_integrated(WRAPPED, "Analyst")["html_resume"] == "<div>document</div>"
+    # The other sections are cached now, so only the failing batch runs: nothing to fall back with.
+    with pytest.raises(TimeoutError):
+        gateway._rewrite_by_section(None, WRAPPED, "Analyst")
+
+
+def test_every_batch_failing_raises_instead_of_rewriting_the_document(gateway, monkeypatch):
+    def complete(client, batch, job_description):
+        raise TimeoutError("Request timed out")
+
+    def document(client, resume_text, job_description):
+        raise AssertionError("the whole-document rewrite must not run")
+
+    monkeypatch.setattr(gateway, "_complete_sections", complete)
+    monkeypatch.setattr(gateway, "_get_openai_client", lambda: None)
+    monkeypatch.setattr(gateway, "_rewrite_document", document)
+    monkeypatch.setattr(gateway, "_rewrite_locally", lambda resume_text, job_description: "<div>local</div>")
+    monkeypatch.setattr(gateway, "REWRITE_STRATEGY", "sections")
+
+    with pytest.raises(TimeoutError):
+        gateway._rewrite_by_section(None, WRAPPED, "Analyst")
+    assert gateway._rewrite_resume_integrated(WRAPPED, "Analyst")["html_resume"] == "<div>local</div>"
@@ -0,0 +1,57 @@
+import os
+import time
+
+RESULT = dict(html="<div>done</div>", pdf_b64="", ats_score=70, transformations=[], keywords_matched=[], keywords_missing=[])
+
+
+def test_put_meta_keeps_stored_result(gateway):
+    store = gateway.SessionStore()
+    saved = store.save("s1", **RESULT, status="draft")
+    before = store.fetch_body("s1", "identity")
+
+    store.put_meta("s1", {**saved, "stage": "rewritten"})
+
+    assert store.fetch_meta("s1")["stage"] == "rewritten"
+    assert store.fetch_body("s1", "identity") == before
+    assert store.fetch("s1")["html"] == "<div>done</div>"
+
+
+def test_put_meta_extends_expiry(gateway):
+    store = gateway.SessionStore()
+    store.save("s1", **RESULT)
+    store._in_memory["s1"]["expires_at"] = time.time() + 1
+
+    store.put_meta("s1", {"status": "ready", "stage": "ready", "etag": "x"})
+
+    assert store._in_memory["s1"]["expires_at"] > time.time() + 60
+    assert store.fetch("s1")["html"] == "<div>done</div>"
+
+
+def test_put_meta_without_result(gateway):
+    store = gateway.SessionStore()
+    store.put_meta("s2", {"status": "processing", "stage": "parsed", "etag": "x"})
+
+    assert store.fetch_meta("s2")["stage"] == "parsed"
+    assert store.fetch_body("s2", "identity") is None
+
+
+def _stores(gateway, tmp_path, monkeypatch):
+    yield gateway.SessionStore()
+    monkeypatch.setattr(gateway, "SESSION_DB_PATH", str(tmp_path / "sessions.db"))
+    yield gateway.SessionStore()
+    if os.getenv("TEST_REDIS_URL"):
+        monkeypatch.setenv("REDIS_URL", os.environ["TEST_REDIS_URL"])
+        store = gateway.SessionStore()
+        store._redis.flushdb()
+        yield store
+
+
+def test_size_counts_sessions_only(gateway, tmp_path, monkeypatch):
+    for store in _stores(gateway, tmp_path, monkeypatch):
+        store.save("s1", **RESULT)
+        store.put_meta("s2", {"status": "processing", "stage": "parsed", "etag": "x"})
+        store.put_meta("s1", {"status": "ready", "stage": "ready", "etag": "y"})
+        store.put_record("idempotency:abc", {"status": "done"}, 60)
+        store.put_record("section:abc", {"html": "<div></div>"}, 60)
+
+        assert (store.backend, store.size()) == (store.backend, 2)
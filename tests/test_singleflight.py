@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+from utils import singleflight
+from utils.singleflight import SingleFlight
+
+
+class FakeRedis:
+    """The few synchronous redis-py calls SingleFlight makes, recording the calling threads."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        with self._lock:
+            value, expires = self._data.get(key, (None, 0))
+            return value if expires > time.monotonic() else None
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        self.threads.add(threading.get_ident())
+        ttl = px / 1000 if px else ex or 3600
+        with self._lock:
+            if nx and self._data.get(key, (None, 0))[1] > time.monotonic():
+                return None
+            self._data[key] = (value, time.monotonic() + ttl)
+            return True
+
+    def pexpire(self, key, ms):
+        self.threads.add(threading.get_ident())
+        with self._lock:
+            value, expires = self._data.get(key, (None, 0))
+            if expires <= time.monotonic():
+                return False
+            self._data[key] = (value, time.monotonic() + ms / 1000)
+            return True
+
+    def delete(self, key):
+        self.threads.add(threading.get_ident())
+        with self._lock:
+            self._data.pop(key, None)
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"session_id": "s1"}
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [{"session_id": "s1"}] * 5
+    assert calls == [1]
+
+
+def test_exception_is_shared_and_key_released():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        results = await asyncio.gather(flights.do("key", fail), flights.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        return await flights.do("key", lambda: asyncio.sleep(0, result="retried"))
+
+    assert asyncio.run(scenario()) == "retried"
+
+
+def test_workers_coalesce_through_redis_off_the_event_loop():
+    redis = FakeRedis()
+    leader, follower = SingleFlight(redis), SingleFlight(redis)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return {"session_id": "s1"}
+
+    async def scenario():
+        first = asyncio.ensure_future(leader.do("key", compute))
+        await asyncio.sleep(0.05)
+        second = await follower.do("key", compute)
+        return await first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(scenario())
+    assert first == second == {"session_id": "s1"}
+    assert calls == [1]
+    assert loop_thread not in redis.threads
+
+
+def test_lock_is_kept_while_a_computation_outlasts_its_ttl(monkeypatch):
+    monkeypatch.setattr(singleflight, "SINGLE_FLIGHT_LOCK_TTL_SECONDS", 0.15)
+    monkeypatch.setattr(singleflight, "POLL_SECONDS", 0.02)
+    redis = FakeRedis()
+    leader, follower = SingleFlight(redis), SingleFlight(redis)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.6)
+        return {"session_id": "s1"}
+
+    async def scenario():
+        first = asyncio.ensure_future(leader.do("key", compute))
+        await asyncio.sleep(0.05)
+        second = await follower.do("key", compute)
+        return await first, second
+
+    assert asyncio.run(scenario()) == ({"session_id": "s1"}, {"session_id": "s1"})
+    assert calls == [1]
+
+
+def test_finished_result_is_not_served_to_later_requests():
+    redis = FakeRedis()
+    first, later = SingleFlight(redis), SingleFlight(redis)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"run": len(calls)}
+
+    async def scenario():
+        return await first.do("key", compute), await later.do("key", compute)
+
+    assert asyncio.run(scenario()) == ({"run": 1}, {"run": 2})
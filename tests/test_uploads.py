@@ -0,0 +1,62 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from conftest import asgi_client
+from utils import uploads
+
+ORIGIN = {"Origin": "https://app.example.com"}
+
+
+def test_open_upload_rewinds_the_spooled_file():
+    upload = UploadFile(io.BytesIO(b"resume text"), filename="resume.txt")
+    upload.file.seek(5)
+
+    fileobj = uploads.open_upload(upload, limit=100, field="original_resume")
+
+    assert fileobj.read() == b"resume text"
+
+
+def test_open_upload_rejects_a_file_over_its_limit():
+    upload = UploadFile(io.BytesIO(b"x" * 101), filename="resume.txt")
+
+    with pytest.raises(HTTPException) as raised:
+        uploads.open_upload(upload, limit=100, field="original_resume")
+    assert raised.value.status_code == 413
+    assert "original_resume" in raised.value.detail
+
+
+def _oversized():
+    return b"x" * (uploads.MAX_REQUEST_BYTES + 1)
+
+
+def test_declared_length_over_the_limit_is_refused_with_cors_headers(gateway):
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.post("/upload", content=_oversized(), headers=ORIGIN)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert "maximum upload size" in response.json()["detail"]
+
+
+def test_chunked_body_over_the_limit_is_cut_off_with_cors_headers(gateway):
+    boundary = b"limit-test"
+    body = b"--%s\r\nContent-Disposition: form-data; name=\"original_resume\"; filename=\"r.txt\"\r\n\r\n" % boundary
+    body += _oversized()
+    headers = {**ORIGIN, "Content-Type": "multipart/form-data; boundary=limit-test"}
+
+    async def chunks():
+        for start in range(0, len(body), 1 << 20):
+            yield body[start:start + (1 << 20)]
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            return await client.post("/upload", content=chunks(), headers=headers)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "*"
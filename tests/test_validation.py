@@ -0,0 +1,113 @@
+from utils import sections, validation
+from utils.sections import Section
+
+RESUME = """Jane Doe
+jane@example.com
+EXPERIENCE
+Backend Engineer | Acme Corp | Jan 2020 - Present
+• Led the migration to Kubernetes
+Data Analyst | Globex Inc | 2017 - 2019
+• Built revenue dashboards
+SKILLS
+Python, SQL
+"""
+CSS = "<style>.resume {}</style>"
+
+
+def _job(role: str, company: str, dates: str = "Jan 2020 - Present", bullet: str = "Solved deploy delays by moving to Kubernetes") -> str:
+    return (
+        f'<div class="job"><div class="job-header"><span class="role">{role}</span><span class="dates">{dates}</span></div>'
+        f'<div class="job-meta"><span class="company">{company}</span><span class="location">Remote</span></div>'
+        f'<ul class="bullets"><li>{bullet}</li></ul></div>'
+    )
+
+
+FRAGMENTS = {
+    0: '<div class="header"><h1>Jane Doe</h1><p class="title">Backend Engineer</p><p class="contact">jane@example.com</p></div>',
+    1: _job("Backend Engineer", "Acme Corp"),
+    2: _job("Data Analyst", "Globex", "2017 - 2019", "Solved slow reporting by building dashboards"),
+    3: '<section class="skills"><h2>TECHNICAL SKILLS</h2><p><strong>Languages:</strong> Python, SQL</p></section>',
+}
+CLASSES = frozenset(
+    "resume header title contact experience job job-header role dates job-meta company location bullets skills".split()
+)
+
+
+def _problems(fragments):
+    parts = sections.split_sections(RESUME)
+    return validation.validate(parts, sections.assemble(CSS, parts, fragments), CLASSES)[1]
+
+
+def test_valid_rewrite_has_no_problems():
+    assert _problems(FRAGMENTS) == []
+
+
+def test_real_content_is_not_a_placeholder():
+    part = Section("experience", "Backend Engineer | Acme Corp | Jan 2020 - Present", 1)
+    tech_stack = _job("Backend Engineer", "Acme Corp", bullet="Modernized the tech stack by moving services to Go")
+    end_of = _job("Backend Engineer", "Acme Corp", dates="Jan 2020 - End of 2021")
+    assert validation.check(part, tech_stack, CLASSES) == []
+    assert validation.check(part, end_of, CLASSES) == []
+
+
+def test_template_slots_left_in_are_placeholders():
+    part = Section("experience", "Backend Engineer | Acme Corp | Jan 2020 - Present", 1)
+    for fragment in (
+        _job("Backend Engineer", "Company Name"),
+        _job("Backend Engineer", "Acme Corp", dates="Start Date - End Date"),
+        _job("Backend Engineer", "Acme Corp", dates=" "),
+        _job("Backend Engineer", "Acme Corp", bullet="Solved [problem] by [action + tools]"),
+    ):
+        assert [problem.kind for problem in validation.check(part, fragment, CLASSES)] == ["placeholder"]
+
+
+def test_one_line_role_header_keeps_its_identity():
+    part = Section("experience", "Backend Engineer | Acme Corp | 2020 – Present\n• Led the migration", 1)
+    assert validation.identity_lines(part) == ["Backend Engineer", "Acme Corp"]
+    renamed = _job("Platform Lead", "Initech")
+    assert [problem.kind for problem in validation.check(part, renamed, CLASSES)] == ["identity"]
+
+
+def test_dropped_role_is_missing_and_others_stay_aligned():
+    fragments = dict(FRAGMENTS)
+    fragments.pop(1)
+    parts = sections.split_sections(RESUME)
+    html = sections.assemble(CSS, [part for part in parts if part.index != 1], fragments)
+    aligned, problems = validation.validate(parts, html, CLASSES)
+    assert [(problem.index, problem.kind) for problem in problems] == [(1, "missing")]
+    assert "Data Analyst" in aligned[2]
+
+
+def test_renamed_class_is_reported():
+    fragments = dict(FRAGMENTS)
+    fragments[1] = FRAGMENTS[1].replace('class="company"', 'class="employer"')
+    assert [(problem.index, problem.kind) for problem in _problems(fragments)] == [(1, "class")]
+
+
+def test_repair_regenerates_only_broken_sections(gateway, monkeypatch):
+    parts = sections.split_sections(RESUME)
+    broken = dict(FRAGMENTS)
+    broken[1] = _job("Backend Engineer", "Company Name")
+    batches = []
+
+    def complete(client, batch, job_description):
+        batches.append([part.index for part in batch])
+        return {1: FRAGMENTS[1]}
+
+    monkeypatch.setattr(gateway, "_complete_sections", complete)
+    html = gateway._validate_and_repair(None, RESUME, "Backend engineer", sections.assemble(CSS, parts, broken))
+
+    assert batches == [[1]]
+    assert "Company Name" not in html
+    assert validation.validate(parts, html, gateway.TEMPLATE_CLASSES)[1] == []
+
+
+def test_failed_repair_keeps_the_rewrite(gateway, monkeypatch):
+    parts = sections.split_sections(RESUME)
+    broken = sections.assemble(CSS, parts, {**FRAGMENTS, 1: _job("Backend Engineer", "Company Name")})
+
+    def complete(client, batch, job_description):
+        raise TimeoutError("model timed out")
+
+    monkeypatch.setattr(gateway, "_complete_sections", complete)
+    assert gateway._validate_and_repair(None, RESUME, "Backend engineer", broken) == broken
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from conftest import asgi_client
+from utils import warmup as warmup_module
+from utils.warmup import Warmup
+
+
+@pytest.fixture
+def steps(gateway, monkeypatch):
+    """A fresh Warmup behind the gateway's /readyz."""
+    monkeypatch.setattr(warmup_module, "WARMUP_ENABLED", True)
+    fresh = Warmup("test")
+    monkeypatch.setattr(gateway, "warmup", fresh)
+    return fresh
+
+
+async def _readyz(client):
+    response = await client.get("/readyz")
+    return response.status_code, response.json()
+
+
+def test_readyz_is_503_until_required_steps_finish(gateway, steps):
+    release = asyncio.Event()
+
+    @steps.step("scorer", required=True)
+    async def scorer():
+        await release.wait()
+
+    @steps.step("pdf_render")
+    def pdf_render():
+        raise OSError("cannot load library 'pango-1.0-0'")
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            assert (await _readyz(client))[0] == 503
+            steps.start()
+            await asyncio.sleep(0.05)
+            status, body = await _readyz(client)
+            assert status == 503
+            assert (body["status"], body["steps"]["scorer"]["status"]) == ("running", "running")
+
+            release.set()
+            await steps._task
+            status, body = await _readyz(client)
+            assert status == 200
+            assert body["status"] == "ready"
+            # An optional step may fail without holding back readiness.
+            assert body["steps"]["pdf_render"]["status"] == "failed"
+            assert "pango" in body["steps"]["pdf_render"]["error"]
+
+    asyncio.run(scenario())
+
+
+def test_failed_required_step_keeps_the_service_unready(gateway, steps):
+    @steps.step("scorer", required=True)
+    def scorer():
+        raise RuntimeError("scorer unavailable")
+
+    @steps.step("connections")
+    async def connections():
+        return "ok"
+
+    async def scenario():
+        async with asgi_client(gateway.app) as client:
+            steps.start()
+            await steps._task
+            return await _readyz(client)
+
+    status, body = asyncio.run(scenario())
+    assert status == 503
+    assert body["status"] == "failed"
+    assert body["steps"]["connections"]["status"] == "ok"
+    assert warmup_module.READY.value(service="test") == 0
+
+
+def test_step_over_its_timeout_fails(gateway, steps, monkeypatch):
+    monkeypatch.setattr(warmup_module, "WARMUP_STEP_TIMEOUT_SECONDS", 0.05)
+
+    @steps.step("connections", required=True)
+    async def connections():
+        await asyncio.sleep(5)
+
+    asyncio.run(steps.run())
+    assert steps.state == "failed"
+    assert steps.report()["steps"]["connections"]["error"] == "TimeoutError"
@@ -0,0 +1,152 @@
+"""Per-stage admission control for the gateway.
+
+Each expensive stage of an upload (parse, rewrite, pdf) gets a limiter: at
+most ``max_in_flight`` requests run the stage at once, up to ``max_queue``
+more wait in FIFO order for at most ``queue_timeout`` seconds, and anything
+beyond that is refused immediately with ``Overloaded``. The gateway turns it
+into ``503`` with a ``Retry-After`` estimated from the queue length and the
+stage's recent hold time.
+
+Limits come from the environment, per stage (0 disables a limit):
+
+    ADMISSION_<STAGE>_MAX_IN_FLIGHT
+    ADMISSION_<STAGE>_MAX_QUEUE
+    ADMISSION_<STAGE>_QUEUE_TIMEOUT_SECONDS
+
+Metrics: resumate_admission_in_flight, resumate_admission_queue_depth,
+resumate_admission_wait_seconds and resumate_admission_rejected_total.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+from utils import metrics
+
+IN_FLIGHT = metrics.gauge(
+    "resumate_admission_in_flight",
+    "Requests currently holding a slot in each admission-controlled stage.",
+    ("stage",),
+)
+QUEUE_DEPTH = metrics.gauge(
+    "resumate_admission_queue_depth",
+    "Requests waiting for a slot in each stage.",
+    ("stage",),
+)
+WAIT_SECONDS = metrics.histogram(
+    "resumate_admission_wait_seconds",
+    "Time spent queued before a stage slot was granted.",
+    ("stage",),
+)
+REJECTED = metrics.counter(
+    "resumate_admission_rejected_total",
+    "Requests refused by admission control, by stage and reason (queue_full or timeout).",
+    ("stage", "reason"),
+)
+
+
+class Overloaded(Exception):
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f"{stage} is at capacity ({reason})")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """Bounded concurrency plus a bounded, deadline-limited FIFO wait queue."""
+
+    def __init__(self, stage: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.stage = stage
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a slot is held, for Retry-After.
+        self._hold_seconds = 1.0
+        IN_FLIGHT.set_function(lambda: self.in_flight, stage=stage)
+        QUEUE_DEPTH.set_function(lambda: self.waiting, stage=stage)
+
+    @classmethod
+    def from_env(cls, stage: str, max_in_flight: int, max_queue: int, queue_timeout: float) -> "StageLimiter":
+        prefix = f"ADMISSION_{stage.upper()}_"
+        return cls(
+            stage,
+            int(os.getenv(prefix + "MAX_IN_FLIGHT", str(max_in_flight))),
+            int(os.getenv(prefix + "MAX_QUEUE", str(max_queue))),
+            float(os.getenv(prefix + "QUEUE_TIMEOUT_SECONDS", str(queue_timeout))),
+        )
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_in_flight <= 0
+
+    def saturated(self) -> bool:
+        """True when a new request would be refused without waiting."""
+        return not self.unlimited and self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        if self.unlimited:
+            return 1
+        backlog = (self.waiting + 1) / self.max_in_flight
+        return max(1, math.ceil(backlog * self._hold_seconds))
+
+    def reject(self, reason: str) -> Overloaded:
+        REJECTED.inc(stage=self.stage, reason=reason)
+        return Overloaded(self.stage, reason, self.retry_after())
+
+    async def _acquire(self, timeout: float) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        if self.waiting >= self.max_queue:
+            raise self.reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            # If the slot is granted just as the deadline passes, wait_for returns
+            # normally and the slot (already counted in in_flight) is ours.
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            raise self.reject("timeout")
+        except asyncio.CancelledError:
+            # Cancelled (client went away) after being handed a slot: pass it on.
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            self.waiting -= 1
+            WAIT_SECONDS.observe(time.perf_counter() - started, stage=self.stage)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; in_flight is unchanged.
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one stage slot for the block, waiting up to ``timeout`` seconds for it."""
+        if self.unlimited:
+            yield
+            return
+        await self._acquire(self.queue_timeout if timeout is None else timeout)
+        held = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.perf_counter() - held)
+            self._release()
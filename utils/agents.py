@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 import json
 import os
-from typing import Tuple
+from typing import Optional, Tuple
 
 from openai import OpenAI
 from spacy.language import Language
@@ -11,6 +11,7 @@ from spacy.language import Language
 from models import ResumePayload
 from utils.latex_generator import generate_resume_files
 from utils.rewriter import ResumeRewriter, METRIC_REGEX
+from utils.routing import ModelRouter
 from utils.scorer import score_ats
 
 
@@ -40,12 +41,13 @@ class OpenAIResumeRewritingAgent:
     - Metrics present in 50–65% of bullets, never fabricated numbers
     """
 
-    def __init__(self, model: str = "gpt-4o-mini"):
+    def __init__(self, model: Optional[str] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is required for OpenAIResumeRewritingAgent")
         self._client = OpenAI(api_key=api_key)
-        self._model = model
+        # A pinned model, or routing across LLM_MODELS.
+        self._router = ModelRouter("agents", [model] if model else ())
 
     def rewrite(self, resume_text: str, job_text: str) -> RewriteResult:
         system_prompt = (
@@ -113,10 +115,9 @@ class OpenAIResumeRewritingAgent:
             "job_description": job_text,
         }
 
-        completion = self._client.chat.completions.create(
-            model=self._model,
-            response_format={"type": "json_object"},
-            messages=[
+        completion, _ = self._router.complete(
+            self._client,
+            [
                 {"role": "system", "content": system_prompt},
                 {
                     "role": "user",
@@ -127,6 +128,8 @@ class OpenAIResumeRewritingAgent:
                     ),
                 },
             ],
+            work_text=resume_text,
+            response_format={"type": "json_object"},
         )
 
         content = completion.choices[0].message.content or "{}"
@@ -143,12 +146,12 @@ class OpenAIEnhancedRewritingAgent:
     - Uses OpenAI only to rewrite bullet TEXT, keeping structure, roles, companies, and dates fixed.
     """
 
-    def __init__(self, nlp: Language, model: str = "gpt-4o-mini"):
+    def __init__(self, nlp: Language, model: Optional[str] = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is required for OpenAIEnhancedRewritingAgent")
         self._client = OpenAI(api_key=api_key)
-        self._model = model
+        self._router = ModelRouter("agents", [model] if model else ())
         self._rewriter = ResumeRewriter(nlp)
 
     def rewrite(self, resume_text: str, job_text: str) -> RewriteResult:
@@ -207,10 +210,9 @@ class OpenAIEnhancedRewritingAgent:
             "bullets": bullets,
         }
 
-        completion = self._client.chat.completions.create(
-            model=self._model,
-            response_format={"type": "json_object"},
-            messages=[
+        completion, _ = self._router.complete(
+            self._client,
+            [
                 {"role": "system", "content": system_prompt},
                 {
                     "role": "user",
@@ -220,6 +222,8 @@ class OpenAIEnhancedRewritingAgent:
                     ),
                 },
             ],
+            work_text="\n".join(bullets),
+            response_format={"type": "json_object"},
         )
 
         content = completion.choices[0].message.content or "{}"
@@ -0,0 +1,165 @@
+"""Lazily imported optional and heavy dependencies.
+
+Importing openai, weasyprint (cairo/pango/fontconfig), httpx, redis,
+pdfplumber and python-docx up front made up most of the gateway's cold start,
+even for requests that need none of them. Each one is registered here with a
+loader and imported the first time it is asked for:
+
+    HTML = capabilities.load("weasyprint")      # None if it cannot be imported
+    if capabilities.available("openai"): ...
+    pdfplumber = capabilities.require("pdfplumber")  # RuntimeError if missing
+
+``status()`` reports what has been loaded and how long each import took
+without triggering any imports, so health checks stay instant.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Capability:
+    name: str
+    loader: Callable[[], Any]
+    hint: str = ""
+    loaded: bool = False
+    value: Any = None
+    error: str = ""
+    load_ms: float = 0.0
+    # Per capability, so a slow import (spaCy's pipeline) does not hold up the others.
+    lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+
+_registry: Dict[str, Capability] = {}
+
+
+def register(name: str, loader: Callable[[], Any], hint: str = "") -> None:
+    _registry[name] = Capability(name=name, loader=loader, hint=hint)
+
+
+def _load(name: str) -> Capability:
+    capability = _registry[name]
+    if capability.loaded:
+        return capability
+    with capability.lock:
+        if capability.loaded:
+            return capability
+        started = time.perf_counter()
+        try:
+            capability.value = capability.loader()
+        except Exception as e:
+            capability.error = str(e)
+            logger.warning(f"{name} not available: {e}. {capability.hint}".strip())
+        capability.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        capability.loaded = True
+        if not capability.error:
+            logger.info(f"Loaded {name} in {capability.load_ms} ms")
+    return capability
+
+
+def load(name: str) -> Any:
+    """Import ``name`` on first use; returns None when it is unavailable."""
+    return _load(name).value
+
+
+def available(name: str) -> bool:
+    return not _load(name).error
+
+
+def require(name: str) -> Any:
+    capability = _load(name)
+    if capability.error:
+        raise RuntimeError(f"{name} is not available: {capability.error}")
+    return capability.value
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every capability; never imports anything."""
+    return {
+        name: {
+            "loaded": capability.loaded,
+            "available": capability.loaded and not capability.error,
+            "load_ms": capability.load_ms,
+            "error": capability.error,
+        }
+        for name, capability in _registry.items()
+    }
+
+
+# ------------------ loaders ------------------ #
+def _openai():
+    from openai import OpenAI
+
+    return OpenAI
+
+
+def _weasyprint():
+    from weasyprint import HTML
+
+    return HTML
+
+
+def _httpx():
+    import httpx
+
+    return httpx
+
+
+def _redis():
+    import redis
+
+    return redis
+
+
+def _pdfplumber():
+    import pdfplumber
+
+    return pdfplumber
+
+
+def _orjson():
+    import orjson
+
+    return orjson
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli
+
+    return brotli
+
+
+def _resume_rewriter():
+    # The local last tier of the LLM cascade; loads a spaCy pipeline (SPACY_MODEL).
+    import spacy
+
+    from utils.rewriter import ResumeRewriter
+
+    return ResumeRewriter(spacy.load(os.getenv("SPACY_MODEL", "en_core_web_sm")))
+
+
+def _docx():
+    from docx import Document
+
+    return Document
+
+
+register("openai", _openai, "Install with: pip install openai")
+register("weasyprint", _weasyprint, "PDF generation will be disabled.")
+register("httpx", _httpx)
+register("redis", _redis, "Sessions will be kept in memory.")
+register("pdfplumber", _pdfplumber, "PDF resumes cannot be parsed.")
+register("docx", _docx, "DOCX_EXTRACTOR=python-docx will not work.")
+register("orjson", _orjson, "Falling back to the standard json encoder.")
+register("brotli", _brotli, "Responses will not be brotli-compressed.")
+register("resume_rewriter", _resume_rewriter, "Uploads will fail instead of falling back to the spaCy rewriter when every LLM model fails.")
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import re
+import zipfile
+from typing import BinaryIO, Iterator, List
+from xml.etree.ElementTree import iterparse
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+_P = W_NS + "p"
+_T = W_NS + "t"
+_TAB = W_NS + "tab"
+_BR = W_NS + "br"
+_CR = W_NS + "cr"
+_TR = W_NS + "tr"
+_TC = W_NS + "tc"
+
+_HEADER_RE = re.compile(r"^word/header\d*\.xml$")
+_FOOTER_RE = re.compile(r"^word/footer\d*\.xml$")
+
+# Decompressed XML read per file. A few-KB upload can inflate to gigabytes (zip bomb);
+# a long resume is well under 1 MB of WordprocessingML.
+MAX_DOCX_XML_BYTES = int(os.getenv("MAX_DOCX_XML_BYTES", str(20 * 1024 * 1024)))
+
+
+class DocxTooLarge(ValueError):
+    """The parts to be read decompress to more than MAX_DOCX_XML_BYTES."""
+
+
+def _part_lines(stream) -> Iterator[str]:
+    """Yield paragraph and table-row text from one WordprocessingML part in document order.
+
+    Text boxes nest a <w:p> inside a run of another <w:p>, so paragraphs are a stack;
+    the inner one is emitted first. <mc:Fallback> repeats text-box content for old
+    readers and is skipped. Each table row becomes one line with cells joined by " | ".
+    """
+    paragraphs: List[List[str]] = []
+    rows: List[List[str]] = []
+    cells: List[List[str]] = []
+    fallback_depth = 0
+
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == MC_FALLBACK:
+                fallback_depth += 1
+            elif fallback_depth:
+                continue
+            elif tag == _P:
+                paragraphs.append([])
+            elif tag == _TR:
+                rows.append([])
+            elif tag == _TC:
+                cells.append([])
+            continue
+
+        if tag == MC_FALLBACK:
+            fallback_depth -= 1
+            elem.clear()
+            continue
+        if fallback_depth:
+            continue
+
+        if tag == _T:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == _TAB:
+            if paragraphs:
+                paragraphs[-1].append("\t")
+        elif tag in (_BR, _CR):
+            if paragraphs:
+                paragraphs[-1].append("\n")
+        elif tag == _P:
+            text = "".join(paragraphs.pop()).strip()
+            if text:
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield text
+            elem.clear()
+        elif tag == _TC:
+            text = " ".join(cells.pop()).strip()
+            if rows and text:
+                rows[-1].append(text)
+            elem.clear()
+        elif tag == _TR:
+            row = rows.pop()
+            line = " | ".join(row)
+            if line:
+                if cells:
+                    # Nested table: fold the row into the enclosing cell.
+                    cells[-1].append(line)
+                else:
+                    yield line
+            elem.clear()
+
+
+def _margin_lines(archive: zipfile.ZipFile, names: List[str]) -> List[str]:
+    # First-page, even and default headers usually repeat the same contact line.
+    lines: List[str] = []
+    for name in names:
+        with archive.open(name) as stream:
+            for line in _part_lines(stream):
+                if line not in lines:
+                    lines.append(line)
+    return lines
+
+
+def extract_docx_text(fileobj: BinaryIO) -> str:
+    """Return the text of a .docx file without building a python-docx object model.
+
+    Streams headers, the body and footers straight out of the zip with incremental
+    XML parsing, so tables and text boxes come through in document order.
+    Raises DocxTooLarge before reading anything if those parts decompress to
+    more than MAX_DOCX_XML_BYTES.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        names = archive.namelist()
+        # ZipExtFile stops at the size recorded in the archive, so checking it up front is enough.
+        size = sum(
+            info.file_size
+            for info in archive.infolist()
+            if info.filename == "word/document.xml" or _HEADER_RE.match(info.filename) or _FOOTER_RE.match(info.filename)
+        )
+        if size > MAX_DOCX_XML_BYTES:
+            raise DocxTooLarge(f"document XML is {size} bytes uncompressed, over the {MAX_DOCX_XML_BYTES}-byte limit")
+        lines = _margin_lines(archive, sorted(n for n in names if _HEADER_RE.match(n)))
+        if "word/document.xml" in names:
+            with archive.open("word/document.xml") as stream:
+                lines.extend(_part_lines(stream))
+        lines.extend(_margin_lines(archive, sorted(n for n in names if _FOOTER_RE.match(n))))
+    return "\n".join(lines)
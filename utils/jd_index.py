@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import os
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.scorer import tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is shared between threads, not processes.
+    fcntl = None
+
+# Changes logged since the last snapshot before the log is compacted into a new
+# one (at least as many as there are postings, so compaction stays amortised O(1)).
+JD_INDEX_COMPACT_OPS = int(os.getenv("JD_INDEX_COMPACT_OPS", "1000"))
+
+
+class JobIndex:
+    """Incremental BM25 inverted index over job descriptions.
+
+    Each posting keeps its own term counts so it can be removed without a rebuild;
+    document frequencies and the total length are maintained on every add/remove.
+
+    With a `path`, every change is appended to `<path>.log` as one JSON line, so
+    a write costs one posting rather than the whole index. The log is compacted
+    into the JSON snapshot at `path` once it outgrows the index, and replayed
+    on top of the snapshot on load.
+
+    Several worker processes may share one `path`. Writes, compaction and the
+    catch-up before each query hold an flock on `<path>.lock`, and every worker
+    replays the changes other workers appended since it last looked. The log's
+    first line names the snapshot generation it applies to; a worker that sees
+    a new generation reloads the snapshot, so compaction by one worker never
+    drops changes logged by another. File I/O never happens under the lock that
+    `top_k` takes.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self._lock = Lock()
+        # Serialises file access between this process's threads; the flock does so between processes.
+        self._write_lock = Lock()
+        self._path = Path(path) if path else None
+        self._log_path = Path(f"{path}.log") if path else None
+        self._lock_path = Path(f"{path}.lock") if path else None
+        # Snapshot generation and log byte offset this process has applied up to.
+        self._generation: Optional[int] = None
+        self._offset = 0
+        self._logged = 0
+        self.k1 = k1
+        self.b = b
+        # term -> {job_id: term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # job_id -> {"title": str, "length": int, "terms": {term: tf}}
+        self._docs: Dict[str, Dict] = {}
+        self._total_length = 0
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._docs
+
+    def add(self, job_id: str, text: str, title: str = "") -> None:
+        """Index (or re-index) one posting."""
+        terms = Counter(tokenize(text))
+        doc = {"title": title, "length": sum(terms.values()), "terms": dict(terms)}
+        self._change({"op": "add", "job_id": job_id, "doc": doc})
+
+    def remove(self, job_id: str) -> bool:
+        return self._change({"op": "remove", "job_id": job_id})
+
+    def save(self) -> None:
+        """Write a full snapshot and empty the log."""
+        if not self._path:
+            return
+        with self._write_lock, self._file_lock():
+            self._sync()
+            self._compact()
+
+    def refresh(self) -> None:
+        """Apply the changes other processes have made since the last call."""
+        if not self._path:
+            return
+        with self._write_lock, self._file_lock():
+            self._sync()
+
+    def top_k(self, query_text: str, k: int = 10) -> List[Tuple[str, str, float]]:
+        """Return up to k (job_id, title, score) tuples, best BM25 match first."""
+        query = set(tokenize(query_text))
+        self.refresh()
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs or not query:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in query:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for job_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._docs[job_id]["length"] / avg_length)
+                    scores[job_id] = scores.get(job_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], item[0]))
+            return [(job_id, self._docs[job_id]["title"], round(score, 4)) for job_id, score in best]
+
+    def _add_locked(self, job_id: str, doc: Dict[str, Any]) -> None:
+        self._remove_locked(job_id)
+        for term, tf in doc["terms"].items():
+            self._postings.setdefault(term, {})[job_id] = tf
+        self._docs[job_id] = doc
+        self._total_length += doc["length"]
+
+    def _remove_locked(self, job_id: str) -> bool:
+        doc = self._docs.pop(job_id, None)
+        if doc is None:
+            return False
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(job_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= doc["length"]
+        return True
+
+    def _apply(self, entry: Dict[str, Any]) -> bool:
+        if entry["op"] == "add":
+            self._add_locked(entry["job_id"], entry["doc"])
+            return True
+        return self._remove_locked(entry["job_id"])
+
+    def _change(self, entry: Dict[str, Any]) -> bool:
+        if not self._path:
+            with self._lock:
+                return self._apply(entry)
+        with self._write_lock, self._file_lock():
+            # Catch up first, so the entry lands after every change it may override.
+            self._sync()
+            with self._lock:
+                changed = self._apply(entry)
+            if changed:
+                self._append(entry)
+            return changed
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_log(self, offset: int) -> Tuple[Optional[int], List[Dict[str, Any]], int]:
+        """(generation, entries from ``offset`` on, offset after the last whole entry)."""
+        if not self._log_path.exists():
+            return None, [], 0
+        entries: List[Dict[str, Any]] = []
+        with open(self._log_path, "rb") as handle:
+            first = handle.readline()
+            try:
+                header = json.loads(first)
+            except ValueError:
+                return None, [], 0
+            if "generation" in header:
+                generation, start = header["generation"], len(first)
+            else:
+                # A log written before generations were recorded.
+                generation, start = 0, 0
+            end = max(offset, start)
+            handle.seek(end)
+            for line in handle:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A write cut short by a crash; nothing after it was acknowledged.
+                    break
+                if not line.endswith(b"\n"):
+                    entries.pop()
+                    break
+                end += len(line)
+        return generation, entries, end
+
+    def _sync(self) -> None:
+        """Bring this process up to date with the files; caller holds both file locks."""
+        generation, entries, end = self._read_log(self._offset)
+        if generation is None or generation != self._generation:
+            self._reload()
+            return
+        with self._lock:
+            for entry in entries:
+                self._apply(entry)
+        self._logged += len(entries)
+        self._offset = end
+        self._drop_torn_tail()
+
+    def _reload(self) -> None:
+        generation, docs = 0, {}
+        if self._path.exists():
+            with open(self._path, encoding="utf-8") as handle:
+                data = json.load(handle)
+            generation, docs = data.get("generation", 0), data.get("docs", {})
+        log_generation, entries, end = self._read_log(0)
+        if log_generation != generation:
+            # No log yet, or one from before the snapshot was written: the snapshot has it all.
+            self._start_log(generation)
+            entries, end = [], self._offset
+        with self._lock:
+            self._postings, self._docs, self._total_length = {}, {}, 0
+            for job_id, doc in docs.items():
+                self._add_locked(job_id, doc)
+            for entry in entries:
+                self._apply(entry)
+        self._generation = generation
+        self._logged = len(entries)
+        self._offset = end
+        self._drop_torn_tail()
+
+    def _drop_torn_tail(self) -> None:
+        # Writers hold the flock, so a partial line seen under it is from one that crashed.
+        if self._log_path.exists() and self._log_path.stat().st_size > self._offset:
+            os.truncate(self._log_path, self._offset)
+
+    def _start_log(self, generation: int) -> None:
+        header = (json.dumps({"generation": generation}) + "\n").encode("utf-8")
+        self._log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._log_path, "wb") as handle:
+            handle.write(header)
+        self._offset = len(header)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """Append one change to the log; caller holds both file locks and has synced."""
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with open(self._log_path, "ab") as handle:
+            handle.write(line)
+        self._offset += len(line)
+        self._logged += 1
+        if self._logged > max(JD_INDEX_COMPACT_OPS, len(self._docs)):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Snapshot the index under a new generation and restart the log; caller holds both file locks."""
+        # Docs are replaced, never mutated, so a shallow copy is a consistent snapshot.
+        with self._lock:
+            docs = dict(self._docs)
+        generation = (self._generation or 0) + 1
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so a crash never leaves a truncated index behind.
+        fd, tmp = tempfile.mkstemp(prefix=".jd_index_", dir=str(self._path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"version": 1, "generation": generation, "docs": docs}, handle)
+        os.replace(tmp, self._path)
+        # A crash before the log restarts leaves an older generation's log, which load ignores.
+        self._start_log(generation)
+        self._generation = generation
+        self._logged = 0
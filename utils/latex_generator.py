@@ -1,18 +1,48 @@
 from __future__ import annotations
 
 import base64
+import hashlib
+import logging
 import os
+import shutil
+import signal
 import subprocess
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - non-POSIX
+    resource = None
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 from models import ResumePayload
+from utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
 
 TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
 
+LATEX_MAX_WORKERS = int(os.getenv("LATEX_MAX_WORKERS", "2"))
+LATEX_TIMEOUT_SECONDS = float(os.getenv("LATEX_TIMEOUT_SECONDS", "30"))
+# Per-user cache rather than a shared /tmp path, where another local user could plant a .fmt.
+LATEX_FORMAT_DIR = Path(
+    os.getenv("LATEX_FORMAT_DIR")
+    or Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "resumate" / "tex_formats"
+)
+LATEX_PRECOMPILE_PREAMBLE = os.getenv("LATEX_PRECOMPILE_PREAMBLE", "true").lower() == "true"
+# Scratch dirs for .aux/.log/.pdf; tmpfs when available so compiles never touch disk.
+LATEX_SCRATCH_DIR = os.getenv("LATEX_SCRATCH_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+LATEX_MAX_CPU_SECONDS = int(os.getenv("LATEX_MAX_CPU_SECONDS", "60"))
+LATEX_MAX_MEMORY_MB = int(os.getenv("LATEX_MAX_MEMORY_MB", "1024"))
+
+BEGIN_DOCUMENT = "\\begin{document}"
+
 
 env = Environment(
     loader=FileSystemLoader(str(TEMPLATE_DIR)),
@@ -21,32 +51,197 @@ env = Environment(
     lstrip_blocks=True,
 )
 
+# At most LATEX_MAX_WORKERS compiles run at once, whichever thread asks for them.
+_executor = ThreadPoolExecutor(max_workers=LATEX_MAX_WORKERS, thread_name_prefix="pdflatex")
+# Resource limits are set by prlimit(1) in the command (preexec_fn is unsafe in
+# threaded programs), or on the child after it starts when prlimit is missing.
+_PRLIMIT = shutil.which("prlimit")
+_format_lock = Lock()
+# Preamble hash -> format name, or None once building that format has failed.
+_formats: Dict[str, Optional[str]] = {}
+
 
 def render_resume(payload: ResumePayload) -> str:
     template = env.get_template("resume.tex")
     return template.render(data=payload.model_dump())
 
 
-def build_pdf(tex_source: str) -> Tuple[str, str]:
-    tmp_dir = Path(tempfile.mkdtemp(prefix="resume_tex_"))
-    tex_path = tmp_dir / "final_resume.tex"
-    tex_path.write_text(tex_source, encoding="utf-8")
+def _sandbox_env(scratch: Path, fmt: Optional[str] = None) -> Dict[str, str]:
+    """Minimal environment for pdflatex: no shell escape, reads and writes kept to cwd."""
+    env = {
+        "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+        "HOME": str(scratch),
+        "openout_any": "p",
+        "openin_any": "p",
+        "shell_escape": "f",
+    }
+    if fmt:
+        # Trailing separator keeps kpathsea's default format search path.
+        env["TEXFORMATS"] = f"{LATEX_FORMAT_DIR}{os.pathsep}"
+    return env
+
+
+def _limited(command: List[str]) -> List[str]:
+    """``command`` run under the CPU and address-space limits."""
+    if not _PRLIMIT:
+        return command
+    memory = LATEX_MAX_MEMORY_MB * 1024 * 1024
+    return [_PRLIMIT, f"--cpu={LATEX_MAX_CPU_SECONDS}", f"--as={memory}", "--", *command]
 
+
+def _limit_child(pid: int) -> None:
+    """Apply the limits to a started child when prlimit(1) is not installed (Linux only)."""
+    if _PRLIMIT or resource is None or not hasattr(resource, "prlimit"):
+        return
+    memory = LATEX_MAX_MEMORY_MB * 1024 * 1024
+    try:
+        resource.prlimit(pid, resource.RLIMIT_CPU, (LATEX_MAX_CPU_SECONDS, LATEX_MAX_CPU_SECONDS))
+        resource.prlimit(pid, resource.RLIMIT_AS, (memory, memory))
+    except (ProcessLookupError, PermissionError):  # pragma: no cover - already exited
+        pass
+
+
+def _pdflatex_command(tex_path: Path, fmt: Optional[str] = None) -> List[str]:
+    # Runs with cwd=tex_path.parent so paranoid openout_any still lets it write output.
     command = [
         "pdflatex",
         "-interaction=nonstopmode",
-        "-output-directory",
-        str(tmp_dir),
-        str(tex_path),
+        "-halt-on-error",
+        "-no-shell-escape",
     ]
+    if fmt:
+        command.append(f"-fmt={fmt}")
+    command.append(tex_path.name)
+    return command
+
+
+def _run_pdflatex(command: list, cwd: Path, env: Optional[Dict[str, str]] = None) -> None:
+    try:
+        proc = subprocess.Popen(
+            _limited(command),
+            cwd=str(cwd),
+            env=env if env is not None else _sandbox_env(cwd),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    except FileNotFoundError as exc:  # pragma: no cover - system dep
+        raise RuntimeError("pdflatex is not installed") from exc
+    _limit_child(proc.pid)
+
     try:
-        subprocess.run(command, check=True, capture_output=True)
-    except subprocess.CalledProcessError as exc:  # pragma: no cover - system dep
-        raise RuntimeError("pdflatex compilation failed") from exc
+        proc.communicate(timeout=LATEX_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired as exc:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+        raise RuntimeError(f"pdflatex timed out after {LATEX_TIMEOUT_SECONDS:.0f}s") from exc
+    if proc.returncode != 0:  # pragma: no cover - system dep
+        raise RuntimeError("pdflatex compilation failed")
+
 
-    pdf_path = tmp_dir / "final_resume.pdf"
-    pdf_bytes = pdf_path.read_bytes()
-    return tex_path.read_text(encoding="utf-8"), base64.b64encode(pdf_bytes).decode("ascii")
+def _preamble_key(tex_source: str) -> Optional[Tuple[str, str]]:
+    split = tex_source.find(BEGIN_DOCUMENT)
+    if split == -1:
+        return None
+    preamble = tex_source[:split]
+    return hashlib.sha1(preamble.encode("utf-8")).hexdigest()[:16], preamble
+
+
+def _format_dir() -> Path:
+    """LATEX_FORMAT_DIR, created private to this user; refused if anyone else can write to it."""
+    LATEX_FORMAT_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = LATEX_FORMAT_DIR.stat()
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+        raise RuntimeError(f"{LATEX_FORMAT_DIR} is writable by other users")
+    return LATEX_FORMAT_DIR
+
+
+def _build_format(format_dir: Path, name: str, preamble: str) -> None:
+    # Built in a private scratch dir and renamed into place, so concurrent
+    # builders (other workers) never see or clobber a half-written format.
+    with tempfile.TemporaryDirectory(prefix=f".{name}_", dir=format_dir) as tmp:
+        build_dir = Path(tmp)
+        source = build_dir / f"{name}.tex"
+        source.write_text(preamble + BEGIN_DOCUMENT + "\n\\end{document}\n", encoding="utf-8")
+        command = [
+            "pdflatex",
+            "-ini",
+            "-interaction=nonstopmode",
+            f"-jobname={name}",
+            "&pdflatex",
+            "mylatexformat.ltx",
+            source.name,
+        ]
+        _run_pdflatex(command, build_dir)
+        os.replace(build_dir / f"{name}.fmt", format_dir / f"{name}.fmt")
+
+
+def _preamble_format(key: str, preamble: str) -> Optional[str]:
+    """Return the name of a format file with this preamble pre-loaded.
+
+    The preamble (everything before \\begin{document}) is dumped once per distinct
+    preamble with mylatexformat; later compiles load it instead of re-reading
+    titlesec, enumitem, hyperref and friends. Returns None when no format can be used.
+    """
+    with _format_lock:
+        if key in _formats:
+            record_cache("latex_format", _formats[key] is not None)
+            return _formats[key]
+        record_cache("latex_format", False)
+
+        name = f"resume_{key}"
+        started = time.perf_counter()
+        try:
+            format_dir = _format_dir()
+            if not (format_dir / f"{name}.fmt").exists():
+                _build_format(format_dir, name, preamble)
+                logger.info(f"Built LaTeX preamble format {name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except (OSError, RuntimeError) as exc:
+            logger.warning(f"Could not precompile LaTeX preamble, using cold compiles: {exc}")
+            _formats[key] = None
+            return None
+
+        _formats[key] = name
+        return name
+
+
+def _compile(tex_source: str) -> bytes:
+    fmt = None
+    preamble_key = _preamble_key(tex_source) if LATEX_PRECOMPILE_PREAMBLE else None
+    if preamble_key:
+        fmt = _preamble_format(*preamble_key)
+
+    with tempfile.TemporaryDirectory(prefix="resume_tex_", dir=LATEX_SCRATCH_DIR) as tmp:
+        tmp_dir = Path(tmp)
+        tex_path = tmp_dir / "final_resume.tex"
+        tex_path.write_text(tex_source, encoding="utf-8")
+
+        started = time.perf_counter()
+        if fmt:
+            try:
+                _run_pdflatex(_pdflatex_command(tex_path, fmt), tmp_dir, _sandbox_env(tmp_dir, fmt))
+            except RuntimeError as exc:
+                logger.warning(f"Compile against format {fmt} failed ({exc}); retrying cold")
+                _run_pdflatex(_pdflatex_command(tex_path), tmp_dir)
+                # The cold run worked, so the format is at fault: stop paying for warm attempts.
+                with _format_lock:
+                    _formats[preamble_key[0]] = None
+                fmt = None
+        else:
+            _run_pdflatex(_pdflatex_command(tex_path), tmp_dir)
+        logger.info(f"pdflatex ({'warm' if fmt else 'cold'}) took {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        return (tmp_dir / "final_resume.pdf").read_bytes()
+
+
+def build_pdf(tex_source: str) -> Tuple[str, str]:
+    """Compile `tex_source` on the bounded pdflatex pool; returns (tex_source, pdf_b64)."""
+    pdf_bytes = _executor.submit(_compile, tex_source).result()
+    return tex_source, base64.b64encode(pdf_bytes).decode("ascii")
 
 
 def generate_resume_files(payload: ResumePayload) -> Tuple[str, str]:
@@ -58,4 +253,3 @@ def generate_resume_files(payload: ResumePayload) -> Tuple[str, str]:
         # so the frontend can show the rewritten resume, but leave PDF empty.
         pdf_b64 = base64.b64encode(b"").decode("ascii")
     return tex_content, pdf_b64
-
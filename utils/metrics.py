@@ -0,0 +1,320 @@
+"""Minimal Prometheus metrics shared by the gateway and the microservices.
+
+Counters, gauges and fixed-bucket histograms keyed by label tuples, rendered in
+the Prometheus text exposition format. Observing is a dict lookup, a bisect and
+an addition under a lock, so it is cheap enough for every request. Values are
+per process: with several uvicorn workers, scrape each worker or aggregate in
+Prometheus.
+"""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from utils import tracing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stage latencies run from sub-millisecond parsing to two-minute LLM calls.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:  # pragma: no cover - abstract
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels: str) -> None:
+        """Compute the value at scrape time instead of on every change."""
+        with self._lock:
+            self._callbacks[self._key(labels)] = fn
+
+    def value(self, **labels: str) -> float:
+        key = self._key(labels)
+        if key in self._callbacks:
+            return self._callbacks[key]()
+        return self._values.get(key, 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            callbacks = list(self._callbacks.items())
+        lines = [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+        for key, fn in callbacks:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ------------------ shared pipeline metrics ------------------ #
+STAGE_SECONDS = histogram(
+    "resumate_stage_duration_seconds",
+    "Time spent in each pipeline stage.",
+    ("service", "stage", "mode"),
+)
+REQUEST_SECONDS = histogram(
+    "resumate_http_request_duration_seconds",
+    "End-to-end handler latency.",
+    ("service", "handler", "status"),
+)
+IN_FLIGHT = gauge(
+    "resumate_http_requests_in_flight",
+    "Requests currently being handled.",
+    ("service",),
+)
+LLM_TOKENS = counter(
+    "resumate_llm_tokens_total",
+    "Tokens reported by the LLM API.",
+    ("service", "model", "kind"),
+)
+CACHE_REQUESTS = counter(
+    "resumate_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"),
+)
+SESSION_STORE_SIZE = gauge(
+    "resumate_session_store_entries",
+    "Live sessions in the session store, finished or in progress (records and bodies are not counted).",
+    ("backend",),
+)
+
+
+@contextmanager
+def stage(service: str, name: str, mode: str = "") -> Iterator[tracing.Span]:
+    """Time one pipeline stage into STAGE_SECONDS and record it as a trace span."""
+    with tracing.span(name, mode=mode) as current:
+        try:
+            yield current
+        finally:
+            STAGE_SECONDS.observe(current.duration, service=service, stage=name, mode=mode)
+
+
+def end_stage(service: str, current: tracing.Span, mode: str = "") -> None:
+    """Finish a span from ``tracing.start_span`` and record it like ``stage``."""
+    current.end()
+    STAGE_SECONDS.observe(current.duration, service=service, stage=current.name, mode=mode)
+
+
+def record_usage(service: str, model: str, usage) -> None:
+    """Count prompt/completion tokens from an OpenAI `usage` object (or dict)."""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda attr, default=None: getattr(usage, attr, default)
+    prompt = get("prompt_tokens", 0) or 0
+    completion = get("completion_tokens", 0) or 0
+    if prompt:
+        LLM_TOKENS.inc(prompt, service=service, model=model, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, service=service, model=model, kind="completion")
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class MetricsMiddleware:
+    """Track in-flight requests and per-handler latency for one service."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": "500"}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        IN_FLIGHT.inc(service=self.service)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec(service=self.service)
+            # The router stores the matched endpoint in the scope; label by its name so
+            # /result/{id} does not create one series per session.
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - started, service=self.service, handler=handler, status=status["code"])
+
+
+def metrics_text() -> str:
+    return REGISTRY.render()
+
@@ -0,0 +1,96 @@
+"""Push notifications for session state changes.
+
+Long-polling ``/result?wait=`` and the result WebSocket both need to learn the
+moment a session moves on (parsed, rewritten, pdf_ready, ready, failed)
+instead of re-reading the store on a timer. ``publish(key, event)`` delivers
+the event to every ``subscribe(key)`` queue in this process. With a Redis
+client it is also published on one pub/sub channel, so subscribers on other
+workers receive it too. A daemon thread listens on that channel and
+reconnects if the connection drops.
+
+Events are best effort. A subscriber should read the current state after
+subscribing, and treat events only as a signal to look again.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "resumate:events"
+
+
+class Notifier:
+    def __init__(self, redis_client=None, channel: str = CHANNEL):
+        self._redis = redis_client
+        self._channel = channel
+        self._origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._listener: Optional[threading.Thread] = None
+
+    def publish(self, key: str, event: Dict[str, Any]) -> None:
+        """Deliver ``event`` to subscribers of ``key``; safe to call from any thread."""
+        self._deliver(key, event)
+        if self._redis:
+            try:
+                self._redis.publish(self._channel, json.dumps({"origin": self._origin, "key": key, "event": event}))
+            except Exception as e:
+                logger.warning(f"Publishing {key} event to Redis failed: {e}")
+
+    def _deliver(self, key: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # The subscriber's loop has closed.
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, key: str) -> AsyncIterator[asyncio.Queue]:
+        """Queue receiving every event published for ``key`` while the block runs."""
+        self._ensure_listener()
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(key, [])
+                if entry in subscribers:
+                    subscribers.remove(entry)
+                if not subscribers:
+                    self._subscribers.pop(key, None)
+
+    def _ensure_listener(self) -> None:
+        if self._redis is None or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="notify-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self._origin:
+                        self._deliver(payload["key"], payload["event"])
+            except Exception as e:
+                logger.warning(f"Event listener lost its Redis connection: {e}; reconnecting")
+                time.sleep(1)
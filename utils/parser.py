@@ -1,49 +1,62 @@
 from __future__ import annotations
 
-import io
+import os
 import re
-from typing import Optional, Tuple
+from typing import BinaryIO, Optional, Tuple
 
-import pdfplumber
-from docx import Document
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
 
+from utils import capabilities
+from utils.docx_text import DocxTooLarge, extract_docx_text
+from utils.uploads import MAX_JD_BYTES, MAX_RESUME_BYTES, open_upload
 
-def _read_upload(upload: UploadFile) -> bytes:
-    """Read the entire UploadFile payload and reset cursor."""
-    upload.file.seek(0)
-    payload = upload.file.read()
-    upload.file.seek(0)
-    return payload
+# "stream" reads word/*.xml incrementally; "python-docx" builds the full object model.
+DOCX_EXTRACTOR = os.getenv("DOCX_EXTRACTOR", "stream").lower()
 
 
-def _pdf_to_text(payload: bytes) -> str:
-    with pdfplumber.open(io.BytesIO(payload)) as pdf:
+def _pdf_to_text(fileobj: BinaryIO) -> str:
+    pdfplumber = capabilities.require("pdfplumber")
+    with pdfplumber.open(fileobj) as pdf:
         pages = [page.extract_text() or "" for page in pdf.pages]
     return "\n".join(pages)
 
 
-def _docx_to_text(payload: bytes) -> str:
-    document = Document(io.BytesIO(payload))
+def _docx_to_text(fileobj: BinaryIO) -> str:
+    if DOCX_EXTRACTOR == "stream":
+        try:
+            return extract_docx_text(fileobj)
+        except DocxTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    return _docx_to_text_python_docx(fileobj)
+
+
+def _docx_to_text_python_docx(fileobj: BinaryIO) -> str:
+    Document = capabilities.require("docx")
+    document = Document(fileobj)
     paragraphs = [p.text for p in document.paragraphs if p.text.strip()]
     return "\n".join(paragraphs)
 
 
+def _plain_to_text(fileobj: BinaryIO) -> str:
+    payload = fileobj.read()
+    try:
+        return payload.decode("utf-8")
+    except UnicodeDecodeError:
+        return payload.decode("latin-1", errors="ignore")
+
+
 def parse_resume(upload: UploadFile) -> str:
     """Return raw textual content from the uploaded resume."""
-    payload = _read_upload(upload)
+    fileobj = open_upload(upload, MAX_RESUME_BYTES, "original_resume")
     content_type = (upload.content_type or "").lower()
 
     if content_type.endswith("pdf") or upload.filename.lower().endswith(".pdf"):
-        return _pdf_to_text(payload)
+        return _pdf_to_text(fileobj)
     if "word" in content_type or upload.filename.lower().endswith((".docx", ".doc")):
-        return _docx_to_text(payload)
+        return _docx_to_text(fileobj)
 
     # Fallback to naive decode
-    try:
-        return payload.decode("utf-8")
-    except UnicodeDecodeError:
-        return payload.decode("latin-1", errors="ignore")
+    return _plain_to_text(fileobj)
 
 
 def parse_job_description(
@@ -54,15 +67,12 @@ def parse_job_description(
         return jd_text.strip(), "text"
 
     if jd_file:
-        payload = _read_upload(jd_file)
+        fileobj = open_upload(jd_file, MAX_JD_BYTES, "job_description_file")
         if jd_file.filename.lower().endswith(".pdf"):
-            return _pdf_to_text(payload), "file"
+            return _pdf_to_text(fileobj), "file"
         if jd_file.filename.lower().endswith(".docx"):
-            return _docx_to_text(payload), "file"
-        try:
-            return payload.decode("utf-8"), "file"
-        except UnicodeDecodeError:
-            return payload.decode("latin-1", errors="ignore"), "file"
+            return _docx_to_text(fileobj), "file"
+        return _plain_to_text(fileobj), "file"
 
     return "", "missing"
 
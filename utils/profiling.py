@@ -0,0 +1,269 @@
+"""Opt-in per-request profiling for the gateway and pdf-service.
+
+Disabled unless PROFILE_REQUESTS=true. When it is enabled, a request to one of
+PROFILE_PATHS (default "/upload,/generate") is profiled if:
+
+- it carries ``X-Profile: sample|cprofile`` or ``?profile=sample|cprofile``
+  and, when PROFILE_TOKEN is set, a matching ``X-Profile-Token`` header (or
+  ``?profile_token=``), or
+- it falls in the random PROFILE_SAMPLE_RATE fraction (e.g. 0.01 = 1%),
+  which always uses the low-overhead sampler.
+
+Modes:
+
+    sample    a stack sampler thread (PROFILE_INTERVAL_MS, default 5 ms); writes
+              collapsed stacks (``<id>.folded``) for flamegraph.pl / speedscope
+    cprofile  deterministic cProfile; writes pstats (``<id>.prof``) for snakeviz
+              or gprof2dot
+
+Profiles land in PROFILE_DIR, named after the label the handler sets with
+``set_label`` (the session id for /upload) or else the trace id. The file name
+is returned in the ``X-Profile-Id`` response header.
+
+The profilers watch the event-loop thread plus the worker threads the request
+hands work to through ``profiling.to_thread`` (parsing, rewriting, PDF
+rendering), so the hot work run off the loop shows up too. A profile also
+contains any other request the event-loop thread served at the same time;
+profile on an otherwise quiet staging instance when that matters.
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+from urllib.parse import parse_qs
+
+from utils import tracing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() == "true"
+PROFILE_PATHS = tuple(p for p in os.getenv("PROFILE_PATHS", "/upload,/generate").split(",") if p)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/tmp/resumate-profiles"))
+
+MODES = {"sample": "folded", "cprofile": "prof"}
+_PROFILE_ID = re.compile(r"^[A-Za-z0-9_.-]+\.(folded|prof)$")
+
+T = TypeVar("T")
+
+_request_info: ContextVar[Optional[Dict[str, Any]]] = ContextVar("resumate_profile", default=None)
+# cProfile cannot run twice at once in one process.
+_cprofile_lock = threading.Lock()
+
+
+def set_label(label: str) -> None:
+    """Name the current request's profile (if one is being taken)."""
+    info = _request_info.get()
+    if info is not None:
+        info["label"] = label
+
+
+async def httpx_request_hook(request) -> None:
+    """httpx ``event_hooks["request"]`` entry that profiles downstream calls too."""
+    info = _request_info.get()
+    if info is not None:
+        request.headers["x-profile"] = info["mode"]
+        if PROFILE_TOKEN:
+            request.headers["x-profile-token"] = PROFILE_TOKEN
+
+
+async def to_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """``asyncio.to_thread`` that keeps profiling the current request in the worker thread."""
+    call = functools.partial(func, *args, **kwargs)
+    info = _request_info.get()
+    profiler = info.get("profiler") if info is not None else None
+    if profiler is None:
+        return await asyncio.to_thread(call)
+
+    def profiled() -> T:
+        with profiler.thread():
+            return call()
+
+    return await asyncio.to_thread(profiled)
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    """Return the stored profile for ``profile_id`` or None (also when disabled)."""
+    if not PROFILE_REQUESTS or not _PROFILE_ID.match(profile_id):
+        return None
+    path = PROFILE_DIR / profile_id
+    return path if path.is_file() else None
+
+
+class _StackSampler:
+    """Periodically capture the Python stacks of a set of threads into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        """Sample the calling thread too while the block runs."""
+        thread_id = threading.get_ident()
+        self.thread_ids = self.thread_ids | {thread_id}
+        try:
+            yield
+        finally:
+            self.thread_ids = self.thread_ids - {thread_id}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if names:
+                    self.stacks[";".join(reversed(names))] += 1
+
+    def write(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class _CProfiler:
+    """cProfile on the event-loop thread plus one per worker thread, merged when written."""
+
+    def __init__(self):
+        self._main = cProfile.Profile()
+        self._threads: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._main.enable()
+
+    def stop(self) -> None:
+        self._main.disable()
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles through sys.monitoring, which already covers every thread.
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._threads.append(profile)
+
+    def write(self, path: Path) -> None:
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            profiles = list(self._threads)
+        for profile in profiles:
+            profile.create_stats()
+            if profile.stats:
+                stats.add(profile)
+        stats.dump_stats(str(path))
+
+
+def _requested_mode(scope) -> Optional[str]:
+    headers = dict(scope.get("headers") or [])
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    mode = headers.get(b"x-profile", b"").decode("latin-1").strip().lower() or (query.get("profile") or [""])[0].lower()
+    if mode in ("1", "true"):
+        mode = "sample"
+    if mode not in MODES:
+        return None
+    if PROFILE_TOKEN:
+        token = headers.get(b"x-profile-token", b"").decode("latin-1") or (query.get("profile_token") or [""])[0]
+        if token != PROFILE_TOKEN:
+            return None
+    return mode
+
+
+class ProfilingMiddleware:
+    """Profile selected requests for one service; a no-op unless PROFILE_REQUESTS is set."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILE_REQUESTS or scope["type"] != "http" or scope["path"] not in PROFILE_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        mode = _requested_mode(scope)
+        if mode is None and PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            mode = "sample"
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+        if mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            logger.info(f"Skipping cProfile for {scope['path']}: another request is being profiled")
+            await self.app(scope, receive, send)
+            return
+
+        if mode == "cprofile":
+            profiler = _CProfiler()
+        else:
+            profiler = _StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        info: Dict[str, Any] = {"mode": mode, "profiler": profiler}
+        token = _request_info.set(info)
+        current = tracing.current_span()
+        fallback = current.trace_id if current else f"{int(time.time() * 1000)}"
+
+        def profile_id() -> str:
+            label = re.sub(r"[^A-Za-z0-9_.-]", "_", info.get("label") or fallback)
+            return f"{label}-{self.service}.{MODES[mode]}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id().encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            if mode == "cprofile":
+                _cprofile_lock.release()
+            _request_info.reset(token)
+            self._store(profiler, mode, profile_id())
+
+    def _store(self, profiler, mode: str, profile_id: str) -> None:
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            path = PROFILE_DIR / profile_id
+            profiler.write(path)
+            tracing.set_attribute("profile_id", profile_id)
+            logger.info(f"Stored {mode} profile {path}")
+        except OSError as e:
+            logger.warning(f"Could not store profile {profile_id}: {e}")
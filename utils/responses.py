@@ -0,0 +1,125 @@
+"""Fast JSON encoding and precompressed response bodies.
+
+``/result`` returns the full HTML plus a base64 PDF of several hundred KB and
+is polled repeatedly. Its body is encoded once when the session is saved
+(``precompress``: identity, gzip and, when available, brotli). Each poll then
+picks, among the variants stored for that session, the one the client
+accepts (``negotiate``) and sends the stored bytes as they are
+(``encoded_response``).
+
+The body's content hash, also computed at save time, is its strong ETag
+(``"<hash>"``, or ``"<hash>-<coding>"`` for a compressed variant, since each
+variant is a different representation). A poll that sends it back in
+``If-None-Match`` gets ``not_modified()``: a 304 with no body.
+
+orjson is used for encoding when it is installed, and the standard library
+otherwise; brotli is skipped when neither ``brotli`` nor ``brotlicffi`` is
+installed.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi.responses import Response
+
+from utils import capabilities
+
+GZIP_LEVEL = 6
+# Quality 5 is within a few percent of 11 on base64 PDFs at ~1/100th of the cost.
+BROTLI_QUALITY = 5
+# Server preference when the client accepts several encodings equally.
+PREFERENCE = ("br", "gzip", "identity")
+
+
+def dumps(obj: Any) -> bytes:
+    orjson = capabilities.load("orjson")
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """Every encoding of ``body`` this server can send, keyed by content-coding."""
+    bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    brotli = capabilities.load("brotli")
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return bodies
+
+
+def encodings() -> Tuple[str, ...]:
+    """The content-codings ``precompress`` produces in this process."""
+    return PREFERENCE if capabilities.available("brotli") else ("gzip", "identity")
+
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """Pick the best content-coding from an Accept-Encoding header (RFC 9110 q-values)."""
+    weights: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    # identity is acceptable unless excluded, but loses to any coding the client listed.
+    unlisted = weights.get("*", 0.0)
+    candidates = [coding for coding in PREFERENCE if coding in set(available)]
+    best, best_q = "identity", 0.0
+    for coding in candidates:
+        q = weights.get(coding, unlisted if coding != "identity" else max(unlisted, 0.001))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag(digest: str, variant: str = "identity") -> str:
+    return f'"{digest}"' if variant == "identity" else f'"{digest}-{variant}"'
+
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    """True when If-None-Match names any variant of ``digest`` (or is ``*``)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # If-None-Match uses weak comparison: ignore a W/ prefix.
+        tag = tag[2:] if tag.startswith("W/") else tag
+        if tag.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+def _cache_headers(tag: Optional[str]) -> Dict[str, str]:
+    # no-cache: clients may keep the body but must revalidate on every poll.
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if tag:
+        headers["ETag"] = tag
+    return headers
+
+
+def not_modified(tag: str) -> Response:
+    return Response(status_code=304, headers=_cache_headers(tag))
+
+
+def encoded_response(body: bytes, encoding: str = "identity", tag: Optional[str] = None) -> Response:
+    headers = _cache_headers(tag)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
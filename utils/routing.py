@@ -0,0 +1,236 @@
+"""Latency-aware model routing with a fallback cascade.
+
+Every LLM call used to go to a hardcoded ``gpt-4o-mini``. A long resume
+waited as long as the model took, and one model outage failed every upload.
+``LLM_MODELS`` now lists the models to use, preferred first. For each call,
+``ModelRouter.complete``:
+
+- estimates the call's latency and cost on each model. The estimate uses the
+  size of the input and what this process has observed for that model:
+  seconds per completion token, completion tokens per input token, and
+  token prices;
+- picks the first model whose estimate fits ``LLM_LATENCY_SLO_SECONDS`` (and
+  ``LLM_MAX_COST_USD``, when set). If none fits, it picks the fastest;
+- on a timeout or API error, moves down the cascade to the next model. A
+  model that failed is tried last for ``LLM_FAILURE_COOLDOWN_SECONDS``.
+
+Observed latency and cost are exported as ``resumate_llm_call_seconds`` and
+``resumate_llm_cost_usd_total``. The observations feed the next routing
+decision. They are kept per process, so each worker learns on its own.
+
+When every model has failed, the last error is raised. The gateway then
+falls back to the local spaCy ``ResumeRewriter`` (see ``LLM_LOCAL_FALLBACK``
+in main.py). Authentication errors are raised straight away, since every
+model shares the same key.
+
+    LLM_MODELS                     comma-separated, preferred first (default: gpt-4o-mini)
+    LLM_LATENCY_SLO_SECONDS        target latency per call (default 30)
+    LLM_TIMEOUT_SECONDS            timeout per attempt (default 120)
+    LLM_LAST_TIER_RETRIES          retries of the last model in the cascade (default 1)
+    LLM_MAX_COST_USD               skip models estimated above this per call (default: no limit)
+    LLM_FAILURE_COOLDOWN_SECONDS   how long a failed model is tried last (default 30)
+    LLM_PRICES                     "model:input/output,..." in USD per 1M tokens, overriding PRICES
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+LLM_MODELS = [model.strip() for model in os.getenv("LLM_MODELS", "gpt-4o-mini").split(",") if model.strip()]
+LLM_LATENCY_SLO_SECONDS = float(os.getenv("LLM_LATENCY_SLO_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_LAST_TIER_RETRIES = int(os.getenv("LLM_LAST_TIER_RETRIES", "1"))
+LLM_MAX_COST_USD = float(os.getenv("LLM_MAX_COST_USD", "0"))
+LLM_FAILURE_COOLDOWN_SECONDS = float(os.getenv("LLM_FAILURE_COOLDOWN_SECONDS", "30"))
+
+# USD per 1M (input, output) tokens.
+PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+for _item in os.getenv("LLM_PRICES", "").split(","):
+    _model, _, _price = _item.strip().partition(":")
+    if _price:
+        _input, _, _output = _price.partition("/")
+        PRICES[_model] = (float(_input), float(_output or _input))
+
+# Priors until a model has been observed: ~65 tokens/s and HTML about twice
+# as long as the text it rewrites.
+PRIOR_SECONDS_PER_TOKEN = 0.015
+PRIOR_OUTPUT_RATIO = 2.0
+# Weight of the newest observation in the moving averages.
+EWMA_ALPHA = 0.2
+
+LLM_CALL_SECONDS = metrics.histogram(
+    "resumate_llm_call_seconds",
+    "Latency of each LLM call by model and outcome (ok, timeout, error).",
+    ("service", "model", "outcome"),
+)
+LLM_COST = metrics.counter(
+    "resumate_llm_cost_usd_total",
+    "Estimated LLM spend in USD from reported token usage and PRICES.",
+    ("service", "model"),
+)
+LLM_FALLBACKS = metrics.counter(
+    "resumate_llm_fallbacks_total",
+    "Calls that moved down the cascade, by the model that failed and the next tier.",
+    ("service", "from_model", "to"),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose.
+    return len(text) // 4 + 1
+
+
+def _is_auth_error(error: BaseException) -> bool:
+    return type(error).__name__ in ("AuthenticationError", "PermissionDeniedError")
+
+
+def _is_timeout(error: BaseException) -> bool:
+    return "Timeout" in type(error).__name__
+
+
+@dataclass
+class ModelStats:
+    seconds_per_token: float = PRIOR_SECONDS_PER_TOKEN
+    output_ratio: float = PRIOR_OUTPUT_RATIO
+    calls: int = 0
+    failed_at: float = 0.0  # monotonic time of the last failure; 0 when the last call succeeded
+
+    def cooling_down(self, now: float) -> bool:
+        return bool(self.failed_at) and now - self.failed_at < LLM_FAILURE_COOLDOWN_SECONDS
+
+    def observe(self, seconds: float, work_tokens: int, completion_tokens: int) -> None:
+        if completion_tokens <= 0:
+            return
+        alpha = 1.0 if self.calls == 0 else EWMA_ALPHA
+        self.seconds_per_token += alpha * (seconds / completion_tokens - self.seconds_per_token)
+        self.output_ratio += alpha * (completion_tokens / max(work_tokens, 1) - self.output_ratio)
+        self.calls += 1
+
+
+@dataclass
+class Route:
+    model: str
+    seconds: float
+    cost: float
+
+
+class ModelRouter:
+    def __init__(self, service: str, models: Sequence[str] = (), mode: str = ""):
+        self.service = service
+        self.mode = mode
+        self.models = list(models or LLM_MODELS)
+        self._stats = {model: ModelStats() for model in self.models}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Identifies the configured cascade, for cache keys."""
+        return ",".join(self.models)
+
+    def estimate(self, model: str, prompt_tokens: int, work_tokens: int) -> Route:
+        stats = self._stats[model]
+        completion_tokens = stats.output_ratio * work_tokens
+        input_price, output_price = PRICES.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+        return Route(model, completion_tokens * stats.seconds_per_token, cost)
+
+    def plan(self, prompt_tokens: int, work_tokens: int) -> List[Route]:
+        """The cascade for one call: the routed model first, then the rest by estimated latency."""
+        now = time.monotonic()
+        with self._lock:
+            routes = [self.estimate(model, prompt_tokens, work_tokens) for model in self.models]
+            cooling = {model for model, stats in self._stats.items() if stats.cooling_down(now)}
+        affordable = [route for route in routes if not LLM_MAX_COST_USD or route.cost <= LLM_MAX_COST_USD] or routes
+        healthy = [route for route in affordable if route.model not in cooling]
+        # Preference order decides among models that meet the SLO.
+        within_slo = [route for route in healthy if route.seconds <= LLM_LATENCY_SLO_SECONDS]
+        chosen = within_slo[0] if within_slo else min(healthy or affordable, key=lambda route: route.seconds)
+        rest = sorted((route for route in routes if route is not chosen), key=lambda route: (route.model in cooling, route.seconds))
+        return [chosen] + rest
+
+    def complete(self, client, messages: List[Dict[str, Any]], work_text: str = "", **kwargs) -> Tuple[Any, str]:
+        """Run a chat completion down the cascade; returns (completion, model used).
+
+        ``work_text`` is what the model has to rewrite. Output length, and with
+        it latency, scales with it rather than with the whole prompt.
+        """
+        prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in messages)
+        work_tokens = estimate_tokens(work_text) if work_text else prompt_tokens
+        cascade = self.plan(prompt_tokens, work_tokens)
+        tracing.set_attribute("llm_route", cascade[0].model)
+        tracing.set_attribute("llm_route_estimate_s", round(cascade[0].seconds, 2))
+
+        for position, route in enumerate(cascade):
+            last = position == len(cascade) - 1
+            # The cascade does the retrying when there is somewhere to fall back to. The last
+            # tier gets a bounded count: the client default of 2 means three full timeouts.
+            options = {"timeout": LLM_TIMEOUT_SECONDS, "max_retries": LLM_LAST_TIER_RETRIES if last else 0}
+            llm_span = tracing.start_span("llm_call", model=route.model, estimate_s=round(route.seconds, 2))
+            started = time.perf_counter()
+            try:
+                completion = client.with_options(**options).chat.completions.create(
+                    model=route.model, messages=messages, **kwargs
+                )
+            except Exception as e:
+                seconds = time.perf_counter() - started
+                llm_span.end(error=e)
+                outcome = "timeout" if _is_timeout(e) else "error"
+                LLM_CALL_SECONDS.observe(seconds, service=self.service, model=route.model, outcome=outcome)
+                if _is_auth_error(e) or last:
+                    raise
+                with self._lock:
+                    self._stats[route.model].failed_at = time.monotonic()
+                LLM_FALLBACKS.inc(service=self.service, from_model=route.model, to=cascade[position + 1].model)
+                logger.warning(f"{route.model} failed ({outcome}: {e}); falling back to {cascade[position + 1].model}")
+                continue
+
+            seconds = time.perf_counter() - started
+            metrics.end_stage(self.service, llm_span, self.mode)
+            LLM_CALL_SECONDS.observe(seconds, service=self.service, model=route.model, outcome="ok")
+            usage = getattr(completion, "usage", None)
+            metrics.record_usage(self.service, route.model, usage)
+            self._record(route.model, seconds, work_tokens, usage)
+            return completion, route.model
+        raise RuntimeError("No LLM models configured")  # pragma: no cover - LLM_MODELS is never empty
+
+    def _record(self, model: str, seconds: float, work_tokens: int, usage) -> None:
+        with self._lock:
+            self._stats[model].failed_at = 0.0
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda attr, default=None: getattr(usage, attr, default)
+        prompt = get("prompt_tokens", 0) or 0
+        completion = get("completion_tokens", 0) or 0
+        input_price, output_price = PRICES.get(model, (0.0, 0.0))
+        cost = (prompt * input_price + completion * output_price) / 1_000_000
+        if cost:
+            LLM_COST.inc(cost, service=self.service, model=model)
+        with self._lock:
+            self._stats[model].observe(seconds, work_tokens, completion)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """What routing currently believes about each model."""
+        with self._lock:
+            return {
+                model: {
+                    "seconds_per_token": round(stats.seconds_per_token, 5),
+                    "output_ratio": round(stats.output_ratio, 3),
+                    "calls": stats.calls,
+                    "cooling_down": stats.cooling_down(time.monotonic()),
+                }
+                for model, stats in self._stats.items()
+            }
@@ -1,25 +1,129 @@
 from __future__ import annotations
 
-import random
-from typing import Sequence
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
 
 from models import ResumePayload
 
+if TYPE_CHECKING:
+    import numpy as np
+    from scipy import sparse
+
+# numpy/scipy cost ~300 ms to import, so they are imported where they are used:
+# tokenize() alone (job index, keyword lists) never loads them.
+
+ATS_MIN = 80
+ATS_MAX = 95
+
+TOKEN_REGEX = re.compile(r"\b\w{4,}\b")
+_STYLE_REGEX = re.compile(r"<style[^>]*>.*?</style>", re.S | re.I)
+_TAG_REGEX = re.compile(r"<[^>]+>")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased 4+ character words; markup and embedded CSS are dropped first."""
+    if "<" in text:
+        text = _TAG_REGEX.sub(" ", _STYLE_REGEX.sub(" ", text))
+    return TOKEN_REGEX.findall(text.lower())
+
+
+class ScoringEngine:
+    """Sparse term vectors for resumes and job descriptions, scored in batch.
+
+    The vocabulary is shared by both sides of one call, so a batch of
+    resumes × JDs is tokenized once and scored with a single sparse product.
+
+    The score is coverage: the share of a JD's distinct terms that the resume
+    contains. It depends only on the (resume, JD) pair, never on what else is
+    in the batch, so the gateway, the rewriter-service and the agents agree
+    whether they score one pair or a grid. Nothing is random: identical inputs
+    always give identical scores.
+    """
+
+    def _term_matrix(self, docs: Sequence[List[str]], vocab: Dict[str, int]) -> sparse.csr_matrix:
+        import numpy as np
+        from scipy import sparse
+
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, tokens in enumerate(docs):
+            for token in tokens:
+                rows.append(row)
+                cols.append(vocab.setdefault(token, len(vocab)))
+        data = np.ones(len(rows), dtype=np.float64)
+        # Duplicate (row, col) pairs are summed into term frequencies.
+        matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(docs), len(vocab)))
+        matrix.sum_duplicates()
+        return matrix
+
+    def vectorize(self, resumes: Sequence[str], jds: Sequence[str]):
+        """Return (resume_tf, jd_tf) over a vocabulary shared by both sides."""
+        vocab: Dict[str, int] = {}
+        resume_tf = self._term_matrix([tokenize(t) for t in resumes], vocab)
+        jd_tf = self._term_matrix([tokenize(t) for t in jds], vocab)
+        size = len(vocab)
+        resume_tf.resize((resume_tf.shape[0], size))
+        jd_tf.resize((jd_tf.shape[0], size))
+        return resume_tf, jd_tf
+
+    def coverage(self, resumes: Sequence[str], jds: Sequence[str]) -> np.ndarray:
+        """Share of each JD's distinct terms present in each resume.
+
+        Shape (len(resumes), len(jds)), values in [0, 1].
+        """
+        import numpy as np
+
+        resume_tf, jd_tf = self.vectorize(resumes, jds)
+        present = (resume_tf > 0).astype(np.float64)
+        wanted = (jd_tf > 0).astype(np.float64)
+        covered = (present @ wanted.T).toarray()
+        totals = np.asarray(wanted.sum(axis=1)).ravel()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(totals > 0, covered / totals, 0.0)
+
+    def ats_scores(self, resumes: Sequence[str], jds: Sequence[str]) -> np.ndarray:
+        """Bounded integer ATS scores, shape (len(resumes), len(jds))."""
+        import numpy as np
+
+        scores = ATS_MIN + np.floor(self.coverage(resumes, jds) * (ATS_MAX - ATS_MIN))
+        return np.clip(scores, ATS_MIN, ATS_MAX).astype(int)
+
+
+engine = ScoringEngine()
+
+
+def score_text(resume_text: str, job_text: str) -> int:
+    """ATS score for one resume (plain text or HTML) against one job description."""
+    if not job_text or not job_text.strip():
+        return (ATS_MIN + ATS_MAX) // 2
+    return int(engine.ats_scores([resume_text], [job_text])[0, 0])
+
+
+def score_texts(resumes: Sequence[str], jds: Sequence[str]) -> np.ndarray:
+    """Batch ATS scores: N rewrites × one JD, one resume × N JDs, or any grid."""
+    return engine.ats_scores(resumes, jds)
+
+
+def payload_text(payload: ResumePayload) -> str:
+    parts: List[str] = [payload.heading.title, " ".join(payload.skills), payload.education]
+    for exp in payload.experiences:
+        parts.append(f"{exp.role} {exp.company}")
+        parts.extend(b.text for b in exp.bullets)
+    for project in payload.projects:
+        parts.append(f"{project.name} {project.stack}")
+        parts.extend(b.text for b in project.bullets)
+    parts.extend(payload.certifications)
+    return "\n".join(parts)
+
 
 def score_ats(payload: ResumePayload, job_text: str) -> int:
-    """Return a bounded ATS score between 80 and 95."""
-    base = 80
-    bonus = min(15, len(payload.skills))
-    overlap = _keyword_overlap(payload.skills, job_text)
-    noise = random.randint(0, 4)
-    score = base + int(bonus * overlap) + noise
-    return max(80, min(95, score))
-
-
-def _keyword_overlap(skills: Sequence[str], job_text: str) -> float:
-    if not job_text:
-        return 0.5
-    job_lower = job_text.lower()
-    matches = sum(1 for skill in skills if skill.lower() in job_lower)
-    return matches / max(1, len(skills))
+    """Return a deterministic ATS score between 80 and 95."""
+    return score_text(payload_text(payload), job_text)
+
 
+def score_payloads(payloads: Iterable[ResumePayload], job_text: Optional[str]) -> List[int]:
+    """Score several rewrites of one resume against the same job description at once."""
+    texts = [payload_text(p) for p in payloads]
+    if not job_text or not job_text.strip():
+        return [(ATS_MIN + ATS_MAX) // 2] * len(texts)
+    return score_texts(texts, [job_text])[:, 0].tolist()
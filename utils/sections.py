@@ -0,0 +1,351 @@
+"""Resume sections for incremental re-tailoring.
+
+Tailoring the same resume to a slightly different job description used to
+regenerate the whole document. In the section strategy the resume text is
+split into sections: the header, each role (a ``models.Experience``), each
+project (a ``models.Project``), skills, education and certifications. Each
+section's rewritten HTML fragment is cached under a key made of:
+
+- the section's own text;
+- the job description features relevant to it (``relevant_features``);
+- the model and prompt that produced it.
+
+A new request sends only the sections whose key changed to the LLM, and the
+rest are reassembled from the cache. Long resumes are spread over several
+concurrent completions (``balance``). The merged fragments are checked for
+bullets that repeat phrasing across sections (``repeated_bullets``), since
+no single completion saw all of them.
+
+Splitting is heuristic: headings are matched against common names, and a new
+role or project starts at the first non-bullet line after a run of bullets
+that does not continue the last bullet (PDF extraction wraps long bullets
+onto unmarked lines). When no headings are found the caller falls back to
+rewriting the whole document.
+"""
+from __future__ import annotations
+
+import html
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.scorer import tokenize
+
+HEADINGS: Dict[str, Tuple[str, ...]] = {
+    "summary": ("summary", "profile", "professional summary", "objective", "about me"),
+    "experience": (
+        "experience",
+        "work experience",
+        "professional experience",
+        "employment",
+        "employment history",
+        "work history",
+    ),
+    "projects": ("projects", "personal projects", "selected projects", "academic projects"),
+    "skills": ("skills", "technical skills", "core skills", "core competencies", "technologies"),
+    "education": ("education", "academic background"),
+    "certifications": (
+        "certifications",
+        "certificates",
+        "licenses and certifications",
+        "licenses & certifications",
+        "certifications & awards",
+    ),
+}
+_HEADING_KINDS = {name: kind for kind, names in HEADINGS.items() for name in names}
+
+# Output order of the template; "experience" and "projects" sections are the
+# individual roles and projects, wrapped in one <section> each when assembled.
+ORDER = ("header", "experience", "skills", "projects", "education", "certifications")
+_ENTRY_HEADINGS = {"experience": "EXPERIENCE", "projects": "PROJECTS"}
+
+# The HTML fragment the LLM returns for each kind of section.
+FRAGMENTS = {
+    "header": '<div class="header">...</div>',
+    "experience": '<div class="job">...</div>',
+    "skills": '<section class="skills">...</section>',
+    "projects": '<div class="project">...</div>',
+    "education": '<section class="education">...</section>',
+    "certifications": '<section class="certifications">...</section>',
+}
+
+_BULLET_REGEX = re.compile(r"^\s*(?:[-•*▪◦●]|\d+[.)])\s+")
+_YEAR_START_REGEX = re.compile(r"^(?:19|20)\d{2}\b")
+_END_PUNCTUATION = (".", "!", "?", ";", ":")
+# A bullet cut off after one of these goes on on the next line.
+_CONNECTORS = frozenset("a an and by for from in into of on or over the to using via with across including &".split())
+_MARKER_REGEX = re.compile(r"<!--\s*section\s+(\d+)\s*-->", re.I)
+_ENTRY_WRAPPER_REGEX = re.compile(r'</?section[^>]*>|<h2>[^<]*</h2>', re.I)
+_BULLET_HTML_REGEX = re.compile(r"<li>(.*?)</li>", re.S)
+_WORD_REGEX = re.compile(r"[a-z0-9%$]+")
+# Phrases made only of these words are too common to count as repetition.
+_FUNCTION_WORDS = frozenset("a an and by for from in into of on the to using via with resulting leading".split())
+
+# Frequent JD words that say nothing about the role.
+_STOPWORDS = frozenset(
+    "about above after also among and any are based been being both build building can company could "
+    "daily deliver drive each etc every experience from good great have help highly ideal including into "
+    "join just least like looking make more most must need new other our over own part plus position "
+    "preferred required requirements responsibilities role should skills some strong such team teams than "
+    "that their them then there these they this those through time using well were what when where which "
+    "while will with within work working would years your".split()
+)
+JD_FEATURES = 40
+# Sections tailored to the role as a whole rather than to their own content.
+_WHOLE_JD_KINDS = {"header": 10, "skills": 25}
+
+
+@dataclass
+class Section:
+    kind: str  # header | experience (one role) | projects (one project) | skills | education | certifications
+    text: str
+    index: int = 0
+
+    @property
+    def fragment(self) -> str:
+        return FRAGMENTS[self.kind]
+
+
+def _heading_kind(line: str) -> Optional[str]:
+    name = line.strip().strip(":").strip().lower()
+    if not name or len(name) > 40:
+        return None
+    return _HEADING_KINDS.get(name)
+
+
+def _is_bullet(line: str) -> bool:
+    return bool(_BULLET_REGEX.match(line))
+
+
+def _continues(entry: Sequence[str], line: str) -> bool:
+    """Whether ``line`` is the wrapped rest of the entry's last bullet.
+
+    It is when it starts in lowercase, with punctuation or with a number that
+    is not a year; when the bullet stops on a connecting word; or when the
+    entry's other bullets end in punctuation and this one does not yet.
+    """
+    text, previous = line.strip(), entry[-1].rstrip()
+    if text[0].islower() or text[0] in "(&%,;)":
+        return True
+    if text[0].isdigit():
+        return not _YEAR_START_REGEX.match(text)
+    words = previous.split()
+    if (words and words[-1].lower() in _CONNECTORS) or previous.endswith((",", "-", "–")):
+        return True
+    punctuated = [bullet.rstrip().endswith(_END_PUNCTUATION) for bullet in entry[:-1] if _is_bullet(bullet)]
+    return bool(punctuated) and all(punctuated) and not previous.endswith(_END_PUNCTUATION)
+
+
+def _split_entries(lines: Sequence[str]) -> List[List[str]]:
+    """One block per role or project: an entry ends when a non-bullet line follows its bullets."""
+    entries: List[List[str]] = []
+    current: List[str] = []
+    seen_bullet = False
+    for line in lines:
+        if not line.strip():
+            if seen_bullet:
+                entries.append(current)
+                current, seen_bullet = [], False
+            continue
+        if seen_bullet and not _is_bullet(line):
+            if _continues(current, line):
+                current[-1] = f"{current[-1].rstrip()} {line.strip()}"
+                continue
+            entries.append(current)
+            current, seen_bullet = [], False
+        current.append(line)
+        seen_bullet = seen_bullet or _is_bullet(line)
+    if current:
+        entries.append(current)
+    return [entry for entry in entries if any(line.strip() for line in entry)]
+
+
+def split_sections(resume_text: str) -> List[Section]:
+    """Sections of ``resume_text`` in document order; empty when it has no recognisable headings."""
+    blocks: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in resume_text.splitlines():
+        kind = _heading_kind(line)
+        if kind:
+            blocks.append((kind, []))
+        else:
+            blocks[-1][1].append(line)
+    if len(blocks) == 1:
+        return []
+
+    sections: List[Section] = []
+    header_lines: List[str] = []
+    for kind, lines in blocks:
+        if kind in ("header", "summary"):
+            # The template has no summary section; it informs the header's title line.
+            header_lines.extend(lines)
+        elif kind in _ENTRY_HEADINGS:
+            sections.extend(Section(kind, "\n".join(entry).strip()) for entry in _split_entries(lines))
+        elif "\n".join(lines).strip():
+            sections.append(Section(kind, "\n".join(lines).strip()))
+    if "\n".join(header_lines).strip():
+        sections.insert(0, Section("header", "\n".join(header_lines).strip()))
+    for index, section in enumerate(sections):
+        section.index = index
+    return sections
+
+
+def jd_features(job_description: str, limit: int = JD_FEATURES) -> List[str]:
+    """The job description's most frequent meaningful terms, most frequent first."""
+    counts = Counter(term for term in tokenize(job_description) if term not in _STOPWORDS and not term.isdigit())
+    return [term for term, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]]
+
+
+def relevant_features(section: Section, features: Sequence[str]) -> List[str]:
+    """The JD features a section's rewrite depends on.
+
+    Header and skills follow the top of the JD. Roles and projects follow
+    the JD terms they already mention. Education and certifications are
+    rewritten the same way whatever the JD says.
+    """
+    if section.kind in _WHOLE_JD_KINDS:
+        return sorted(features[: _WHOLE_JD_KINDS[section.kind]])
+    if section.kind in ("education", "certifications"):
+        return []
+    terms = set(tokenize(section.text))
+    return sorted(term for term in features if term in terms)
+
+
+def balance(sections: Sequence[Section], batches: int) -> List[List[Section]]:
+    """Spread sections over ``batches`` groups of similar total length (longest first).
+
+    Completion time grows with output length, so the slowest batch, and with
+    it the whole rewrite, takes about as long as the longest section.
+    """
+    groups: List[List[Section]] = [[] for _ in range(max(1, min(batches, len(sections))))]
+    sizes = [0] * len(groups)
+    for section in sorted(sections, key=lambda item: len(item.text), reverse=True):
+        smallest = sizes.index(min(sizes))
+        groups[smallest].append(section)
+        sizes[smallest] += len(section.text)
+    return [sorted(group, key=lambda item: item.index) for group in groups if group]
+
+
+def prompt_block(sections: Sequence[Section]) -> str:
+    """The sections to rewrite, each under the marker its fragment must be returned with."""
+    return "\n\n".join(
+        f"<!-- section {section.index} --> ({section.kind}; return {section.fragment})\n{section.text}"
+        for section in sections
+    )
+
+
+def parse_fragments(output: str) -> Dict[int, str]:
+    """Split LLM output on ``<!-- section N -->`` markers."""
+    output = output.strip()
+    if output.startswith("```"):
+        output = "\n".join(line for line in output.splitlines() if not line.strip().startswith("```"))
+    parts = _MARKER_REGEX.split(output)
+    # parts = [preamble, index, fragment, index, fragment, ...]
+    return {int(parts[i]): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2) if parts[i + 1].strip()}
+
+
+def assemble(css: str, sections: Sequence[Section], fragments: Dict[int, str]) -> str:
+    """Full resume HTML from per-section fragments, in the template's order."""
+    by_kind: Dict[str, List[str]] = {kind: [] for kind in ORDER}
+    for section in sections:
+        fragment = fragments[section.index]
+        if section.kind in _ENTRY_HEADINGS:
+            fragment = _ENTRY_WRAPPER_REGEX.sub("", fragment).strip()
+        by_kind[section.kind].append(fragment)
+
+    body: List[str] = []
+    for kind in ORDER:
+        if kind in _ENTRY_HEADINGS and by_kind[kind]:
+            entries = "\n".join(by_kind[kind])
+            body.append(f'<section class="{kind}">\n<h2>{_ENTRY_HEADINGS[kind]}</h2>\n{entries}\n</section>')
+        elif kind not in _ENTRY_HEADINGS:
+            body.extend(by_kind[kind])
+    return f'{css}\n\n<div class="resume">\n' + "\n\n".join(body) + "\n</div>"
+
+
+def _escape(value) -> str:
+    return html.escape(str(value or ""), quote=False)
+
+
+def _bullet_list(bullets) -> str:
+    return '<ul class="bullets">' + "".join(f"<li>{_escape(bullet.text)}</li>" for bullet in bullets) + "</ul>"
+
+
+def render_payload(css: str, payload) -> str:
+    """Resume HTML in the template's structure from a ``models.ResumePayload``.
+
+    Used for the local rewriter's output, so it looks like an LLM rewrite to
+    the PDF renderer and the scorer.
+    """
+    esc, bullets = _escape, _bullet_list
+    heading = payload.heading
+    contact = " | ".join(esc(v) for v in (heading.phone, heading.email, heading.linkedin, heading.github) if v)
+    fragments = {
+        "header": f'<div class="header"><h1>{esc(heading.name)}</h1><p class="title">{esc(heading.title)}</p>'
+        f'<p class="contact">{contact}</p></div>',
+        "experience": [
+            f'<div class="job"><div class="job-header"><span class="role">{esc(job.role)}</span>'
+            f'<span class="dates">{esc(job.start)} - {esc(job.end)}</span></div>'
+            f'<div class="job-meta"><span class="company">{esc(job.company)}</span>'
+            f'<span class="location">{esc(job.location)}</span></div>{bullets(job.bullets)}</div>'
+            for job in payload.experiences
+        ],
+        "skills": payload.skills
+        and f'<section class="skills"><h2>TECHNICAL SKILLS</h2><p><strong>Skills:</strong> {esc(", ".join(payload.skills))}</p></section>',
+        "projects": [
+            f'<div class="project"><div class="project-header"><span class="project-name"><strong>{esc(project.name)}</strong>'
+            f' | <em>{esc(project.stack)}</em></span><span class="dates">{esc(project.timeline)}</span></div>'
+            f"{bullets(project.bullets)}</div>"
+            for project in payload.projects
+        ],
+        "education": payload.education
+        and f'<section class="education"><h2>EDUCATION</h2><p class="degree">{esc(payload.education)}</p></section>',
+        "certifications": payload.certifications
+        and '<section class="certifications"><h2>CERTIFICATIONS</h2>'
+        + "".join(f"<p><strong>{esc(cert)}</strong></p>" for cert in payload.certifications)
+        + "</section>",
+    }
+    parts: List[Section] = []
+    rendered: Dict[int, str] = {}
+    for kind in ORDER:
+        for fragment in fragments[kind] if isinstance(fragments[kind], list) else [fragments[kind]]:
+            if fragment:
+                rendered[len(parts)] = fragment
+                parts.append(Section(kind, "", len(parts)))
+    return assemble(css, parts, rendered)
+
+
+def _phrases(text: str, size: int = 4) -> set:
+    words = _WORD_REGEX.findall(re.sub(r"<[^>]+>", " ", html.unescape(text)).lower())
+    return {
+        " ".join(words[i:i + size])
+        for i in range(len(words) - size + 1)
+        if not set(words[i:i + size]) <= _FUNCTION_WORDS
+    }
+
+
+def repeated_bullets(sections: Sequence[Section], fragments: Dict[int, str]) -> List[Tuple[int, str]]:
+    """Bullets that reuse a four-word phrase from a bullet in an earlier section.
+
+    Returns (section index, bullet HTML) pairs; the first use of a phrase is
+    kept and later ones are reported.
+    """
+    first_seen: Dict[str, int] = {}
+    repeated: List[Tuple[int, str]] = []
+    for section in sections:
+        for bullet in _BULLET_HTML_REGEX.findall(fragments[section.index]):
+            phrases = _phrases(bullet)
+            if any(first_seen.get(phrase, section.index) != section.index for phrase in phrases):
+                repeated.append((section.index, bullet))
+                continue
+            for phrase in phrases:
+                first_seen.setdefault(phrase, section.index)
+    return repeated
+
+
+def replace_bullets(fragments: Dict[int, str], replacements: Sequence[Tuple[int, str, str]]) -> Dict[int, str]:
+    """Swap (section index, old bullet HTML, new plain text) into a copy of ``fragments``."""
+    updated = dict(fragments)
+    for index, old, new in replacements:
+        updated[index] = updated[index].replace(f"<li>{old}</li>", f"<li>{html.escape(new, quote=False)}</li>", 1)
+    return updated
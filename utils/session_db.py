@@ -0,0 +1,242 @@
+"""SQLite session backend shared by every worker process on a node.
+
+The in-memory session dict is per process, so with ``uvicorn --workers N`` and
+no Redis a ``/result`` poll that lands on another worker 404s. Pointing
+``SESSION_DB_PATH`` at a local file makes all workers share one SQLite
+database instead:
+
+- WAL journal mode, so readers never block the writer or each other, with a
+  busy timeout for the brief writer-writer waits and memory-mapped reads;
+- ``expires_at`` is indexed, so purging expired rows and counting live ones
+  are range scans rather than full-table scans;
+- PDFs live in their own table as raw bytes (not base64 JSON), so reading a
+  session's metadata never pages in its PDF;
+- the encoded ``/result`` bodies (identity, gzip, br) are stored per
+  encoding, so a poll reads exactly the bytes it sends, and a small
+  ``session_meta`` row (status, score, version, ETag) answers status polls
+  and conditional GETs without touching either.
+
+Records (idempotency keys, cached resume sections) get their own table;
+``claim`` runs in an immediate transaction, which makes it atomic across
+processes.
+
+    SESSION_DB_PATH               database file; unset keeps sessions in memory
+    SESSION_DB_MMAP_BYTES         mmap_size for reads (default 256 MiB)
+    SESSION_DB_PURGE_INTERVAL     minimum seconds between purges (default 10)
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+SESSION_DB_MMAP_BYTES = int(os.getenv("SESSION_DB_MMAP_BYTES", str(256 * 1024 * 1024)))
+SESSION_DB_PURGE_INTERVAL = float(os.getenv("SESSION_DB_PURGE_INTERVAL", "10"))
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+CREATE TABLE IF NOT EXISTS session_meta (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_meta_expires_at ON session_meta (expires_at);
+CREATE TABLE IF NOT EXISTS session_pdfs (
+    id TEXT PRIMARY KEY,
+    pdf BLOB NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_pdfs_expires_at ON session_pdfs (expires_at);
+CREATE TABLE IF NOT EXISTS session_bodies (
+    id TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    body BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (id, encoding)
+);
+CREATE INDEX IF NOT EXISTS session_bodies_expires_at ON session_bodies (expires_at);
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_expires_at ON records (expires_at);
+"""
+
+
+class SQLiteSessions:
+    """Sessions, their PDFs and idempotency records in one WAL-mode SQLite file.
+
+    Each thread (and each forked process) opens its own connection; SQLite
+    connections must not be shared across threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # executescript manages its own transaction; every statement is IF NOT EXISTS.
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        # isolation_level=None: autocommit, transactions are opened explicitly.
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is safe in WAL mode; a power loss can only drop the latest sessions.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA mmap_size={SESSION_DB_MMAP_BYTES}")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction that takes the database write lock up front."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ------------------ sessions ------------------ #
+    def save(
+        self,
+        session_id: str,
+        data: Dict[str, Any],
+        pdf: bytes,
+        ttl: int,
+        bodies: Optional[Dict[str, bytes]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        expires_at = time.time() + ttl
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_meta (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(meta or {}), expires_at),
+            )
+            conn.execute("DELETE FROM session_bodies WHERE id = ?", (session_id,))
+            conn.executemany(
+                "INSERT INTO session_bodies (id, encoding, body, expires_at) VALUES (?, ?, ?, ?)",
+                [(session_id, encoding, body, expires_at) for encoding, body in (bodies or {}).items()],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data), expires_at),
+            )
+            if pdf:
+                conn.execute(
+                    "INSERT OR REPLACE INTO session_pdfs (id, pdf, expires_at) VALUES (?, ?, ?)",
+                    (session_id, pdf, expires_at),
+                )
+            else:
+                conn.execute("DELETE FROM session_pdfs WHERE id = ?", (session_id,))
+
+    def fetch(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session metadata without the PDF."""
+        row = self._connect().execute(
+            "SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at >= ?",
+            (session_id, time.time()),
+        ).fetchone()
+        if not row:
+            return None
+        data = json.loads(row[0])
+        data["expires_at"] = row[1]
+        return data
+
+    def put_meta(self, session_id: str, meta: Dict[str, Any], ttl: int) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_meta (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(meta), time.time() + ttl),
+            )
+
+    def fetch_meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM session_meta WHERE id = ? AND expires_at >= ?",
+            (session_id, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def fetch_pdf(self, session_id: str) -> bytes:
+        row = self._connect().execute(
+            "SELECT pdf FROM session_pdfs WHERE id = ? AND expires_at >= ?",
+            (session_id, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else b""
+
+    def fetch_body(self, session_id: str, encoding: str) -> Optional[bytes]:
+        row = self._connect().execute(
+            "SELECT body FROM session_bodies WHERE id = ? AND encoding = ? AND expires_at >= ?",
+            (session_id, encoding, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def size(self) -> int:
+        """Live sessions, including those still in progress (they only have meta)."""
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM session_meta WHERE expires_at >= ?", (time.time(),)
+        ).fetchone()[0]
+
+    def purge_expired(self, force: bool = False) -> int:
+        """Delete expired rows; throttled to once per SESSION_DB_PURGE_INTERVAL per process."""
+        now = time.time()
+        if not force and now < self._next_purge:
+            return 0
+        self._next_purge = now + SESSION_DB_PURGE_INTERVAL
+        removed = 0
+        with self._transaction() as conn:
+            for table in ("sessions", "session_meta", "session_pdfs", "session_bodies", "records"):
+                removed += conn.execute(f"DELETE FROM {table} WHERE expires_at < ?", (now,)).rowcount
+        return removed
+
+    # ------------------ idempotency records ------------------ #
+    def fetch_record(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT data FROM records WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, key: str, record: Dict[str, Any], ttl: int) -> Optional[Dict[str, Any]]:
+        """Insert ``record`` unless a live one exists; returns the existing record."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT data FROM records WHERE key = ? AND expires_at >= ?", (key, now)
+            ).fetchone()
+            if row:
+                return json.loads(row[0])
+            conn.execute(
+                "INSERT OR REPLACE INTO records (key, data, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(record), now + ttl),
+            )
+            return None
+
+    def put_record(self, key: str, record: Dict[str, Any], ttl: int) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO records (key, data, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(record), time.time() + ttl),
+            )
+
+    def delete_record(self, key: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM records WHERE key = ?", (key,))
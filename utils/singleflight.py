@@ -0,0 +1,134 @@
+"""Coalesce identical in-flight computations.
+
+``await flights.do(key, fn)`` runs ``fn()`` once per key at a time: concurrent
+callers with the same key await the running computation and share its result
+(or its exception). With a Redis client the same holds across workers. One
+worker takes ``singleflight:lock:<key>`` (SET NX, value = a token for this
+run) and the others poll. The leader refreshes the lock's TTL while ``fn``
+runs, so a computation of any length (an LLM cascade with timeouts and
+retries can take many minutes) keeps its lock. If the leader dies, the
+refreshes stop, the lock expires and a waiting worker takes over.
+
+When it finishes, the leader stores the JSON result with its run token under
+``singleflight:result:<key>``. A waiter only takes a result from a run it saw
+holding the lock. A request that arrives after the run ended starts a new
+one, as it would without single-flight, so sequential uploads are never
+served an earlier request's result.
+
+Results must be JSON-serialisable when Redis is used. The computation is
+shielded, so a caller that disconnects does not cancel it for the others.
+
+    SINGLE_FLIGHT_ENABLED              default true
+    SINGLE_FLIGHT_LOCK_TTL_SECONDS     lock expiry without refreshes, i.e. takeover delay after a crash (default 30)
+    SINGLE_FLIGHT_RESULT_TTL_SECONDS   how long waiters have to collect a finished result (default 30)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+from utils import metrics, tracing
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_LOCK_TTL_SECONDS = float(os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECONDS", "30"))
+SINGLE_FLIGHT_RESULT_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_RESULT_TTL_SECONDS", "30"))
+POLL_SECONDS = 0.2
+
+COALESCED = metrics.counter(
+    "resumate_coalesced_requests_total",
+    "Requests served by another request's identical in-flight computation (scope: local or redis).",
+    ("scope",),
+)
+
+
+def content_key(*parts: str) -> str:
+    """Stable hash of the inputs that determine a computation's result."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, redis_client=None, namespace: str = "singleflight"):
+        self._redis = redis_client
+        self._namespace = namespace
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not SINGLE_FLIGHT_ENABLED:
+            return await fn()
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            COALESCED.inc(scope="local")
+            tracing.set_attribute("coalesced", "local")
+            return await asyncio.shield(flight)
+
+        flight = asyncio.ensure_future(self._redis_do(key, fn) if self._redis else fn())
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(flight)
+
+    def _finish(self, key: str, flight: asyncio.Future) -> None:
+        self._flights.pop(key, None)
+        # Mark the exception retrieved even if every caller has gone away.
+        if not flight.cancelled():
+            flight.exception()
+
+    async def _redis_do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f"{self._namespace}:lock:{key}"
+        result_key = f"{self._namespace}:result:{key}"
+        run = uuid.uuid4().hex
+        ttl_ms = int(SINGLE_FLIGHT_LOCK_TTL_SECONDS * 1000)
+        seen = set()
+        while True:
+            # redis-py is synchronous; keep its round trips off the event loop.
+            raw = await asyncio.to_thread(self._redis.get, result_key)
+            if raw:
+                finished = json.loads(raw)
+                if finished["run"] in seen:
+                    COALESCED.inc(scope="redis")
+                    tracing.set_attribute("coalesced", "redis")
+                    return finished["value"]
+            if await asyncio.to_thread(self._redis.set, lock_key, run, nx=True, px=ttl_ms):
+                break
+            owner = await asyncio.to_thread(self._redis.get, lock_key)
+            if owner:
+                seen.add(owner)
+            await asyncio.sleep(POLL_SECONDS)
+
+        heartbeat = asyncio.ensure_future(self._keep_lock(lock_key, run, ttl_ms))
+        try:
+            value = await fn()
+            await asyncio.to_thread(
+                self._redis.set, result_key, json.dumps({"run": run, "value": value}), ex=SINGLE_FLIGHT_RESULT_TTL_SECONDS
+            )
+            return value
+        finally:
+            heartbeat.cancel()
+            await asyncio.to_thread(self._release, lock_key, run)
+
+    async def _keep_lock(self, lock_key: str, run: str, ttl_ms: int) -> None:
+        while True:
+            await asyncio.sleep(ttl_ms / 3000)
+            if not await asyncio.to_thread(self._refresh, lock_key, run, ttl_ms):
+                logger.warning(f"Single-flight lock {lock_key[-12:]} was lost while computing")
+                return
+
+    def _refresh(self, lock_key: str, run: str, ttl_ms: int) -> bool:
+        if self._redis.get(lock_key) != run:
+            return False
+        return bool(self._redis.pexpire(lock_key, ttl_ms))
+
+    def _release(self, lock_key: str, run: str) -> None:
+        if self._redis.get(lock_key) == run:
+            self._redis.delete(lock_key)
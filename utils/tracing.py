@@ -0,0 +1,383 @@
+"""Lightweight distributed tracing shared by the gateway and the microservices.
+
+Trace context travels between services in the W3C ``traceparent`` header, so a
+single upload can be followed from the gateway into rewriter-service and
+pdf-service. Finished spans are exported in a background thread to either or
+both of:
+
+    TRACE_FILE           JSON lines, one span per line (e.g. /tmp/resumate-traces.jsonl)
+    TRACE_COLLECTOR_URL  an OTLP/HTTP JSON endpoint (e.g. http://localhost:4318/v1/traces)
+
+With neither set, spans are still created and propagated but nothing is
+written. TRACE_SAMPLE_RATE (default 1.0) decides which new root traces are
+exported; downstream services follow the caller's decision.
+
+Summarise an exported file, slowest traces first:
+
+    python -m utils.tracing /tmp/resumate-traces.jsonl --slowest 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2"))
+TRACE_BATCH_SIZE = 256
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current: ContextVar[Optional["Span"]] = ContextVar("resumate_span", default=None)
+_service = "unknown"
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+@dataclass
+class Span:
+    name: str
+    service: str
+    trace_id: str
+    span_id: str
+    parent_id: str = ""
+    sampled: bool = True
+    kind: str = "internal"
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: str = ""
+
+    @property
+    def duration(self) -> float:
+        """Seconds between start and end (or now, while the span is open)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.sampled:
+            _exporter.submit(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def configure(service: str) -> None:
+    """Name the service that spans created in this process belong to."""
+    global _service
+    _service = service
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Span]:
+    """Return a remote parent placeholder for a valid ``traceparent`` header."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return Span(name="remote", service="", trace_id=trace_id, span_id=span_id, sampled=bool(int(flags, 16) & 1))
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, parent: Optional[Span] = None, kind: str = "internal", **attributes: Any) -> Span:
+    """Start a span without making it current; the caller must call ``end()``.
+
+    Useful around a single call that cannot be wrapped in a ``with`` block.
+    """
+    parent = parent or _current.get()
+    if parent is None:
+        trace_id, parent_id = _new_id(128), ""
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    else:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    return Span(
+        name=name,
+        service=_service,
+        trace_id=trace_id,
+        span_id=_new_id(64),
+        parent_id=parent_id,
+        sampled=sampled,
+        kind=kind,
+        attributes=dict(attributes),
+    )
+
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, kind: str = "internal", **attributes: Any) -> Iterator[Span]:
+    """Run the block inside a new span that child spans and outgoing calls attach to."""
+    current = start_span(name, parent=parent, kind=kind, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.end(error=exc)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Attach an attribute to the current span, if there is one."""
+    current = _current.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+def inject(headers: MutableMapping[str, str]) -> None:
+    """Add the current span's ``traceparent`` to outgoing request headers."""
+    current = _current.get()
+    if current is not None:
+        headers["traceparent"] = current.traceparent
+
+
+async def httpx_request_hook(request) -> None:
+    """httpx ``event_hooks["request"]`` entry that propagates trace context."""
+    inject(request.headers)
+
+
+class TracingMiddleware:
+    """Open a server span per request, continuing an incoming ``traceparent``.
+
+    The response carries the span's ``traceparent`` so a client can quote the
+    trace id of a slow request.
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+        configure(service)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        remote = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        name = f"{scope['method']} {scope['path']}"
+
+        with span(name, parent=remote, kind="server", **{"http.method": scope["method"]}) as server_span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("http.status_code", message["status"])
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"traceparent", server_span.traceparent.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name by route handler so /result/{id} groups into one operation.
+                endpoint = scope.get("endpoint")
+                if endpoint is not None:
+                    server_span.name = f"{scope['method']} {getattr(endpoint, '__name__', scope['path'])}"
+                    server_span.set_attribute("http.target", scope["path"])
+
+
+# ------------------ export ------------------ #
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def _otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    by_service: Dict[str, List[Span]] = defaultdict(list)
+    for item in spans:
+        by_service[item.service].append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "resumate"},
+                    "spans": [
+                        {
+                            "traceId": item.trace_id,
+                            "spanId": item.span_id,
+                            "parentSpanId": item.parent_id,
+                            "name": item.name,
+                            "kind": _OTLP_KINDS.get(item.kind, 1),
+                            "startTimeUnixNano": str(item.start_ns),
+                            "endTimeUnixNano": str(item.end_ns),
+                            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in item.attributes.items()],
+                            "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+                        }
+                        for item in items
+                    ],
+                }],
+            }
+            for service, items in by_service.items()
+        ]
+    }
+
+
+class _Exporter:
+    """Batch finished spans on a daemon thread so requests never wait on I/O."""
+
+    def __init__(self, path: str, collector_url: str):
+        self.path = path
+        self.collector_url = collector_url
+        self.enabled = bool(path or collector_url)
+        self._queue: "queue.SimpleQueue[Span]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: Span) -> None:
+        if not self.enabled:
+            return
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+        self._queue.put(item)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + TRACE_FLUSH_SECONDS
+            while len(batch) < TRACE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.writelines(json.dumps(item.to_dict()) + "\n" for item in batch)
+            except OSError as e:
+                logger.warning(f"Could not write {len(batch)} spans to {self.path}: {e}")
+        if self.collector_url:
+            try:
+                import httpx
+
+                httpx.post(self.collector_url, json=_otlp_payload(batch), timeout=5.0)
+            except Exception as e:
+                logger.warning(f"Could not export {len(batch)} spans to {self.collector_url}: {e}")
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export whatever is queued now (used by tests and at shutdown)."""
+        batch: List[Span] = []
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+
+_exporter = _Exporter(TRACE_FILE, TRACE_COLLECTOR_URL)
+
+
+def flush() -> None:
+    _exporter.flush()
+
+
+# ------------------ offline analysis ------------------ #
+def _print_tree(spans: List[Dict[str, Any]]) -> None:
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    ids = {item["span_id"] for item in spans}
+    roots = []
+    for item in spans:
+        if item["parent_id"] and item["parent_id"] in ids:
+            children[item["parent_id"]].append(item)
+        else:
+            roots.append(item)
+
+    def walk(item: Dict[str, Any], depth: int) -> None:
+        error = f"  !! {item['error']}" if item.get("error") else ""
+        print(f"  {'  ' * depth}{item['duration_ms']:10.1f} ms  {item['service']:>9s}  {item['name']}{error}")
+        for child in sorted(children[item["span_id"]], key=lambda c: c["start_ns"]):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda r: r["start_ns"]):
+        walk(root, 0)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Show the slowest traces in a TRACE_FILE export.")
+    parser.add_argument("path")
+    parser.add_argument("--slowest", type=int, default=5)
+    parser.add_argument("--trace", help="show only this trace id")
+    args = parser.parse_args(argv)
+
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with open(args.path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                item = json.loads(line)
+                traces[item["trace_id"]].append(item)
+
+    if args.trace:
+        selected = [args.trace] if args.trace in traces else []
+    else:
+        def total(trace_id: str) -> float:
+            return max(item["duration_ms"] for item in traces[trace_id])
+        selected = sorted(traces, key=total, reverse=True)[: args.slowest]
+
+    for trace_id in selected:
+        print(f"trace {trace_id}")
+        _print_tree(traces[trace_id])
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import os
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+
+MAX_RESUME_BYTES = int(os.getenv("MAX_RESUME_BYTES", str(5 * 1024 * 1024)))
+MAX_JD_BYTES = int(os.getenv("MAX_JD_BYTES", str(2 * 1024 * 1024)))
+# Whole multipart body: both files plus form fields and boundaries.
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(MAX_RESUME_BYTES + MAX_JD_BYTES + 64 * 1024)))
+
+
+def _too_large(limit: int, field: str = "request body") -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"{field} exceeds the maximum upload size of {limit} bytes",
+    )
+
+
+def open_upload(upload: UploadFile, limit: int, field: str) -> BinaryIO:
+    """Return the spooled upload file rewound to 0, rejecting it if over `limit` bytes.
+
+    Starlette has already spooled the part to a SpooledTemporaryFile, so the size
+    check is a seek rather than a read, and parsers get the file object itself.
+    """
+    fileobj = upload.file
+    size = upload.size
+    if size is None:
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+    if size > limit:
+        raise _too_large(limit, field)
+    fileobj.seek(0)
+    return fileobj
+
+
+class UploadSizeLimitMiddleware:
+    """Reject request bodies larger than `max_bytes` while they are still streaming in.
+
+    A declared Content-Length over the limit is refused before any body is read;
+    chunked or lying clients are cut off as soon as the running total crosses it.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send) -> None:
+        body = b'{"detail":"request body exceeds the maximum upload size of %d bytes"}' % self.max_bytes
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
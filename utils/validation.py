@@ -0,0 +1,214 @@
+"""Structural checks on the LLM's resume HTML.
+
+The rewrite used to be trusted as is. A dropped role, a renamed class (which
+breaks the PDF stylesheet) or a template placeholder left in ("Start - End")
+went straight to the user, and the only remedy was a whole new generation.
+
+``validate`` lines the output up with the sections of the original resume
+(``sections.split_sections``) and checks each one:
+
+- missing: the section, role or project is not in the output;
+- class: a required class of the template is absent or an unknown one is used;
+- placeholder: a template slot left as is, such as a role of "Role Title",
+  dates of "Start Date - End Date" or a bullet with "[metric]" in it;
+- identity: a role's title or company (a project's name) is not preserved.
+
+The caller rewrites only the sections with problems and splices them back in
+with ``sections.assemble``.
+"""
+from __future__ import annotations
+
+import html as html_lib
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from utils.sections import Section
+
+# Classes each kind of fragment must contain.
+REQUIRED_CLASSES: Dict[str, Tuple[str, ...]] = {
+    "header": ("header",),
+    "experience": ("job", "job-header", "role", "dates", "company", "bullets"),
+    "skills": ("skills",),
+    "projects": ("project", "project-header", "project-name", "dates", "bullets"),
+    "education": ("education",),
+    "certifications": ("certifications",),
+}
+# Where each kind starts in the document: (tag, class).
+_ROOTS: Dict[str, Tuple[str, str]] = {
+    "header": ("div", "header"),
+    "experience": ("div", "job"),
+    "skills": ("section", "skills"),
+    "projects": ("div", "project"),
+    "education": ("section", "education"),
+    "certifications": ("section", "certifications"),
+}
+# Template text left in a slot instead of being filled in. Each must be the
+# whole text of an element ("Tech Stack" in <em>, not in a bullet about one).
+PLACEHOLDERS = frozenset(
+    text.lower()
+    for text in (
+        "Name Surname",
+        "Job Title",
+        "Phone | Email | LinkedIn | GitHub",
+        "Role Title",
+        "Company Name",
+        "City, Country",
+        "Project Name",
+        "Tech Stack",
+        "University Name",
+        "Degree, Major",
+        "Certification Name",
+    )
+)
+# Bracketed bullet slots and numbered list items ("Skill1, Skill2") are never real content.
+_PLACEHOLDER_REGEX = re.compile(
+    r"\[(?:problem|action[^\]]*|metric[^\]]*|outcome[^\]]*)\]|\b(?:Skill|Framework|Tool|Lib)[1-9]\b"
+)
+_LEAF_REGEX = re.compile(r"<(\w+)\b[^>]*>([^<]*)</\1\s*>")
+_DATES_REGEX = re.compile(r'<span class="dates">(.*?)</span>', re.S)
+# A dates span made only of these ("Start Date - End Date", "MMM YYYY", "") was not filled in.
+_PLACEHOLDER_DATES_REGEX = re.compile(
+    r"^(?:\s|[-–—|/,.]|\b(?:to|start|end|issued|expires|date|mmm|yyyy|mm)\b|\[[^\]]*\])*$", re.I
+)
+_CLASS_REGEX = re.compile(r'class="([^"]*)"')
+_TAG_REGEX = re.compile(r"<[^>]+>")
+_WORD_REGEX = re.compile(r"[a-z0-9]+")
+_SPACE_REGEX = re.compile(r"\s+")
+# Dates on a role's name line ("Backend Engineer | Acme | Jan 2020 - Present").
+_DATE_REGEX = re.compile(
+    r"\b(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d{2}\b|\b(?:present|current|now)\b",
+    re.I,
+)
+_NAME_SEPARATOR_REGEX = re.compile(r"\s+[-–—|•·@]\s+|\s*[|•·]\s*|\s+at\s+|\t|\s{3,}")
+_BULLET_LINE_REGEX = re.compile(r"^\s*(?:[-•*▪◦●]|\d+[.)])\s+")
+# Company suffixes the rewrite may drop without changing who the employer is.
+_SUFFIXES = frozenset("inc llc ltd corp co gmbh plc limited the".split())
+
+
+@dataclass
+class Problem:
+    index: int  # section index in the original resume
+    kind: str  # missing | class | placeholder | identity
+    detail: str = ""
+
+
+def _element_end(html: str, start: int, tag: str) -> int:
+    """End of the element opening at ``start``, balancing nested ``tag`` elements."""
+    pattern = re.compile(rf"<{tag}\b|</{tag}\s*>", re.I)
+    depth = 0
+    for match in pattern.finditer(html, start):
+        depth += -1 if match.group(0).startswith("</") else 1
+        if depth == 0:
+            return match.end()
+    return len(html)
+
+
+def split_document(html: str) -> Dict[str, List[str]]:
+    """The fragments of a full resume document, by kind, in document order."""
+    found: Dict[str, List[str]] = {}
+    for kind, (tag, cls) in _ROOTS.items():
+        found[kind] = [
+            html[match.start():_element_end(html, match.start(), tag)]
+            for match in re.finditer(rf'<{tag}\s+class="{cls}"', html)
+        ]
+    return found
+
+
+def _words(text: str) -> set:
+    return set(_WORD_REGEX.findall(html_lib.unescape(_TAG_REGEX.sub(" ", text)).lower()))
+
+
+def identity_lines(section: Section) -> List[str]:
+    """The first two names of a role or project (title, company), from its
+    non-bullet lines with dates and separators taken out."""
+    names: List[str] = []
+    for line in section.text.splitlines():
+        if not line.strip() or _BULLET_LINE_REGEX.match(line):
+            continue
+        for part in _NAME_SEPARATOR_REGEX.split(_DATE_REGEX.sub(" ", line)):
+            if _WORD_REGEX.search(part.lower()):
+                names.append(part.strip(" -–—,()"))
+    return names[:2]
+
+
+def _preserved(section: Section, fragment: str) -> bool:
+    words = _words(fragment)
+    names = identity_lines(section)
+    if not names:
+        return True
+    return any(set(_WORD_REGEX.findall(name.lower())) - _SUFFIXES <= words for name in names)
+
+
+def _text(html: str) -> str:
+    return _SPACE_REGEX.sub(" ", html_lib.unescape(_TAG_REGEX.sub(" ", html))).strip()
+
+
+def _placeholder(fragment: str) -> Optional[str]:
+    """The first template placeholder left in ``fragment``, or None."""
+    for _, inner in _LEAF_REGEX.findall(fragment):
+        if _text(inner).lower() in PLACEHOLDERS:
+            return _text(inner)
+    for dates in _DATES_REGEX.findall(fragment):
+        if _PLACEHOLDER_DATES_REGEX.match(_text(dates)):
+            return _text(dates) or "empty dates"
+    match = _PLACEHOLDER_REGEX.search(_text(fragment))
+    return match.group(0) if match else None
+
+
+def check(section: Section, fragment: str, allowed_classes: FrozenSet[str]) -> List[Problem]:
+    """Problems with one section's fragment; empty when it is fine."""
+    problems: List[Problem] = []
+    used = {cls for value in _CLASS_REGEX.findall(fragment) for cls in value.split()}
+    missing = [cls for cls in REQUIRED_CLASSES[section.kind] if cls not in used]
+    unknown = sorted(used - allowed_classes)
+    if missing or unknown:
+        problems.append(Problem(section.index, "class", f"missing {missing}, unknown {unknown}"))
+    placeholder = _placeholder(fragment)
+    if placeholder is not None:
+        problems.append(Problem(section.index, "placeholder", placeholder))
+    if section.kind in ("experience", "projects") and not _preserved(section, fragment):
+        problems.append(Problem(section.index, "identity", " / ".join(identity_lines(section))))
+    return problems
+
+
+def align(sections: Sequence[Section], html: str) -> Dict[int, str]:
+    """Match the output's fragments to the original's sections.
+
+    Roles and projects are matched by name, so a dropped or reordered entry
+    does not shift the rest. Entries no name matches are paired up in order
+    when the counts agree.
+    """
+    found = split_document(html)
+    fragments: Dict[int, str] = {}
+    for kind in ("experience", "projects"):
+        entries = [section for section in sections if section.kind == kind]
+        unused: List[Optional[str]] = list(found[kind])
+        for section in entries:
+            for position, fragment in enumerate(unused):
+                if fragment is not None and _preserved(section, fragment):
+                    fragments[section.index] = fragment
+                    unused[position] = None
+                    break
+        if len(found[kind]) == len(entries):
+            leftovers = iter(fragment for fragment in unused if fragment is not None)
+            for section in entries:
+                if section.index not in fragments:
+                    fragments[section.index] = next(leftovers)
+    for section in sections:
+        if section.kind not in ("experience", "projects") and found[section.kind]:
+            fragments[section.index] = found[section.kind][0]
+    return fragments
+
+
+def validate(sections: Sequence[Section], html: str, allowed_classes: FrozenSet[str]) -> Tuple[Dict[int, str], List[Problem]]:
+    """The output's fragment for each section, and every problem found."""
+    fragments = align(sections, html)
+    problems: List[Problem] = []
+    for section in sections:
+        fragment = fragments.get(section.index)
+        if fragment is None:
+            problems.append(Problem(section.index, "missing", section.kind))
+        else:
+            problems.extend(check(section, fragment, allowed_classes))
+    return fragments, problems
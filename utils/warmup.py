@@ -0,0 +1,155 @@
+"""Startup warmup and readiness.
+
+A fresh instance pays for WeasyPrint's font cache, lazy imports (pdfplumber,
+numpy/scipy, openai) and the first TLS handshakes on its first real request.
+A service registers warmup steps, calls ``start()`` from its startup hook, and
+reports ``ready`` from ``/readyz``: load balancers can keep probing
+``/healthz`` for liveness while traffic waits for readiness.
+
+Steps run one after another (sync ones in a worker thread, so the event loop
+keeps answering probes). A failed optional step is logged and skipped; a
+failed ``required`` step keeps the service unready. Timings are exported as
+``resumate_warmup_step_seconds`` and ``resumate_ready``.
+
+    WARMUP_ENABLED               default true; false reports ready immediately
+    WARMUP_STEP_TIMEOUT_SECONDS  per-step limit (default 60)
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from utils import capabilities, metrics
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_STEP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_STEP_TIMEOUT_SECONDS", "60"))
+
+WARMUP_SECONDS = metrics.gauge(
+    "resumate_warmup_step_seconds",
+    "Duration of each startup warmup step.",
+    ("service", "step", "outcome"),
+)
+READY = metrics.gauge(
+    "resumate_ready",
+    "1 once startup warmup has finished and the service accepts traffic.",
+    ("service",),
+)
+
+# Small but representative: the template's classes and fonts, a list, two roles.
+CANNED_RESUME_HTML = """<style>
+.resume { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif; font-size: 11pt; padding: 40px 50px; }
+.header { text-align: center; border-bottom: 1px solid #000; }
+.job-header { display: flex; justify-content: space-between; font-weight: bold; }
+.bullets { margin: 4px 0 0 18px; }
+</style>
+<div class="resume"><div class="header"><h1>Jane Doe</h1><div class="contact">jane@example.com | +1 555 010 0000</div></div>
+<section class="experience"><h2>EXPERIENCE</h2>
+<div class="job"><div class="job-header"><span class="role">Software Engineer</span><span class="dates">Jan 2021 - Present</span></div>
+<ul class="bullets"><li>Reduced checkout latency by 35% by moving pricing to Redis, resulting in faster pages for 2M users</li>
+<li>Automated Kubernetes rollouts with Terraform, resulting in 4x more frequent deploys</li></ul></div>
+<div class="job"><div class="job-header"><span class="role">Backend Engineer</span><span class="dates">Jun 2018 - Dec 2020</span></div>
+<ul class="bullets"><li>Migrated billing jobs from cron to Kafka consumers, resulting in zero missed invoices</li></ul></div>
+</section></div>"""
+CANNED_RESUME_TEXT = "Jane Doe\nSoftware Engineer\nReduced checkout latency by 35% using Redis, Kafka and Kubernetes"
+CANNED_JOB_DESCRIPTION = "Backend engineer to build payment services with Python, Kafka, Redis and Kubernetes."
+
+StepFn = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    fn: StepFn
+    required: bool = False
+    status: str = "pending"  # pending | running | ok | failed
+    seconds: float = 0.0
+    error: str = ""
+    result: Any = field(default=None, repr=False)
+
+
+class Warmup:
+    def __init__(self, service: str):
+        self.service = service
+        self.steps: List[WarmupStep] = []
+        self.state = "pending"  # pending | running | ready | failed
+        self.seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+        READY.set(0, service=service)
+
+    def step(self, name: str, required: bool = False) -> Callable[[StepFn], StepFn]:
+        """Decorator registering a warmup step; steps run in registration order."""
+
+        def register(fn: StepFn) -> StepFn:
+            self.steps.append(WarmupStep(name=name, fn=fn, required=required))
+            return fn
+
+        return register
+
+    def result(self, name: str) -> Any:
+        """Return value of an earlier step, e.g. the PDF bytes a render step produced."""
+        for item in self.steps:
+            if item.name == name:
+                return item.result
+        return None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        """Run the steps in the background (call from a startup hook)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self) -> None:
+        if not WARMUP_ENABLED:
+            self._finish("ready")
+            return
+
+        self.state = "running"
+        started = time.perf_counter()
+        for item in self.steps:
+            item.status = "running"
+            step_started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(item.fn):
+                    call = item.fn()
+                else:
+                    call = asyncio.to_thread(item.fn)
+                item.result = await asyncio.wait_for(call, WARMUP_STEP_TIMEOUT_SECONDS)
+                item.status = "ok"
+            except Exception as e:
+                item.status = "failed"
+                item.error = str(e) or type(e).__name__
+            item.seconds = round(time.perf_counter() - step_started, 3)
+            WARMUP_SECONDS.set(item.seconds, service=self.service, step=item.name, outcome=item.status)
+            log = logger.info if item.status == "ok" else logger.warning
+            log(f"Warmup step {item.name} {item.status} in {item.seconds}s{': ' + item.error if item.error else ''}")
+
+        self.seconds = round(time.perf_counter() - started, 3)
+        failed_required = [item.name for item in self.steps if item.required and item.status != "ok"]
+        self._finish("failed" if failed_required else "ready")
+
+    def _finish(self, state: str) -> None:
+        self.state = state
+        READY.set(1 if state == "ready" else 0, service=self.service)
+        logger.info(f"Warmup {state} for {self.service} after {self.seconds}s")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "seconds": self.seconds,
+            "steps": {
+                item.name: {"status": item.status, "seconds": item.seconds, "required": item.required, "error": item.error}
+                for item in self.steps
+            },
+            "capabilities": capabilities.status(),
+        }
+